@@ -0,0 +1,5191 @@
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+import sqlite3
+from datetime import datetime, timedelta
+import hashlib
+import os
+import queue
+import random
+import argparse
+import bisect
+import contextlib
+import functools
+import glob
+import json
+import mmap
+import string
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+
+DB_NAME = 'canteen.db'
+SCHEMA_VERSION = 10
+BG_IMAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'canteen1.png')
+RESIZE_DEBOUNCE_MS = 100
+STARTUP_FALLBACK_MS = 1000
+BUSY_TIMEOUT_MS = 5000
+WRITE_RETRIES = 4
+BUSY_MESSAGE = "Another till is saving right now, so nothing was changed. Please try again."
+RETRY_BASE_DELAY = 0.05
+LOCK_WAIT_MS = 10.0
+READ_POOL_SIZE = 4
+PAGE_SIZE = 200
+LOW_STOCK_THRESHOLD = 5
+KPI_RECONCILE_SECONDS = 300
+KPI_REFRESH_MS = 2000
+ORDER_STATUSES = ['Pending', 'Processing', 'Completed', 'Cancelled']
+OPEN_STATUSES = ('Pending', 'Processing')
+SLA_MINUTES = 15.0
+PRICE_RULE_KINDS = ['price', 'discount', 'combo']
+MINUTES_PER_WEEK = 7 * 24 * 60
+MENU_SORTS = {'id': 'id', 'name': 'item_name COLLATE NOCASE', 'price': 'price', 'quantity': 'quantity'}
+CUSTOMER_SORTS = {'id': 'c.id', 'name': 'c.name COLLATE NOCASE', 'phone': 'c.phone', 'visits': 's.visits',
+                  'spend': 's.spend', 'last_visit': 's.last_visit', 'favourite': 'm.item_name'}
+STAFF_SORTS = {'id': 'id', 'name': 'name COLLATE NOCASE', 'role': 'role', 'phone': 'phone'}
+INVENTORY_SORTS = {'id': 'id', 'name': 'item_name COLLATE NOCASE', 'quantity': 'quantity'}
+ORDER_SORTS = {'id': 'o.id', 'customer': 'o.customer_id', 'date': 'o.order_date', 'total': 'o.total_price',
+               'status': 'o.status'}
+BACKUP_DIR = 'backups'
+BACKUP_INTERVAL_MINUTES = 15.0
+BACKUP_KEEP = 8
+BACKUP_PAGES_PER_STEP = 64
+BACKUP_STEP_SLEEP = 0.005
+BACKUP_MAX_RESTARTS = 3
+RECEIPT_DIR = 'receipts'
+RECEIPT_FORMATS = ('txt', 'pdf', 'png')
+RECEIPT_WIDTH = 42
+RECEIPT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+RECEIPT_TEMPLATE = '''$title
+$order_line
+Customer: $customer
+Phone: $phone
+$rule
+$items
+$rule
+$total_line
+Status: $status
+$footer
+'''
+PHOTO_DIR = 'photos'
+THUMB_SIZES = (96, 192)
+TILE_SIZE = 96
+TILE_PAD = 8
+GRID_COLUMNS = 5
+THUMB_CACHE_TILES = 60
+THUMB_POLL_MS = 30
+JOURNAL_SUFFIX = '.journal'
+REPLAY_BATCH_ROWS = 100000
+INTEGRITY_BATCH_ROWS = 5000
+INTEGRITY_IDLE_MS = 2000
+INTEGRITY_IDLE_SECONDS = 30
+INTEGRITY_REST_MINUTES = 60
+INTEGRITY_SCAN_STEPS = 50
+INTEGRITY_PLAN_PATH = 'integrity_repair.sql'
+TOTAL_TOLERANCE = 0.0051
+SITES_PATH = 'sites.json'
+SITE_QUERY_WORKERS = 8
+SHARD_BUSY_TIMEOUT_MS = 500
+# Each check selects (row_id, detail) for the rowid range (?, ?] of its table.
+INTEGRITY_CHECKS = {
+    'order_items.order_id': ('order_items', '''
+        SELECT oi.id, json_object('order_id', oi.order_id, 'menu_id', oi.menu_id, 'quantity', oi.quantity,
+                                  'unit_price', oi.unit_price)
+        FROM order_items oi
+        WHERE oi.id > ? AND oi.id <= ? AND NOT EXISTS (SELECT 1 FROM orders o WHERE o.id = oi.order_id)
+    '''),
+    'order_items.menu_id': ('order_items', '''
+        SELECT oi.id, json_object('order_id', oi.order_id, 'menu_id', oi.menu_id, 'quantity', oi.quantity,
+                                  'unit_price', oi.unit_price)
+        FROM order_items oi
+        WHERE oi.id > ? AND oi.id <= ? AND NOT EXISTS (SELECT 1 FROM menu m WHERE m.id = oi.menu_id)
+    '''),
+    'orders.customer_id': ('orders', '''
+        SELECT o.id, json_object('customer_id', o.customer_id, 'order_date', o.order_date)
+        FROM orders o
+        WHERE o.id > ? AND o.id <= ? AND NOT EXISTS (SELECT 1 FROM customers c WHERE c.id = o.customer_id)
+    '''),
+    # Totals are only checked against prices recorded when the order was placed; orders with a line whose price
+    # was never recorded are reported under orders.price_unknown and never repaired.
+    'orders.total_price': ('orders', f'''
+        SELECT id, json_object('total_price', total_price, 'line_total', line_total)
+        FROM (SELECT o.id, o.total_price,
+                     (SELECT ROUND(COALESCE(SUM(oi.quantity * oi.unit_price), 0), 2)
+                      FROM order_items oi WHERE oi.order_id = o.id) AS line_total
+              FROM orders o
+              WHERE o.id > ? AND o.id <= ?
+                AND NOT EXISTS (SELECT 1 FROM order_items oi WHERE oi.order_id = o.id AND oi.unit_price IS NULL))
+        WHERE ABS(total_price - line_total) > {TOTAL_TOLERANCE}
+    '''),
+    'orders.price_unknown': ('orders', '''
+        SELECT o.id, json_object('total_price', o.total_price, 'unknown_lines', COUNT(*))
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id AND oi.unit_price IS NULL
+        WHERE o.id > ? AND o.id <= ?
+        GROUP BY o.id
+    '''),
+    'order_events.order_id': ('order_events', '''
+        SELECT e.id, json_object('order_id', e.order_id, 'status', e.status, 'event_time', e.event_time)
+        FROM order_events e
+        WHERE e.id > ? AND e.id <= ? AND NOT EXISTS (SELECT 1 FROM orders o WHERE o.id = e.order_id)
+    '''),
+    'price_rules.menu_id': ('price_rules', '''
+        SELECT r.id, json_object('name', r.name, 'menu_id', r.menu_id)
+        FROM price_rules r
+        WHERE r.id > ? AND r.id <= ? AND r.menu_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM menu m WHERE m.id = r.menu_id)
+    '''),
+    'price_rule_items.rule_id': ('price_rule_items', '''
+        SELECT i.rowid, json_object('rule_id', i.rule_id, 'menu_id', i.menu_id)
+        FROM price_rule_items i
+        WHERE i.rowid > ? AND i.rowid <= ? AND NOT EXISTS (SELECT 1 FROM price_rules r WHERE r.id = i.rule_id)
+    '''),
+    'price_rule_items.menu_id': ('price_rule_items', '''
+        SELECT i.rowid, json_object('rule_id', i.rule_id, 'menu_id', i.menu_id)
+        FROM price_rule_items i
+        WHERE i.rowid > ? AND i.rowid <= ? AND NOT EXISTS (SELECT 1 FROM menu m WHERE m.id = i.menu_id)
+    '''),
+}
+SLOW_QUERY_MS = 50.0
+PROFILE_SAMPLES = 2000
+QUERY_STATS_PATH = 'query_stats.json'
+UI_TRACE_PATH = 'ui_trace.json'
+UI_TRACE_EVENTS = 200000
+HEARTBEAT_MS = 20
+STALL_MS = 100.0
+
+def hash_password(password: str) -> str:
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def is_uri(target):
+    return target.startswith('file:')
+
+def is_memory_target(target):
+    return target == ':memory:' or target.startswith('file::memory:') or 'mode=memory' in target
+
+def readonly_uri(target):
+    if is_uri(target):
+        return target + ('&' if '?' in target else '?') + 'mode=ro'
+    import urllib.parse
+    return 'file:' + urllib.parse.quote(os.path.abspath(target)) + '?mode=ro'
+
+def like_prefix(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def prefix_range(prefix):
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def load_pil():
+    try:
+        from PIL import Image, ImageTk
+    except ImportError:
+        return None, None
+    return Image, ImageTk
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+class QueryProfiler:
+    EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+    def __init__(self, slow_ms=SLOW_QUERY_MS):
+        self.slow_ms = slow_ms
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.calls = {}
+        self.slow_queries = {}
+        self.listeners = []
+
+    @property
+    def current_method(self):
+        return getattr(self.local, 'method', None)
+
+    def enter(self, name):
+        previous = self.current_method
+        self.local.method = name
+        return previous
+
+    def leave(self, previous):
+        self.local.method = previous
+
+    def record_call(self, name, start, end, nested=False):
+        ms = (end - start) * 1000
+        for listener in self.listeners:
+            listener(name, start, end, nested)
+        with self.lock:
+            stats = self.calls.get(name)
+            if stats is None:
+                stats = self.calls[name] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                            'samples': deque(maxlen=PROFILE_SAMPLES)}
+            stats['count'] += 1
+            stats['total_ms'] += ms
+            stats['max_ms'] = max(stats['max_ms'], ms)
+            stats['samples'].append(ms)
+
+    def record_statement(self, conn, sql, params, ms):
+        if ms < self.slow_ms:
+            return
+        key = ' '.join(sql.split())
+        with self.lock:
+            entry = self.slow_queries.get(key)
+            if entry is None:
+                entry = self.slow_queries[key] = {'sql': key, 'method': self.current_method, 'count': 0,
+                                                  'total_ms': 0.0, 'max_ms': 0.0, 'plan': None, 'full_scan': False}
+            entry['count'] += 1
+            entry['total_ms'] += ms
+            entry['max_ms'] = max(entry['max_ms'], ms)
+            needs_plan = entry['plan'] is None
+        if needs_plan and key.upper().startswith(self.EXPLAINABLE):
+            plan = self.explain(conn, sql, params)
+            with self.lock:
+                entry['plan'] = plan
+                entry['full_scan'] = any(detail.startswith('SCAN') and 'USING' not in detail for detail in plan)
+
+    def explain(self, conn, sql, params):
+        # A plain cursor keeps the EXPLAIN itself out of the statistics.
+        try:
+            rows = sqlite3.Cursor(conn).execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+        except sqlite3.Error as e:
+            return [f"EXPLAIN failed: {e}"]
+        return [row[-1] for row in rows]
+
+    def summary(self):
+        with self.lock:
+            methods = {}
+            for name, stats in self.calls.items():
+                samples = sorted(stats['samples'])
+                methods[name] = {
+                    'count': stats['count'],
+                    'total_ms': round(stats['total_ms'], 3),
+                    'mean_ms': round(stats['total_ms'] / stats['count'], 3),
+                    'p50_ms': round(percentile(samples, 0.50), 3),
+                    'p95_ms': round(percentile(samples, 0.95), 3),
+                    'p99_ms': round(percentile(samples, 0.99), 3),
+                    'max_ms': round(stats['max_ms'], 3),
+                }
+            slow = sorted((dict(entry) for entry in self.slow_queries.values()),
+                          key=lambda entry: entry['total_ms'], reverse=True)
+        return {'slow_query_ms': self.slow_ms, 'methods': methods, 'slow_queries': slow}
+
+    def dump(self, path=QUERY_STATS_PATH, extra=None):
+        with open(path, 'w') as f:
+            json.dump({**self.summary(), **(extra or {})}, f, indent=2)
+        return path
+
+class ProfiledCursor(sqlite3.Cursor):
+    # SELECT timings include the first fetch, which is where SQLite does most of a scan's work.
+    pending = None
+
+    def execute(self, sql, params=()):
+        self.flush()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self.pending = (sql, params, time.perf_counter() - start)
+            if self.description is None:
+                self.flush()
+
+    def executemany(self, sql, seq_of_params):
+        self.flush()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            self.connection.profiler.record_statement(self.connection, sql, (), (time.perf_counter() - start) * 1000)
+
+    def fetchone(self):
+        return self.timed_fetch(super().fetchone)
+
+    def fetchall(self):
+        return self.timed_fetch(super().fetchall)
+
+    def timed_fetch(self, fetch):
+        start = time.perf_counter()
+        try:
+            return fetch()
+        finally:
+            if self.pending:
+                sql, params, elapsed = self.pending
+                self.pending = (sql, params, elapsed + time.perf_counter() - start)
+                self.flush()
+
+    def flush(self):
+        if self.pending:
+            sql, params, elapsed = self.pending
+            self.pending = None
+            self.connection.profiler.record_statement(self.connection, sql, params, elapsed * 1000)
+
+class ProfiledConnection(sqlite3.Connection):
+    profiler = None
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+def profiled(method):
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profiler = self.profiler
+        if profiler is None:
+            return method(self, *args, **kwargs)
+        previous = profiler.enter(name)
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            profiler.record_call(name, start, time.perf_counter(), nested=previous is not None)
+            profiler.leave(previous)
+    return wrapper
+
+class Journal:
+    # File layout: MAGIC, then records of HEADER (payload length, crc32, unix time, kind) followed by a JSON payload.
+    MAGIC = b'CNTJRNL1'
+    HEADER = struct.Struct('<IIdB')
+    TRANSACTION, BASE, ABORT = 0, 1, 2
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.lock = threading.Lock()
+        self.closed = False
+        self.stats = {'records': 0, 'bytes': 0, 'fsyncs': 0}
+
+    def is_empty(self):
+        return self.size() == 0
+
+    def size(self):
+        return os.fstat(self.fd).st_size
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view):]
+
+    def append(self, payload, kind=TRANSACTION):
+        frame = self.HEADER.pack(len(payload), zlib.crc32(payload), time.time(), kind) + payload
+        with self.lock:
+            if kind == self.BASE and self.is_empty():
+                frame = self.MAGIC + frame
+            self.write(frame)
+            self.stats['records'] += 1
+            self.stats['bytes'] += len(frame)
+            # Appends only happen under the database write lock, so the file end is this record's end on every till.
+            return self.size()
+
+    def sync(self):
+        os.fsync(self.fd)
+        self.stats['fsyncs'] += 1
+
+    def commit(self, payload, kind=TRANSACTION):
+        end = self.append(payload, kind)
+        self.sync()
+        return end
+
+    def abort(self):
+        # Always written straight after the record it cancels, while the database write lock is still held.
+        return self.commit(b'', self.ABORT)
+
+    def kinds_after(self, offset):
+        # Kinds of the records from offset to the end of the file, or None if they end in a torn write.
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        kinds = []
+        position = 0
+        while position < len(data):
+            if position + self.HEADER.size > len(data):
+                return None
+            length, crc, _, kind = self.HEADER.unpack_from(data, position)
+            payload = data[position + self.HEADER.size:position + self.HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return None
+            kinds.append(kind)
+            position += self.HEADER.size + length
+        return kinds
+
+    def truncate(self, size):
+        with self.lock:
+            os.ftruncate(self.fd, size)
+            self.sync()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        os.fsync(self.fd)
+        os.close(self.fd)
+
+def read_journal(path, until=None):
+    # Streams (kind, time, payload) through a memory map; a torn record at the tail from a crash ends the stream.
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size <= len(Journal.MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            if view[:len(Journal.MAGIC)] != Journal.MAGIC:
+                raise ValueError(f"{path} is not a canteen journal")
+            offset = len(Journal.MAGIC)
+            size = len(view)
+            pending = None
+            while offset + Journal.HEADER.size <= size:
+                length, crc, stamp, kind = Journal.HEADER.unpack_from(view, offset)
+                start = offset + Journal.HEADER.size
+                payload = view[start:start + length]
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    print(f"Journal ends with a damaged record at byte {offset}; stopping there")
+                    break
+                offset = start + length
+                if kind == Journal.ABORT:
+                    pending = None
+                    continue
+                if pending is not None:
+                    yield pending
+                    pending = None
+                if until is not None and stamp > until:
+                    break
+                pending = (kind, stamp, payload)
+            if pending is not None:
+                yield pending
+
+def replay_journal(path, target, until=None):
+    CanteenDB(target, read_pool_size=0).conn.close()
+    conn = sqlite3.connect(target)
+    start = time.perf_counter()
+    try:
+        # The output is a new file that can simply be rebuilt, so skip syncing until the final commit.
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.execute('PRAGMA journal_mode = MEMORY')
+        conn.execute('BEGIN')
+        columns = {name: {row[1] for row in conn.execute(f'PRAGMA table_info("{name}")')}
+                   for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")}
+        # The base record carries every row, so the sample data a new database starts with must go first.
+        for name in columns:
+            conn.execute(f'DELETE FROM "{name}"')
+        statements = {}
+        latest = {}
+        records = changes = 0
+
+        def flush():
+            # Only the last change to each row in the window is written; REPLACE also clears any UNIQUE clash
+            # with a row whose own delete lands later in the same flush.
+            batches = {}
+            for (table, rowid), data in latest.items():
+                if data is None:
+                    batches.setdefault((f'DELETE FROM "{table}" WHERE rowid=?', None), []).append((rowid,))
+                    continue
+                key = (table, tuple(data))
+                if key not in statements:
+                    names = [name for name in data if name in columns[table]]
+                    quoted = ''.join(f', "{name}"' for name in names)
+                    statements[key] = (f'INSERT OR REPLACE INTO "{table}" (rowid{quoted}) VALUES (?{", ?" * len(names)})',
+                                       tuple(names))
+                sql, names = statements[key]
+                batches.setdefault((sql, names), []).append([rowid] + [data[name] for name in names])
+            for (sql, _), rows in batches.items():
+                conn.executemany(sql, rows)
+            latest.clear()
+
+        for kind, stamp, payload in read_journal(path, until):
+            record = json.loads(payload)
+            records += 1
+            for name, sql in record.get('tables', {}).items():
+                if name not in columns:
+                    conn.execute(sql)
+                    columns[name] = {row[1] for row in conn.execute(f'PRAGMA table_info("{name}")')}
+            for table, op, rowid, data in record['changes']:
+                latest[table, rowid] = data
+            changes += len(record['changes'])
+            if len(latest) >= REPLAY_BATCH_ROWS:
+                flush()
+        flush()
+        conn.commit()
+    finally:
+        conn.close()
+    return {'records': records, 'changes': changes, 'seconds': round(time.perf_counter() - start, 3)}
+
+def journal_history(path, table, rowid=None, since=None, until=None):
+    # A cheap byte search skips records that never touched the table before any JSON is parsed.
+    needle = f'["{table}",'.encode()
+    for kind, stamp, payload in read_journal(path, until):
+        if (since is not None and stamp < since) or needle not in payload:
+            continue
+        record = json.loads(payload)
+        for changed_table, op, changed_rowid, data in record['changes']:
+            if changed_table == table and (rowid is None or changed_rowid == rowid):
+                yield stamp, record.get('op'), record.get('actor'), op, changed_rowid, data
+
+class DatabaseBusyError(sqlite3.OperationalError):
+    pass
+
+class OutOfStockError(Exception):
+    pass
+
+def is_busy_error(error):
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error)
+    return 'locked' in message or 'busy' in message
+
+def write_transaction(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.write_depth:
+            return method(self, *args, **kwargs)
+        for attempt in range(self.write_retries + 1):
+            self.journal_appended = False
+            try:
+                start = time.perf_counter()
+                self.conn.execute('BEGIN IMMEDIATE')
+                self.record_lock_wait(time.perf_counter() - start)
+                self.commit_hooks = []
+                self.write_depth += 1
+                try:
+                    result = method(self, *args, **kwargs)
+                finally:
+                    self.write_depth -= 1
+                if self.journal is not None:
+                    self.journal_transaction(method.__name__)
+                self.conn.commit()
+                self.journal_appended = False
+                for hook in self.commit_hooks:
+                    hook()
+                return result
+            except sqlite3.OperationalError as e:
+                self.abandon_transaction()
+                if not is_busy_error(e):
+                    raise
+                self.record_lock_wait(time.perf_counter() - start, acquired=False)
+                if attempt == self.write_retries:
+                    self.lock_stats['failures'] += 1
+                    raise DatabaseBusyError(f"database is busy after {attempt + 1} attempts: {e}") from e
+                self.lock_stats['retries'] += 1
+                time.sleep(random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt))
+            except BaseException:
+                self.abandon_transaction()
+                raise
+    return wrapper
+
+class UIProfiler:
+    def __init__(self, root, stall_ms=STALL_MS, heartbeat_ms=HEARTBEAT_MS):
+        self.root = root
+        self.stall_ms = stall_ms
+        self.heartbeat_ms = heartbeat_ms
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.events = deque(maxlen=UI_TRACE_EVENTS)
+        self.open_spans = []
+        self.screen = None
+        self.stall_count = 0
+        self.longest_stall_ms = 0.0
+        self.expected_beat = None
+
+    def add_event(self, name, cat, start, end, args=None, counted=True):
+        event = {'name': name, 'cat': cat, 'ph': 'X', 'pid': self.pid, 'tid': threading.get_ident(),
+                 'ts': round((start - self.origin) * 1e6), 'dur': round((end - start) * 1e6)}
+        if args:
+            event['args'] = args
+        with self.lock:
+            self.events.append(event)
+            if counted and cat in ('db', 'image'):
+                for totals in self.open_spans:
+                    totals[cat] += end - start
+
+    def db_call(self, name, start, end, nested=False):
+        # A call made from inside another profiled call is already part of the outer call's time.
+        self.add_event(name, 'db', start, end, counted=not nested)
+
+    def span(self, name, cat, func, *args, **kwargs):
+        if cat == 'screen':
+            self.screen = name
+        totals = {'db': 0.0, 'image': 0.0}
+        with self.lock:
+            self.open_spans.append(totals)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            end = time.perf_counter()
+            with self.lock:
+                self.open_spans.remove(totals)
+            details = None
+            if cat == 'screen':
+                details = {'db_ms': round(totals['db'] * 1000, 3),
+                           'image_ms': round(totals['image'] * 1000, 3),
+                           'widget_ms': round((end - start - totals['db'] - totals['image']) * 1000, 3)}
+            self.add_event(name, cat, start, end, details)
+
+    def start_heartbeat(self):
+        self.expected_beat = time.perf_counter() + self.heartbeat_ms / 1000
+        self.root.after(self.heartbeat_ms, self.beat)
+
+    def beat(self):
+        now = time.perf_counter()
+        late_ms = (now - self.expected_beat) * 1000
+        if late_ms > self.stall_ms:
+            self.stall_count += 1
+            self.longest_stall_ms = max(self.longest_stall_ms, late_ms)
+            self.add_event('stall', 'stall', self.expected_beat, now,
+                           {'late_ms': round(late_ms, 3), 'screen': self.screen})
+        self.start_heartbeat()
+
+    def dump(self, path=UI_TRACE_PATH):
+        with self.lock:
+            events = list(self.events)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+                       'otherData': {'stall_count': self.stall_count,
+                                     'longest_stall_ms': round(self.longest_stall_ms, 3)}}, f)
+        return path
+
+def traced(cat):
+    def decorator(method):
+        name = method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.ui_profiler is None:
+                return method(self, *args, **kwargs)
+            return self.ui_profiler.span(name, cat, method, self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+class BackupRestartLimit(Exception):
+    pass
+
+class BackupScheduler:
+    def __init__(self, source=DB_NAME, directory=BACKUP_DIR, interval_minutes=BACKUP_INTERVAL_MINUTES,
+                 keep=BACKUP_KEEP, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP,
+                 max_restarts=BACKUP_MAX_RESTARTS):
+        if source == ':memory:':
+            raise ValueError("A private :memory: database cannot be backed up from another connection")
+        self.source = source
+        self.directory = directory
+        self.interval = interval_minutes * 60
+        self.keep = keep
+        self.pages = pages
+        self.sleep = sleep
+        self.max_restarts = max_restarts
+        self.reports = deque(maxlen=50)
+        self.wake = threading.Event()
+        self.stopping = False
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='canteen-backup', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping = True
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def trigger(self):
+        self.wake.set()
+
+    def run(self):
+        while True:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            if self.stopping:
+                return
+            try:
+                self.backup_once()
+            except Exception as e:
+                self.reports.append({'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'error': str(e)})
+
+    def snapshots(self):
+        return sorted(glob.glob(os.path.join(self.directory, 'canteen-*.db')))
+
+    def corrupt_snapshots(self):
+        return sorted(glob.glob(os.path.join(self.directory, 'canteen-*.db.corrupt')))
+
+    def backup_once(self):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now()
+        path = os.path.join(self.directory, stamp.strftime('canteen-%Y%m%d-%H%M%S-%f.db'))
+        partial = path + '.part'
+        steps = []
+        state = {'last': None, 'remaining': None, 'restarts': 0, 'busy_steps': 0}
+
+        def progress(status, remaining, total):
+            # Each step holds a read lock on the source; the longest step bounds how long a writer waited on us.
+            steps.append(time.perf_counter() - state['last'])
+            if status in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED):
+                state['busy_steps'] += 1
+            if state['remaining'] is not None and remaining > state['remaining']:
+                state['restarts'] += 1
+                # Every write from another connection sends the step-wise copy back to the first page, so a
+                # steady stream of orders could keep it restarting for ever.
+                if state['restarts'] > self.max_restarts:
+                    raise BackupRestartLimit
+            state['remaining'] = remaining
+            # sqlite3's own sleep only applies on BUSY, so yield here to let writers in between steps.
+            if remaining:
+                time.sleep(self.sleep)
+            state['last'] = time.perf_counter()
+
+        src = sqlite3.connect(self.source if is_uri(self.source) else readonly_uri(self.source), uri=True)
+        dest = sqlite3.connect(partial)
+        try:
+            start = time.perf_counter()
+            state['last'] = start
+            try:
+                src.backup(dest, pages=self.pages, progress=progress, sleep=self.sleep)
+                single_step = False
+            except BackupRestartLimit:
+                # Copy everything in one step instead. It holds a single read transaction, which WAL writers do not
+                # wait for, and nothing can restart it part way.
+                state['remaining'] = None
+                src.backup(dest, pages=-1, progress=progress)
+                single_step = True
+            elapsed = time.perf_counter() - start
+            page_count = dest.execute('PRAGMA page_count').fetchone()[0]
+            page_size = dest.execute('PRAGMA page_size').fetchone()[0]
+            integrity = dest.execute('PRAGMA integrity_check').fetchone()[0]
+        finally:
+            src.close()
+            dest.close()
+
+        if integrity == 'ok':
+            os.replace(partial, path)
+        else:
+            os.replace(partial, path + '.corrupt')
+        size = page_count * page_size
+        report = {
+            'time': stamp.strftime('%Y-%m-%d %H:%M:%S'),
+            'path': path if integrity == 'ok' else path + '.corrupt',
+            'bytes': size,
+            'seconds': round(elapsed, 4),
+            'mb_per_s': round(size / elapsed / 1e6, 2) if elapsed else 0.0,
+            'steps': len(steps),
+            'longest_step_ms': round(max(steps) * 1000, 3) if steps else 0.0,
+            'busy_steps': state['busy_steps'],
+            'restarts': state['restarts'],
+            'single_step': single_step,
+            'integrity': integrity,
+        }
+        self.reports.append(report)
+        # Corrupt copies are kept for inspection, but no more of them than good snapshots, so they cannot pile up.
+        for old in self.snapshots()[:-self.keep] + self.corrupt_snapshots()[:-self.keep]:
+            os.remove(old)
+        return report
+
+def parse_hhmm(text):
+    hours, minutes = text.split(':')
+    value = int(hours) * 60 + int(minutes)
+    if not 0 <= value <= 24 * 60 or not 0 <= int(minutes) < 60:
+        raise ValueError(f"invalid time {text!r}")
+    return value
+
+def minute_of_week(when):
+    return when.weekday() * 24 * 60 + when.hour * 60 + when.minute
+
+def rule_intervals(days, start_time, end_time):
+    start, end = parse_hhmm(start_time), parse_hhmm(end_time)
+    intervals = []
+    for day in days:
+        base = int(day) * 24 * 60
+        if start < end:
+            intervals.append((base + start, base + end))
+        else:
+            # Windows such as 22:00-02:00 run past midnight into the next day.
+            intervals.append((base + start, base + 24 * 60))
+            following = (base + 24 * 60) % MINUTES_PER_WEEK
+            if end:
+                intervals.append((following, following + end))
+    return intervals
+
+class PricingEngine:
+    # Rules are flattened once into per-item tables of (segment start, adjustment) over the minute of the week,
+    # so pricing a cart line is a bisect instead of an evaluation of every rule.
+    def __init__(self, rules, combo_items):
+        windows = {}
+        combos = []
+        for rule_id, kind, menu_id, value, days, start_time, end_time in rules:
+            intervals = rule_intervals(days, start_time, end_time)
+            if kind == 'combo':
+                items = combo_items.get(rule_id, {})
+                if items:
+                    combos.append((rule_id, value, items, self.compile(intervals, lambda active: bool(active))))
+                continue
+            for lo, hi in intervals:
+                windows.setdefault(menu_id, []).append((lo, hi, kind, value))
+        global_windows = windows.pop(None, [])
+        self.default = self.compile_item(global_windows)
+        self.tables = {menu_id: self.compile_item(item_windows + global_windows)
+                       for menu_id, item_windows in windows.items()}
+        self.combos = combos
+
+    @staticmethod
+    def compile(windows, evaluate):
+        points = sorted({0} | {lo for lo, *_ in windows} | {hi for _, hi, *_ in windows if hi < MINUTES_PER_WEEK})
+        starts, values = [], []
+        for point in points:
+            value = evaluate([window for window in windows if window[0] <= point < window[1]])
+            if values and values[-1] == value:
+                continue
+            starts.append(point)
+            values.append(value)
+        return starts, values
+
+    def compile_item(self, windows):
+        def adjustment(active):
+            fixed = [value for _, _, kind, value in active if kind == 'price']
+            discount = max((value for _, _, kind, value in active if kind == 'discount'), default=0.0)
+            return (min(fixed) if fixed else None, discount)
+        return self.compile(windows, adjustment)
+
+    @staticmethod
+    def lookup(table, when):
+        starts, values = table
+        return values[bisect.bisect_right(starts, minute_of_week(when)) - 1]
+
+    def unit_price(self, menu_id, base_price, when):
+        fixed, discount = self.lookup(self.tables.get(menu_id, self.default), when)
+        price = base_price if fixed is None else fixed
+        return round(price * (1 - discount / 100), 4)
+
+    def price_cart(self, lines, when):
+        units = [self.unit_price(menu_id, base_price, when) for menu_id, _, base_price in lines]
+        unit_by_item = {menu_id: unit for (menu_id, _, _), unit in zip(lines, units)}
+        remaining = {}
+        for menu_id, quantity, _ in lines:
+            remaining[menu_id] = remaining.get(menu_id, 0) + quantity
+        savings = {}
+        for _, bundle_price, items, table in self.combos:
+            if not self.lookup(table, when):
+                continue
+            times = min(remaining.get(menu_id, 0) // quantity for menu_id, quantity in items.items())
+            regular = sum(unit_by_item.get(menu_id, 0) * quantity for menu_id, quantity in items.items())
+            if not times or bundle_price >= regular:
+                continue
+            for menu_id, quantity in items.items():
+                remaining[menu_id] -= times * quantity
+                share = unit_by_item[menu_id] * quantity / regular
+                savings[menu_id] = savings.get(menu_id, 0.0) + times * (regular - bundle_price) * share
+        totals = {}
+        for menu_id, quantity, _ in lines:
+            totals[menu_id] = totals.get(menu_id, 0) + quantity
+        # A bundle's saving is spread over every cart line of the items it used, by quantity.
+        return [round(unit - savings.get(menu_id, 0.0) / totals[menu_id], 4)
+                for (menu_id, _, _), unit in zip(lines, units)]
+
+@functools.lru_cache(maxsize=None)
+def receipt_template(path=None):
+    if path is None:
+        return string.Template(RECEIPT_TEMPLATE)
+    with open(path, encoding='utf-8') as f:
+        return string.Template(f.read())
+
+@functools.lru_cache(maxsize=None)
+def receipt_font():
+    Image, _ = load_pil()
+    if Image is None:
+        return None
+    from PIL import ImageFont
+    return ImageFont.load_default()
+
+def justify(left, right, width=RECEIPT_WIDTH):
+    return left + ' ' * max(1, width - len(left) - len(right)) + right
+
+def render_receipt_text(order, items, template_path=None):
+    order_id, customer, phone, order_date, total_price, status = order
+    lines = []
+    for _, item_name, quantity, unit_price in items:
+        if unit_price is None:
+            amount = f"{quantity} x price n/a"
+        else:
+            amount = f"{quantity} x {unit_price:.2f} {quantity * unit_price:>8.2f}"
+        lines.append(justify((item_name or 'Unknown item')[:RECEIPT_WIDTH - len(amount) - 1], amount))
+    return receipt_template(template_path).safe_substitute(
+        title="CANTEEN MANAGEMENT SYSTEM".center(RECEIPT_WIDTH).rstrip(),
+        order_line=justify(f"Order #{order_id}", order_date),
+        customer=customer or '', phone=phone or '', rule='-' * RECEIPT_WIDTH,
+        items='\n'.join(lines), total_line=justify("TOTAL", f"{total_price:.2f}"), status=status,
+        footer="Thank you!".center(RECEIPT_WIDTH).rstrip())
+
+def render_receipt_pdf(text):
+    # A single-page PDF using the built-in Courier font, sized for 80 mm thermal paper.
+    lines = text.splitlines()
+    height = 24 + 10 * len(lines)
+    body = ' '.join('(' + line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') + ') Tj T*'
+                    for line in lines)
+    stream = f"BT /F1 8 Tf 10 TL 12 {height - 16} Td {body} ET".encode('latin-1', 'replace')
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>",
+               b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+               f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 226 {height}] "
+               f"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>".encode(),
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>",
+               b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b''.join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+def render_receipt_png(text, path):
+    font = receipt_font()
+    if font is None:
+        return False
+    from PIL import Image, ImageDraw
+    lines = text.splitlines()
+    image = Image.new('L', (RECEIPT_WIDTH * 7 + 16, len(lines) * 14 + 16), 255)
+    draw = ImageDraw.Draw(image)
+    for row, line in enumerate(lines):
+        draw.text((8, 8 + row * 14), line, fill=0, font=font)
+    image.save(path, 'PNG')
+    return True
+
+def write_atomic(path, data):
+    # Printers and image loaders only ever see finished files: write beside the target and rename into place.
+    partial = path + '.part'
+    with open(partial, 'wb') as f:
+        f.write(data)
+    os.replace(partial, path)
+
+def render_receipt(job):
+    order, items, directory, formats, template_path = job
+    text = render_receipt_text(order, items, template_path)
+    base = os.path.join(directory, f"receipt-{order[0]:08d}")
+    paths = []
+    if 'txt' in formats:
+        write_atomic(base + '.txt', text.encode('utf-8'))
+        paths.append(base + '.txt')
+    if 'pdf' in formats:
+        write_atomic(base + '.pdf', render_receipt_pdf(text))
+        paths.append(base + '.pdf')
+    if 'png' in formats and render_receipt_png(text, base + '.png.part'):
+        os.replace(base + '.png.part', base + '.png')
+        paths.append(base + '.png')
+    return paths
+
+class LazyThreadPool:
+    # concurrent.futures takes longer to import than the login form takes to build, so pools start on first use.
+    def __init__(self, workers, name):
+        self.workers = workers
+        self.name = name
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        with self.lock:
+            if self.executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        return self.executor.submit(fn, *args)
+
+    def shutdown(self, wait=True):
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+
+class ReceiptSpool:
+    def __init__(self, directory=RECEIPT_DIR, formats=RECEIPT_FORMATS, workers=RECEIPT_WORKERS, template_path=None):
+        self.directory = directory
+        self.formats = tuple(formats)
+        self.workers = workers
+        self.template_path = template_path
+        # Single receipts render on one background thread so the till returns immediately after saving.
+        self.executor = LazyThreadPool(1, 'canteen-receipt')
+
+    def job(self, order, items):
+        return (order, items, self.directory, self.formats, self.template_path)
+
+    def render(self, order, items):
+        os.makedirs(self.directory, exist_ok=True)
+        return render_receipt(self.job(order, items))
+
+    def submit(self, order, items):
+        return self.executor.submit(self.render, order, items)
+
+    def render_batch(self, receipts):
+        os.makedirs(self.directory, exist_ok=True)
+        jobs = [self.job(order, items) for order, items in receipts]
+        # Text and PDF render faster inline than a spawned pool can start; only rasterising PNGs is worth the processes.
+        if self.workers <= 1 or len(jobs) < 2 * self.workers or 'png' not in self.formats or receipt_font() is None:
+            return [render_receipt(job) for job in jobs]
+        # Spawned workers never inherit Tk or open database handles; each caches its own template and font.
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            return list(pool.map(render_receipt, jobs, chunksize=max(1, len(jobs) // (self.workers * 4))))
+
+    def submit_batch(self, receipts):
+        return self.executor.submit(self.render_batch, receipts)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+def thumb_bucket(size):
+    return next((bucket for bucket in THUMB_SIZES if bucket >= size), THUMB_SIZES[-1])
+
+def thumb_path(directory, key, size):
+    return os.path.join(directory, 'thumbs', str(thumb_bucket(size)), os.path.splitext(key)[0] + '.png')
+
+def make_thumbnail(directory, key, size):
+    Image, _ = load_pil()
+    bucket = thumb_bucket(size)
+    path = thumb_path(directory, key, bucket)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with Image.open(os.path.join(directory, 'originals', key)) as image:
+        # JPEG photos decode straight at a reduced scale instead of full camera resolution.
+        image.draft('RGB', (bucket, bucket))
+        thumb = image.convert('RGB')
+        thumb.thumbnail((bucket, bucket), Image.Resampling.LANCZOS)
+        thumb.save(path + '.part', 'PNG')
+    os.replace(path + '.part', path)
+    return path
+
+def store_photo(source, directory=PHOTO_DIR):
+    Image, _ = load_pil()
+    if Image is None:
+        raise RuntimeError("Pillow is required for menu photos")
+    with Image.open(source) as image:
+        image.verify()
+    with open(source, 'rb') as f:
+        data = f.read()
+    # Photos are keyed by content, so re-uploading the same file reuses its original and thumbnails.
+    key = hashlib.sha1(data).hexdigest()[:16] + os.path.splitext(source)[1].lower()
+    original = os.path.join(directory, 'originals', key)
+    if not os.path.exists(original):
+        os.makedirs(os.path.dirname(original), exist_ok=True)
+        write_atomic(original, data)
+    for bucket in THUMB_SIZES:
+        if not os.path.exists(thumb_path(directory, key, bucket)):
+            make_thumbnail(directory, key, bucket)
+    return key
+
+class ThumbnailCache:
+    # Thumbnails decode on worker threads; PhotoImage objects are made on the Tk thread and only the
+    # most recently shown ones are kept.
+    def __init__(self, root, directory=PHOTO_DIR, size=TILE_SIZE, capacity=THUMB_CACHE_TILES):
+        self.root = root
+        self.directory = directory
+        self.size = size
+        self.capacity = capacity
+        self.photos = OrderedDict()
+        self.waiting = {}
+        self.decoded = queue.Queue()
+        self.executor = LazyThreadPool(2, 'canteen-thumb')
+        self.poll_job = None
+        self.stats = {'hits': 0, 'decodes': 0, 'evictions': 0}
+
+    def get(self, key, callback):
+        photo = self.photos.get(key)
+        if photo is not None:
+            self.photos.move_to_end(key)
+            self.stats['hits'] += 1
+            callback(photo)
+            return
+        if key in self.waiting:
+            self.waiting[key].append(callback)
+            return
+        self.waiting[key] = [callback]
+        self.executor.submit(self.decode, key)
+        if self.poll_job is None:
+            self.poll_job = self.root.after(THUMB_POLL_MS, self.poll)
+
+    def decode(self, key):
+        Image, _ = load_pil()
+        image = None
+        if Image is not None:
+            try:
+                path = thumb_path(self.directory, key, self.size)
+                if not os.path.exists(path):
+                    make_thumbnail(self.directory, key, self.size)
+                image = Image.open(path)
+                image.load()
+            except Exception as e:
+                print(f"Error loading thumbnail {key}: {e}")
+                image = None
+        self.decoded.put((key, image))
+
+    def poll(self):
+        self.poll_job = None
+        _, ImageTk = load_pil()
+        while True:
+            try:
+                key, image = self.decoded.get_nowait()
+            except queue.Empty:
+                break
+            callbacks = self.waiting.pop(key, [])
+            if image is None:
+                continue
+            self.stats['decodes'] += 1
+            photo = ImageTk.PhotoImage(image)
+            self.photos[key] = photo
+            for callback in callbacks:
+                callback(photo)
+        while len(self.photos) > self.capacity:
+            self.photos.popitem(last=False)
+            self.stats['evictions'] += 1
+        if self.waiting:
+            self.poll_job = self.root.after(THUMB_POLL_MS, self.poll)
+
+class KpiCounters:
+    def __init__(self, low_stock_threshold=LOW_STOCK_THRESHOLD):
+        self.low_stock_threshold = low_stock_threshold
+        self.lock = threading.Lock()
+        self.day = None
+        self.orders = 0
+        self.revenue = 0.0
+        self.pending = 0
+        self.low_stock = set()
+        self.reconciled_at = None
+
+    def seed(self, day, orders, revenue, pending, low_stock):
+        with self.lock:
+            self.day = day
+            self.orders = orders
+            self.revenue = revenue
+            self.pending = pending
+            self.low_stock = set(low_stock)
+            self.reconciled_at = datetime.now()
+
+    def order_placed(self, order_date, total_price, status):
+        with self.lock:
+            self.pending += status == 'Pending'
+            if order_date[:10] == self.day and status != 'Cancelled':
+                self.orders += 1
+                self.revenue += total_price
+
+    def status_changed(self, order_date, total_price, old_status, new_status):
+        with self.lock:
+            self.pending += (new_status == 'Pending') - (old_status == 'Pending')
+            if order_date[:10] == self.day:
+                counted = (new_status != 'Cancelled') - (old_status != 'Cancelled')
+                self.orders += counted
+                self.revenue += counted * total_price
+
+    def order_modified(self, order_date, old_total, new_total, status):
+        with self.lock:
+            if order_date[:10] == self.day and status != 'Cancelled':
+                self.revenue += new_total - old_total
+
+    def stock_changed(self, table, item_id, quantity):
+        with self.lock:
+            if quantity is not None and quantity < self.low_stock_threshold:
+                self.low_stock.add((table, item_id))
+            else:
+                self.low_stock.discard((table, item_id))
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'day': self.day,
+                'revenue': round(self.revenue, 2),
+                'orders': self.orders,
+                'average_ticket': round(self.revenue / self.orders, 2) if self.orders else 0.0,
+                'pending': self.pending,
+                'low_stock': len(self.low_stock),
+                'reconciled_at': self.reconciled_at,
+            }
+
+PRICE_RULES_BUMP = ('INSERT INTO price_rules_version (id, version) VALUES (1, 1) '
+                    'ON CONFLICT(id) DO UPDATE SET version = version + 1;')
+
+def sql_literal(value):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+def repair_statements(check, row_id, detail):
+    # Lines and events that lost their parent cannot be re-attached, so they are deleted (the journal keeps them);
+    # missing parents that other rows still need are recreated as clearly marked placeholders.
+    if check == 'order_items.order_id':
+        return [f"DELETE FROM order_items WHERE id = {row_id};"]
+    if check == 'order_items.menu_id':
+        menu_id = detail['menu_id']
+        # Priced from the last price this item was actually sold at, never from a legacy line without one.
+        return [f"INSERT OR IGNORE INTO menu (id, item_name, price, quantity) SELECT {menu_id}, "
+                f"{sql_literal(f'Deleted item #{menu_id}')}, COALESCE((SELECT unit_price FROM order_items "
+                f"WHERE menu_id = {menu_id} AND unit_price IS NOT NULL ORDER BY id DESC LIMIT 1), 0.0), 0;"]
+    if check == 'orders.customer_id':
+        customer_id = detail['customer_id']
+        return [f"INSERT OR IGNORE INTO customers (id, name, phone) VALUES "
+                f"({customer_id}, {sql_literal(f'Unknown customer #{customer_id}')}, '');",
+                # search_customers inner-joins customer_summary, so the placeholder needs its row too.
+                f"INSERT OR IGNORE INTO customer_summary (customer_id, visits, spend, last_visit) "
+                f"SELECT {customer_id}, COUNT(*), ROUND(COALESCE(SUM(total_price), 0), 2), MAX(order_date) "
+                f"FROM orders WHERE customer_id = {customer_id} AND status != 'Cancelled';"]
+    if check == 'orders.total_price':
+        # Guarded by the old total so a stale plan cannot overwrite an order that has changed since the scan.
+        return [f"UPDATE orders SET total_price = {sql_literal(detail['line_total'])} "
+                f"WHERE id = {row_id} AND total_price = {sql_literal(detail['total_price'])};",
+                f"UPDATE customer_summary SET spend = (SELECT ROUND(COALESCE(SUM(o.total_price), 0), 2) FROM orders o "
+                f"WHERE o.customer_id = customer_summary.customer_id AND o.status != 'Cancelled') "
+                f"WHERE customer_id = (SELECT customer_id FROM orders WHERE id = {row_id});"]
+    if check == 'orders.price_unknown':
+        return []
+    if check == 'order_events.order_id':
+        return [f"DELETE FROM order_events WHERE id = {row_id};"]
+    if check == 'price_rules.menu_id':
+        return [f"DELETE FROM price_rule_items WHERE rule_id = {row_id};",
+                f"DELETE FROM price_rules WHERE id = {row_id};", PRICE_RULES_BUMP]
+    return [f"DELETE FROM price_rule_items WHERE rowid = {row_id};", PRICE_RULES_BUMP]
+
+def repair_plan_sql(issues, source):
+    lines = [f"-- Repair plan for {source}, generated {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+             f"-- {len(issues)} issues. Review every statement and delete any you do not want,",
+             "-- then apply it with: check-integrity --apply PATH", '']
+    seen = set()
+    for check, row_id, detail, found_at in issues:
+        detail = json.loads(detail)
+        lines.append(f"-- {check} row {row_id}, found {found_at}: {json.dumps(detail)}")
+        statements = repair_statements(check, row_id, detail)
+        if not statements:
+            lines.append("--   (reported only; the recorded total is kept)")
+        for statement in statements:
+            if statement in seen:
+                lines.append("--   (already planned above)")
+            else:
+                seen.add(statement)
+                lines.append(statement)
+    return '\n'.join(lines) + '\n'
+
+def split_sql_script(text):
+    statements = []
+    pending = ''
+    for line in text.splitlines():
+        if not pending and (not line.strip() or line.lstrip().startswith('--')):
+            continue
+        pending += line + '\n'
+        if sqlite3.complete_statement(pending):
+            statements.append(pending.strip())
+            pending = ''
+    if pending.strip():
+        raise ValueError(f"incomplete statement at end of plan: {pending.strip()[:60]!r}")
+    return statements
+
+class ReadPool:
+    def __init__(self, db, size=READ_POOL_SIZE):
+        self.db = db
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def open(self):
+        conn = self.db.connect(readonly_uri(self.db.path), check_same_thread=False)
+        conn.execute('PRAGMA query_only = 1')
+        return conn
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.created < self.size:
+                self.created += 1
+                return self.open()
+        return self.idle.get()
+
+    def release(self, conn):
+        self.idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+class CanteenDB:
+    def __init__(self, path=DB_NAME, profiler=None, busy_timeout_ms=BUSY_TIMEOUT_MS, write_retries=WRITE_RETRIES,
+                 read_pool_size=READ_POOL_SIZE, journal=None):
+        self.path = path
+        self.profiler = profiler
+        self.busy_timeout_ms = busy_timeout_ms
+        self.write_retries = write_retries
+        self.write_depth = 0
+        self.commit_hooks = []
+        self.pricing_engine = None
+        self.pricing_key = None
+        self.readers = None
+        self.journal = None
+        self.journal_appended = False
+        self.actor = None
+        self.lock_stats = {'transactions': 0, 'lock_waits': 0, 'wait_ms': 0.0, 'max_wait_ms': 0.0,
+                           'retries': 0, 'failures': 0}
+        self.conn = self.connect()
+        self.conn.execute('PRAGMA foreign_keys = ON')
+        self.ensure_schema()
+        if journal and not is_memory_target(path):
+            self.attach_journal(journal)
+        if read_pool_size and not is_memory_target(path):
+            self.enable_wal()
+            self.readers = ReadPool(self, read_pool_size)
+        self.kpis = KpiCounters()
+        self.reconcile_kpis()
+
+    def connect(self, target=None, **kwargs):
+        target = target or self.path
+        timeout = self.busy_timeout_ms / 1000
+        if self.profiler is None:
+            return sqlite3.connect(target, timeout=timeout, uri=is_uri(target), **kwargs)
+        conn = sqlite3.connect(target, timeout=timeout, uri=is_uri(target), factory=ProfiledConnection, **kwargs)
+        conn.profiler = self.profiler
+        return conn
+
+    def enable_wal(self):
+        # WAL lets the read pool and the writer work in parallel; stay on the rollback journal if it can't be switched.
+        try:
+            self.conn.execute('PRAGMA journal_mode = WAL')
+        except sqlite3.OperationalError as e:
+            print(f"Could not enable WAL: {e}")
+
+    def attach_journal(self, path):
+        # Temp triggers belong to this connection only; they queue every row change of a transaction for the journal.
+        c = self.conn.cursor()
+        c.execute('CREATE TEMP TABLE IF NOT EXISTS journal_changes (seq INTEGER PRIMARY KEY, tbl TEXT, kind TEXT, row_id INTEGER, data TEXT)')
+        c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+        for (table,) in c.fetchall():
+            # Integrity scan progress is rebuilt by the next scan; journalling every checkpoint would only add noise.
+            # journal_position describes the journal itself.
+            if table.startswith('integrity_') or table == 'journal_position':
+                continue
+            names = [row[1] for row in c.execute(f'PRAGMA table_info("{table}")')]
+            new_row = ', '.join(f"'{name}', NEW.\"{name}\"" for name in names)
+            for event, kind, row, data in (('INSERT', 'i', 'NEW', f'json_object({new_row})'),
+                                           ('UPDATE', 'u', 'NEW', f'json_object({new_row})'),
+                                           ('DELETE', 'd', 'OLD', 'NULL')):
+                c.execute(f'''
+                    CREATE TEMP TRIGGER IF NOT EXISTS "journal_{table}_{kind}" AFTER {event} ON main."{table}"
+                    BEGIN
+                        INSERT INTO journal_changes (tbl, kind, row_id, data) VALUES ('{table}', '{kind}', {row}.rowid, {data});
+                    END
+                ''')
+        self.journal = Journal(path)
+        self.write_journal_base()
+
+    @write_transaction
+    def write_journal_base(self):
+        # Checked under the write lock so only one till writes the base of a new journal.
+        if not self.journal.is_empty():
+            self.reconcile_journal()
+            return
+        c = self.conn.cursor()
+        c.execute("SELECT name, sql FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+        tables = dict(c.fetchall())
+        changes = []
+        for table in tables:
+            if table == 'journal_position':
+                continue
+            c.execute(f'SELECT rowid, * FROM "{table}"')
+            names = [column[0] for column in c.description[1:]]
+            changes.extend([table, 'i', row[0], dict(zip(names, row[1:]))] for row in c.fetchall())
+        self.confirm_journal(self.journal.commit(json.dumps({'op': 'base', 'tables': tables, 'changes': changes},
+                                                            separators=(',', ':')).encode(), Journal.BASE))
+
+    def confirm_journal(self, end):
+        # Written in the same transaction as the record, so the database commits exactly the records it confirms.
+        self.conn.execute('INSERT INTO journal_position (id, journal_end) VALUES (1, ?) '
+                          'ON CONFLICT(id) DO UPDATE SET journal_end = excluded.journal_end', (end,))
+
+    def reconcile_journal(self):
+        # Runs under the write lock. A till that died between appending its record and COMMIT leaves that record
+        # past the confirmed end; it is cancelled before anything else is appended behind it.
+        row = self.conn.execute('SELECT journal_end FROM journal_position WHERE id = 1').fetchone()
+        size = self.journal.size()
+        if row is not None and row[0] == size:
+            return
+        if row is not None and row[0] < size:
+            kinds = self.journal.kinds_after(row[0])
+            if kinds is None:
+                print(f"Journal {self.journal.path} ends with a torn record past byte {row[0]}; truncating it")
+                self.journal.truncate(row[0])
+            elif len(kinds) - kinds.count(Journal.ABORT) > 1:
+                print(f"Journal {self.journal.path} has {len(kinds)} records this database never confirmed; "
+                      "leaving them as they are")
+            elif kinds[-1] != Journal.ABORT:
+                self.journal.abort()
+        elif row is not None:
+            print(f"Journal {self.journal.path} is shorter than this database expects; continuing from its end")
+        self.confirm_journal(self.journal.size())
+
+    def journal_transaction(self, op):
+        # Appended before COMMIT, while this till still holds the write lock, so journal order is commit order.
+        self.reconcile_journal()
+        c = self.conn.cursor()
+        c.execute('SELECT COUNT(*), json_group_array(json_array(tbl, kind, row_id, json(data))) '
+                  'FROM (SELECT * FROM journal_changes ORDER BY seq)')
+        count, changes = c.fetchone()
+        if not count:
+            return
+        c.execute('DELETE FROM journal_changes')
+        header = json.dumps({'op': op, 'actor': self.actor}, separators=(',', ':'))
+        end = self.journal.append(f'{header[:-1]},"changes":{changes}}}'.encode())
+        self.journal_appended = True
+        # The record is on disk before COMMIT, so no committed change can be missing from the journal after a crash.
+        self.journal.sync()
+        self.confirm_journal(end)
+
+    def abandon_transaction(self):
+        # Only this attempt's own record is cancelled, and only while its write lock is held: the abort marker must
+        # land straight after that record, before ROLLBACK lets another till append.
+        try:
+            if self.journal_appended and self.conn.in_transaction:
+                self.journal.abort()
+        finally:
+            self.journal_appended = False
+            if self.conn.in_transaction:
+                self.conn.rollback()
+
+    def after_commit(self, hook):
+        self.commit_hooks.append(hook)
+
+    @contextlib.contextmanager
+    def reader(self):
+        # Inside a write transaction reads must see its own uncommitted rows, so they stay on the writer.
+        if self.readers is None or self.write_depth:
+            yield self.conn.cursor()
+            return
+        conn = self.readers.acquire()
+        try:
+            conn.execute('BEGIN')
+            yield conn.cursor()
+        finally:
+            conn.rollback()
+            self.readers.release(conn)
+
+    def record_lock_wait(self, seconds, acquired=True):
+        ms = seconds * 1000
+        stats = self.lock_stats
+        if acquired:
+            stats['transactions'] += 1
+        if ms >= LOCK_WAIT_MS:
+            stats['lock_waits'] += 1
+            stats['wait_ms'] += ms
+            stats['max_wait_ms'] = max(stats['max_wait_ms'], ms)
+
+    @classmethod
+    def training_copy(cls, source=DB_NAME, profiler=None, **options):
+        db = cls(':memory:', profiler=profiler, **options)
+        db.restore(source)
+        db.ensure_schema()
+        db.baseline = db.snapshot()
+        db.reconcile_kpis()
+        return db
+
+    def snapshot(self, target=':memory:'):
+        self.conn.commit()
+        dest = sqlite3.connect(target, uri=is_uri(target))
+        self.conn.backup(dest)
+        return dest
+
+    def restore(self, source):
+        self.conn.commit()
+        if isinstance(source, sqlite3.Connection):
+            source.backup(self.conn)
+            return
+        src = sqlite3.connect(source if is_uri(source) else readonly_uri(source), uri=True)
+        try:
+            src.backup(self.conn)
+        finally:
+            src.close()
+
+    def reset(self):
+        self.restore(self.baseline)
+        self.reconcile_kpis()
+
+    def schema_version(self):
+        return self.conn.execute('PRAGMA user_version').fetchone()[0]
+
+    @profiled
+    def ensure_schema(self):
+        if self.schema_version() != SCHEMA_VERSION:
+            self.upgrade_schema()
+
+    @write_transaction
+    def upgrade_schema(self):
+        # Re-checked under the write lock in case another till upgraded first.
+        if self.schema_version() == SCHEMA_VERSION:
+            return
+        had_events = self.table_exists('order_events')
+        had_summary = self.table_exists('customer_summary')
+        self.create_tables()
+        # Replaced by the NOCASE indexes, which are the only ones a case-insensitive prefix search can use.
+        self.conn.execute('DROP INDEX IF EXISTS idx_customers_name')
+        self.conn.execute('DROP INDEX IF EXISTS idx_menu_name')
+        self.conn.execute('DROP INDEX IF EXISTS idx_staff_name')
+        self.conn.execute('DROP INDEX IF EXISTS idx_inventory_name')
+        if not self.column_exists('order_items', 'unit_price'):
+            self.conn.execute('ALTER TABLE order_items ADD COLUMN unit_price REAL')
+            # Today's menu price says nothing about what an old line was charged. Only a single-line order pins its
+            # price down; every other legacy line keeps an unknown (NULL) price.
+            self.conn.execute('''
+                UPDATE order_items SET unit_price = (SELECT total_price FROM orders o WHERE o.id = order_items.order_id) / quantity
+                WHERE quantity > 0 AND NOT EXISTS (SELECT 1 FROM order_items x WHERE x.order_id = order_items.order_id
+                                                                                AND x.id != order_items.id)
+            ''')
+        if not self.column_exists('menu', 'photo'):
+            self.conn.execute('ALTER TABLE menu ADD COLUMN photo TEXT')
+        if not had_events:
+            # Orders that predate the event log only have a known creation time.
+            self.conn.execute('''
+                INSERT INTO order_events (order_id, from_status, status, event_time)
+                SELECT id, NULL, 'Pending', order_date FROM orders ORDER BY id
+            ''')
+        if not had_summary:
+            self.rebuild_customer_summary()
+        self.init_sample_data()
+        self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def table_exists(self, name):
+        return self.conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)).fetchone() is not None
+
+    def column_exists(self, table, column):
+        return any(row[1] == column for row in self.conn.execute(f'PRAGMA table_info({table})'))
+
+    @profiled
+    def create_tables(self):
+        c = self.conn.cursor()
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                password TEXT NOT NULL,
+                is_admin INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS menu (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                item_name TEXT NOT NULL,
+                price REAL NOT NULL,
+                quantity INTEGER NOT NULL,
+                photo TEXT
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS customers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                phone TEXT NOT NULL
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS orders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                customer_id INTEGER NOT NULL,
+                order_date TEXT NOT NULL,
+                total_price REAL NOT NULL,
+                status TEXT NOT NULL,
+                FOREIGN KEY(customer_id) REFERENCES customers(id)
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS order_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                order_id INTEGER NOT NULL,
+                menu_id INTEGER NOT NULL,
+                quantity INTEGER NOT NULL,
+                unit_price REAL,
+                FOREIGN KEY(order_id) REFERENCES orders(id),
+                FOREIGN KEY(menu_id) REFERENCES menu(id)
+            )
+        ''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_order_items_menu ON order_items(menu_id)')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS price_rules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                menu_id INTEGER,
+                value REAL NOT NULL,
+                days TEXT NOT NULL DEFAULT '0123456',
+                start_time TEXT NOT NULL DEFAULT '00:00',
+                end_time TEXT NOT NULL DEFAULT '24:00',
+                active INTEGER NOT NULL DEFAULT 1,
+                FOREIGN KEY(menu_id) REFERENCES menu(id)
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS price_rule_items (
+                rule_id INTEGER NOT NULL,
+                menu_id INTEGER NOT NULL,
+                quantity INTEGER NOT NULL,
+                PRIMARY KEY(rule_id, menu_id),
+                FOREIGN KEY(rule_id) REFERENCES price_rules(id),
+                FOREIGN KEY(menu_id) REFERENCES menu(id)
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS price_rules_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS order_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                order_id INTEGER NOT NULL,
+                from_status TEXT,
+                status TEXT NOT NULL,
+                event_time TEXT NOT NULL,
+                FOREIGN KEY(order_id) REFERENCES orders(id)
+            )
+        ''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_order_events_order ON order_events(order_id, event_time)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_order_events_time ON order_events(event_time)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_orders_date ON orders(order_date)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_orders_status_date ON orders(status, order_date)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_orders_customer ON orders(customer_id)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_orders_total ON orders(total_price)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_customers_phone ON customers(phone)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_customers_name_nocase ON customers(name COLLATE NOCASE)')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS customer_summary (
+                customer_id INTEGER PRIMARY KEY,
+                visits INTEGER NOT NULL DEFAULT 0,
+                spend REAL NOT NULL DEFAULT 0,
+                last_visit TEXT,
+                favourite_menu_id INTEGER,
+                FOREIGN KEY(customer_id) REFERENCES customers(id)
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS customer_items (
+                customer_id INTEGER NOT NULL,
+                menu_id INTEGER NOT NULL,
+                quantity INTEGER NOT NULL,
+                PRIMARY KEY(customer_id, menu_id),
+                FOREIGN KEY(customer_id) REFERENCES customers(id)
+            )
+        ''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_customer_summary_spend ON customer_summary(spend)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_customer_summary_visits ON customer_summary(visits)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_customer_summary_last_visit ON customer_summary(last_visit)')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS closed_days (
+                day TEXT PRIMARY KEY,
+                closed_at TEXT NOT NULL,
+                closed_by TEXT,
+                orders INTEGER NOT NULL,
+                revenue REAL NOT NULL,
+                open_orders INTEGER NOT NULL,
+                seconds REAL
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS closed_day_status (
+                day TEXT NOT NULL,
+                status TEXT NOT NULL,
+                orders INTEGER NOT NULL,
+                revenue REAL NOT NULL,
+                PRIMARY KEY(day, status),
+                FOREIGN KEY(day) REFERENCES closed_days(day)
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS closed_day_items (
+                day TEXT NOT NULL,
+                status TEXT NOT NULL,
+                menu_id INTEGER NOT NULL,
+                item_name TEXT NOT NULL,
+                quantity INTEGER NOT NULL,
+                revenue REAL NOT NULL,
+                PRIMARY KEY(day, status, menu_id),
+                FOREIGN KEY(day) REFERENCES closed_days(day)
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS closed_day_stock (
+                day TEXT NOT NULL,
+                source TEXT NOT NULL,
+                item_id INTEGER NOT NULL,
+                item_name TEXT NOT NULL,
+                quantity INTEGER NOT NULL,
+                PRIMARY KEY(day, source, item_id),
+                FOREIGN KEY(day) REFERENCES closed_days(day)
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS closed_day_open_orders (
+                day TEXT NOT NULL,
+                order_id INTEGER NOT NULL,
+                order_date TEXT NOT NULL,
+                status TEXT NOT NULL,
+                total_price REAL NOT NULL,
+                PRIMARY KEY(day, order_id),
+                FOREIGN KEY(day) REFERENCES closed_days(day)
+            )
+        ''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_menu_name_nocase ON menu(item_name COLLATE NOCASE)')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS inventory (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                item_name TEXT NOT NULL,
+                quantity INTEGER NOT NULL
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS staff (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                role TEXT NOT NULL,
+                phone TEXT
+            )
+        ''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_staff_name_nocase ON staff(name COLLATE NOCASE)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_inventory_name_nocase ON inventory(item_name COLLATE NOCASE)')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS integrity_checkpoints (
+                check_name TEXT PRIMARY KEY,
+                last_rowid INTEGER NOT NULL DEFAULT 0,
+                passes INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT,
+                completed_at TEXT
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS integrity_issues (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                check_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                detail TEXT NOT NULL,
+                found_at TEXT NOT NULL,
+                UNIQUE(check_name, row_id)
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS journal_position (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                journal_end INTEGER NOT NULL
+            )
+        ''')
+
+    @profiled
+    def init_sample_data(self):
+        c = self.conn.cursor()
+        c.execute('SELECT * FROM users WHERE is_admin=1')
+        if not c.fetchone():
+            c.execute('INSERT INTO users (username, password, is_admin) VALUES (?, ?, ?)',
+                      ('admin', hash_password('admin123'), 1))
+        c.execute('SELECT * FROM staff')
+        if not c.fetchone():
+            c.execute('INSERT INTO staff (name, role, phone) VALUES (?, ?, ?)',
+                      ('John Doe', 'Manager', '1234567890'))
+
+    @profiled
+    @write_transaction
+    def add_user(self, username, password, is_admin=0):
+        c = self.conn.cursor()
+        try:
+            c.execute('INSERT INTO users (username, password, is_admin) VALUES (?, ?, ?)',
+                      (username, hash_password(password), is_admin))
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    @profiled
+    def validate_user(self, username, password):
+        with self.reader() as c:
+            c.execute('SELECT id, is_admin FROM users WHERE username=? AND password=?',
+                      (username, hash_password(password)))
+            return c.fetchone()
+
+    @profiled
+    @write_transaction
+    def add_menu_item(self, name, price, qty, photo=None):
+        c = self.conn.cursor()
+        c.execute('INSERT INTO menu (item_name, price, quantity, photo) VALUES (?, ?, ?, ?)', (name, price, qty, photo))
+        item_id = c.lastrowid
+        self.after_commit(lambda: self.kpis.stock_changed('menu', item_id, qty))
+        return item_id
+
+    @profiled
+    @write_transaction
+    def set_menu_photo(self, item_id, photo):
+        c = self.conn.cursor()
+        c.execute('UPDATE menu SET photo=? WHERE id=?', (photo, item_id))
+
+    @profiled
+    def list_menu_tiles(self):
+        with self.reader() as c:
+            c.execute('SELECT id, item_name, price, quantity, photo FROM menu ORDER BY item_name COLLATE NOCASE, id')
+            return c.fetchall()
+
+    def search(self, select, conditions, order_by, key, descending, limit, offset):
+        sql = select
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(clause for clause, _ in conditions)
+        direction = 'DESC' if descending else 'ASC'
+        sql += f' ORDER BY {order_by} {direction}, {key} {direction} LIMIT ? OFFSET ?'
+        params = [param for _, clause_params in conditions for param in clause_params] + [limit, offset]
+        with self.reader() as c:
+            c.execute(sql, params)
+            return c.fetchall()
+
+    def name_condition(self, column, name):
+        # A prefix LIKE becomes a range scan on a NOCASE index; a leading wildcard would scan the whole table.
+        return (f"{column} LIKE ? ESCAPE '\\'", [like_prefix(name)])
+
+    def phone_condition(self, column, phone):
+        return (f"{column} >= ? AND {column} < ?", list(prefix_range(phone)))
+
+    @profiled
+    def search_menu(self, sort='id', descending=False, limit=PAGE_SIZE, offset=0, name=None):
+        conditions = [self.name_condition('item_name', name)] if name else []
+        return self.search('SELECT id, item_name, price, quantity FROM menu', conditions,
+                           MENU_SORTS[sort], 'id', descending, limit, offset)
+
+    @profiled
+    def search_customers(self, sort='id', descending=False, limit=PAGE_SIZE, offset=0, name=None, phone=None):
+        conditions = []
+        if name:
+            conditions.append(self.name_condition('c.name', name))
+        if phone:
+            conditions.append(self.phone_condition('c.phone', phone))
+        select = '''
+            SELECT c.id, c.name, c.phone, s.visits, s.spend, COALESCE(s.last_visit, ''), COALESCE(m.item_name, '')
+            FROM customers c
+            JOIN customer_summary s ON s.customer_id = c.id
+            LEFT JOIN menu m ON m.id = s.favourite_menu_id
+        '''
+        order_by = CUSTOMER_SORTS[sort]
+        # Break ties on the rowid of the table whose index gives the order. Otherwise every run of equal values (all
+        # the customers with no spend yet, say) has to be sorted again in a temporary b-tree.
+        key = 's.customer_id' if order_by.startswith('s.') else 'c.id'
+        return self.search(select, conditions, order_by, key, descending, limit, offset)
+
+    @profiled
+    def search_staff(self, sort='id', descending=False, limit=PAGE_SIZE, offset=0, name=None):
+        conditions = [self.name_condition('name', name)] if name else []
+        return self.search('SELECT id, name, role, phone FROM staff', conditions,
+                           STAFF_SORTS[sort], 'id', descending, limit, offset)
+
+    @profiled
+    def search_inventory(self, sort='id', descending=False, limit=PAGE_SIZE, offset=0, name=None):
+        conditions = [self.name_condition('item_name', name)] if name else []
+        return self.search('SELECT id, item_name, quantity FROM inventory', conditions,
+                           INVENTORY_SORTS[sort], 'id', descending, limit, offset)
+
+    @profiled
+    def search_orders(self, sort='id', descending=True, limit=PAGE_SIZE, offset=0, status=None,
+                      date_from=None, date_to=None, phone=None, name=None, sla_minutes=None):
+        select = 'SELECT o.id, o.customer_id, o.order_date, o.total_price, o.status FROM orders o'
+        conditions = []
+        if phone or name:
+            select += ' JOIN customers c ON c.id = o.customer_id'
+        if status:
+            conditions.append(('o.status = ?', [status]))
+        if date_from:
+            conditions.append(('o.order_date >= ?', [date_from]))
+        if date_to:
+            conditions.append(("o.order_date < date(?, '+1 day')", [date_to]))
+        if phone:
+            conditions.append(self.phone_condition('c.phone', phone))
+        if name:
+            conditions.append(self.name_condition('c.name', name))
+        if sla_minutes is not None:
+            conditions.append(self.sla_condition(sla_minutes))
+        return self.search(select, conditions, ORDER_SORTS[sort], 'o.id', descending, limit, offset)
+
+    def sla_condition(self, sla_minutes):
+        # Open orders older than the SLA, or completed orders that took longer than it.
+        cutoff = (datetime.now() - timedelta(minutes=sla_minutes)).strftime('%Y-%m-%d %H:%M:%S')
+        return ('''(
+            (o.status IN ('Pending', 'Processing') AND o.order_date < ?)
+            OR (o.status = 'Completed' AND EXISTS (
+                SELECT 1 FROM order_events e
+                WHERE e.order_id = o.id AND e.status = 'Completed'
+                  AND (julianday(e.event_time) - julianday(o.order_date)) * 1440 > ?)))''', [cutoff, sla_minutes])
+
+    @profiled
+    def sla_breaches(self, order_ids, sla_minutes):
+        if not order_ids:
+            return set()
+        clause, params = self.sla_condition(sla_minutes)
+        marks = ', '.join('?' * len(order_ids))
+        with self.reader() as c:
+            c.execute(f'SELECT o.id FROM orders o WHERE o.id IN ({marks}) AND {clause}', [*order_ids, *params])
+            return {row[0] for row in c.fetchall()}
+
+    @profiled
+    def list_menu(self):
+        with self.reader() as c:
+            c.execute('SELECT id, item_name, price, quantity FROM menu')
+            return c.fetchall()
+
+    @profiled
+    @write_transaction
+    def update_menu_item(self, item_id, name, price, qty):
+        c = self.conn.cursor()
+        c.execute('UPDATE menu SET item_name=?, price=?, quantity=? WHERE id=?', (name, price, qty, item_id))
+        self.after_commit(lambda: self.kpis.stock_changed('menu', item_id, qty))
+
+    @profiled
+    @write_transaction
+    def delete_menu_item(self, item_id):
+        c = self.conn.cursor()
+        c.execute('''
+            SELECT EXISTS (SELECT 1 FROM order_items WHERE menu_id=?)
+                OR EXISTS (SELECT 1 FROM price_rules WHERE menu_id=?)
+                OR EXISTS (SELECT 1 FROM price_rule_items WHERE menu_id=?)
+        ''', (item_id, item_id, item_id))
+        if c.fetchone()[0]:
+            return False
+        c.execute('DELETE FROM menu WHERE id=?', (item_id,))
+        self.after_commit(lambda: self.kpis.stock_changed('menu', item_id, None))
+        return True
+
+    @profiled
+    @write_transaction
+    def add_customer(self, name, phone):
+        c = self.conn.cursor()
+        c.execute('INSERT INTO customers (name, phone) VALUES (?, ?)', (name, phone))
+        c.execute('SELECT last_insert_rowid()')
+        customer_id = c.fetchone()[0]
+        c.execute('INSERT INTO customer_summary (customer_id) VALUES (?)', (customer_id,))
+        return customer_id
+
+    def find_or_add_customer(self, name, phone):
+        # A returning customer gives the same name and phone; reusing their row lets the summary count visits.
+        c = self.conn.cursor()
+        c.execute('SELECT id FROM customers WHERE phone=? AND name=? ORDER BY id LIMIT 1', (phone, name))
+        row = c.fetchone()
+        return row[0] if row else self.add_customer(name, phone)
+
+    @profiled
+    @write_transaction
+    def update_customer(self, customer_id, name, phone):
+        c = self.conn.cursor()
+        c.execute('UPDATE customers SET name=?, phone=? WHERE id=?', (name, phone, customer_id))
+
+    @profiled
+    @write_transaction
+    def delete_customer(self, customer_id):
+        c = self.conn.cursor()
+        c.execute('SELECT COUNT(*) FROM orders WHERE customer_id=?', (customer_id,))
+        if c.fetchone()[0] > 0:
+            return False
+        c.execute('DELETE FROM customer_items WHERE customer_id=?', (customer_id,))
+        c.execute('DELETE FROM customer_summary WHERE customer_id=?', (customer_id,))
+        c.execute('DELETE FROM customers WHERE id=?', (customer_id,))
+        return True
+
+    @profiled
+    def list_customers(self):
+        with self.reader() as c:
+            c.execute('SELECT id, name, phone FROM customers')
+            return c.fetchall()
+
+    @profiled
+    @write_transaction
+    def create_order(self, customer_id, order_date, total_price, status='Pending'):
+        c = self.conn.cursor()
+        c.execute('INSERT INTO orders (customer_id, order_date, total_price, status) VALUES (?, ?, ?, ?)',
+                  (customer_id, order_date, total_price, status))
+        order_id = c.lastrowid
+        c.execute('INSERT INTO order_events (order_id, from_status, status, event_time) VALUES (?, NULL, ?, ?)',
+                  (order_id, status, order_date))
+        self.after_commit(lambda: self.kpis.order_placed(order_date, total_price, status))
+        return order_id
+
+    @profiled
+    @write_transaction
+    def add_order_item(self, order_id, menu_id, quantity, unit_price=None):
+        c = self.conn.cursor()
+        c.execute('''
+            INSERT INTO order_items (order_id, menu_id, quantity, unit_price)
+            VALUES (?, ?, ?, COALESCE(?, (SELECT price FROM menu WHERE id = ?)))
+        ''', (order_id, menu_id, quantity, unit_price, menu_id))
+
+    def take_stock(self, lines):
+        # The check and the decrement are one statement, so two tills can never both sell the last portion.
+        c = self.conn.cursor()
+        wanted = {}
+        for menu_id, quantity in lines:
+            wanted[menu_id] = wanted.get(menu_id, 0) + quantity
+        for menu_id, quantity in sorted(wanted.items()):
+            c.execute('UPDATE menu SET quantity = quantity - ? WHERE id=? AND quantity >= ?', (quantity, menu_id, quantity))
+            taken = c.rowcount
+            c.execute('SELECT item_name, quantity FROM menu WHERE id=?', (menu_id,))
+            row = c.fetchone()
+            if row is None:
+                raise OutOfStockError(f"Menu item {menu_id} no longer exists")
+            if not taken:
+                raise OutOfStockError(f"Only {row[1]} {row[0]} left")
+            self.after_commit(lambda menu_id=menu_id, left=row[1]: self.kpis.stock_changed('menu', menu_id, left))
+
+    def release_stock(self, lines):
+        c = self.conn.cursor()
+        for menu_id, quantity in lines:
+            c.execute('UPDATE menu SET quantity = quantity + ? WHERE id=?', (quantity, menu_id))
+            c.execute('SELECT quantity FROM menu WHERE id=?', (menu_id,))
+            row = c.fetchone()
+            if row is not None:
+                self.after_commit(lambda menu_id=menu_id, left=row[0]: self.kpis.stock_changed('menu', menu_id, left))
+
+    def price_lines(self, items, order_date):
+        # Prices shown in the cart are advisory; lines are re-priced here from current menu prices and rules.
+        c = self.conn.cursor()
+        menu_ids = sorted({menu_id for menu_id, _, _, _ in items})
+        c.execute(f"SELECT id, price FROM menu WHERE id IN ({', '.join('?' * len(menu_ids))})", menu_ids)
+        base_prices = dict(c.fetchall())
+        lines = [(menu_id, quantity, base_prices.get(menu_id, price)) for menu_id, _, quantity, price in items]
+        unit_prices = self.pricing().price_cart(lines, datetime.strptime(order_date, '%Y-%m-%d %H:%M:%S'))
+        total_price = round(sum(quantity * unit for (_, quantity, _), unit in zip(lines, unit_prices)), 2)
+        return [(menu_id, quantity, unit) for (menu_id, quantity, _), unit in zip(lines, unit_prices)], total_price
+
+    @profiled
+    @write_transaction
+    def place_order(self, name, phone, items, order_date, status='Pending'):
+        lines, total_price = self.price_lines(items, order_date)
+        if status != 'Cancelled':
+            self.take_stock([(menu_id, quantity) for menu_id, quantity, _ in lines])
+        customer_id = self.find_or_add_customer(name, phone)
+        order_id = self.create_order(customer_id, order_date, total_price, status)
+        for menu_id, quantity, unit in lines:
+            self.add_order_item(order_id, menu_id, quantity, unit)
+        if status != 'Cancelled':
+            self.summarise_order(order_id, 1)
+        return order_id
+
+    @profiled
+    @write_transaction
+    def modify_order(self, order_id, items):
+        c = self.conn.cursor()
+        c.execute('SELECT order_date, total_price, status FROM orders WHERE id=?', (order_id,))
+        row = c.fetchone()
+        if row is None or row[2] not in OPEN_STATUSES:
+            return False
+        order_date, old_total, status = row
+        c.execute('SELECT menu_id, quantity FROM order_items WHERE order_id=?', (order_id,))
+        self.release_stock(c.fetchall())
+        lines, total_price = self.price_lines(items, order_date)
+        self.take_stock([(menu_id, quantity) for menu_id, quantity, _ in lines])
+        self.summarise_order(order_id, -1)
+        c.execute('DELETE FROM order_items WHERE order_id=?', (order_id,))
+        for menu_id, quantity, unit in lines:
+            self.add_order_item(order_id, menu_id, quantity, unit)
+        c.execute('UPDATE orders SET total_price=? WHERE id=?', (total_price, order_id))
+        self.summarise_order(order_id, 1)
+        self.after_commit(lambda: self.kpis.order_modified(order_date, old_total, total_price, status))
+        return True
+
+    def pricing(self):
+        # Rules change rarely; recompile only when another till (or this one) has bumped the rules version.
+        with self.reader() as c:
+            c.execute('SELECT COALESCE((SELECT version FROM price_rules_version WHERE id = 1), 0)')
+            key = c.fetchone()[0]
+            if self.pricing_engine is None or key != self.pricing_key:
+                c.execute('''
+                    SELECT id, kind, menu_id, value, days, start_time, end_time
+                    FROM price_rules WHERE active = 1 ORDER BY id
+                ''')
+                rules = c.fetchall()
+                c.execute('''
+                    SELECT i.rule_id, i.menu_id, i.quantity
+                    FROM price_rule_items i JOIN price_rules r ON r.id = i.rule_id
+                    WHERE r.active = 1
+                ''')
+                combo_items = {}
+                for rule_id, menu_id, quantity in c.fetchall():
+                    combo_items.setdefault(rule_id, {})[menu_id] = quantity
+                self.pricing_engine = PricingEngine(rules, combo_items)
+                self.pricing_key = key
+        return self.pricing_engine
+
+    @profiled
+    @write_transaction
+    def add_price_rule(self, name, kind, menu_id, value, days='0123456', start_time='00:00', end_time='24:00',
+                       combo_items=()):
+        if kind not in PRICE_RULE_KINDS:
+            raise ValueError(f"unknown price rule kind {kind!r}")
+        rule_intervals(days, start_time, end_time)
+        c = self.conn.cursor()
+        c.execute('''
+            INSERT INTO price_rules (name, kind, menu_id, value, days, start_time, end_time)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (name, kind, menu_id, value, days, start_time, end_time))
+        rule_id = c.lastrowid
+        for item_id, quantity in combo_items:
+            c.execute('INSERT INTO price_rule_items (rule_id, menu_id, quantity) VALUES (?, ?, ?)', (rule_id, item_id, quantity))
+        self.bump_price_rules_version()
+        return rule_id
+
+    def bump_price_rules_version(self):
+        self.conn.execute(PRICE_RULES_BUMP)
+
+    @profiled
+    @write_transaction
+    def set_price_rule_active(self, rule_id, active):
+        c = self.conn.cursor()
+        c.execute('UPDATE price_rules SET active=? WHERE id=?', (1 if active else 0, rule_id))
+        self.bump_price_rules_version()
+
+    @profiled
+    @write_transaction
+    def delete_price_rule(self, rule_id):
+        c = self.conn.cursor()
+        c.execute('DELETE FROM price_rule_items WHERE rule_id=?', (rule_id,))
+        c.execute('DELETE FROM price_rules WHERE id=?', (rule_id,))
+        self.bump_price_rules_version()
+
+    @profiled
+    def list_price_rules(self):
+        with self.reader() as c:
+            c.execute('''
+                SELECT r.id, r.name, r.kind, COALESCE(m.item_name, CASE WHEN r.kind = 'combo' THEN
+                           (SELECT group_concat(i.quantity || 'x ' || im.item_name, ' + ')
+                            FROM price_rule_items i JOIN menu im ON im.id = i.menu_id WHERE i.rule_id = r.id)
+                       ELSE 'All items' END),
+                       r.value, r.days, r.start_time, r.end_time, CASE WHEN r.active THEN 'Yes' ELSE 'No' END
+                FROM price_rules r LEFT JOIN menu m ON m.id = r.menu_id
+                ORDER BY r.id
+            ''')
+            return c.fetchall()
+
+    @profiled
+    def list_orders(self):
+        with self.reader() as c:
+            c.execute('SELECT id, customer_id, order_date, total_price, status FROM orders')
+            return c.fetchall()
+
+    @profiled
+    def get_order_items(self, order_id):
+        with self.reader() as c:
+            c.execute('''
+                SELECT oi.id, COALESCE(m.item_name, 'Deleted item #' || oi.menu_id), oi.quantity, oi.unit_price
+                FROM order_items oi
+                LEFT JOIN menu m ON oi.menu_id = m.id
+                WHERE oi.order_id=?
+            ''', (order_id,))
+            return c.fetchall()
+
+    @profiled
+    def get_order(self, order_id):
+        with self.reader() as c:
+            c.execute('''
+                SELECT o.id, c.name, c.phone, o.order_date, o.total_price, o.status
+                FROM orders o
+                LEFT JOIN customers c ON c.id = o.customer_id
+                WHERE o.id=?
+            ''', (order_id,))
+            return c.fetchone()
+
+    @profiled
+    def get_receipts(self, date_from, date_to):
+        # Headers and lines for a date range in two queries; lines match get_order_items row for row.
+        with self.reader() as c:
+            c.execute('''
+                SELECT o.id, c.name, c.phone, o.order_date, o.total_price, o.status
+                FROM orders o
+                LEFT JOIN customers c ON c.id = o.customer_id
+                WHERE o.order_date >= ? AND o.order_date < ?
+                ORDER BY o.id
+            ''', (date_from, date_to))
+            orders = c.fetchall()
+            c.execute('''
+                SELECT oi.order_id, oi.id, COALESCE(m.item_name, 'Deleted item #' || oi.menu_id), oi.quantity, oi.unit_price
+                FROM orders o
+                JOIN order_items oi ON oi.order_id = o.id
+                LEFT JOIN menu m ON oi.menu_id = m.id
+                WHERE o.order_date >= ? AND o.order_date < ?
+                ORDER BY oi.id
+            ''', (date_from, date_to))
+            items = {}
+            for order_id, *item in c.fetchall():
+                items.setdefault(order_id, []).append(tuple(item))
+        return [(order, items.get(order[0], [])) for order in orders]
+
+    def summarise_order(self, order_id, sign):
+        # Adds (+1) or takes back (-1) one order's share of its customer's summary, inside the caller's transaction.
+        c = self.conn.cursor()
+        c.execute('''
+            SELECT o.customer_id, o.order_date, o.total_price, c.id
+            FROM orders o
+            LEFT JOIN customers c ON c.id = o.customer_id
+            WHERE o.id=?
+        ''', (order_id,))
+        customer_id, order_date, total_price, known_customer = c.fetchone()
+        if known_customer is None:
+            # Legacy orders can point at a deleted customer; there is no summary to keep until the repair plan
+            # recreates the customer, and it builds that summary from the orders.
+            return
+        c.execute('SELECT menu_id, SUM(quantity) FROM order_items WHERE order_id=? GROUP BY menu_id', (order_id,))
+        c.executemany('''
+            INSERT INTO customer_items (customer_id, menu_id, quantity) VALUES (?, ?, ?)
+            ON CONFLICT(customer_id, menu_id) DO UPDATE SET quantity = quantity + excluded.quantity
+        ''', [(customer_id, menu_id, sign * quantity) for menu_id, quantity in c.fetchall()])
+        if sign < 0:
+            c.execute('DELETE FROM customer_items WHERE customer_id=? AND quantity <= 0', (customer_id,))
+        c.execute('INSERT OR IGNORE INTO customer_summary (customer_id) VALUES (?)', (customer_id,))
+        # Taking back an order may remove the latest visit, so that case looks it up again on the customer index.
+        c.execute('''
+            UPDATE customer_summary SET
+                visits = visits + ?,
+                spend = ROUND(spend + ?, 2),
+                last_visit = CASE WHEN ? > 0 THEN MAX(COALESCE(last_visit, ?), ?)
+                                  ELSE (SELECT MAX(order_date) FROM orders WHERE customer_id = ? AND status != 'Cancelled') END,
+                favourite_menu_id = (SELECT menu_id FROM customer_items WHERE customer_id = ?
+                                     ORDER BY quantity DESC, menu_id LIMIT 1)
+            WHERE customer_id = ?
+        ''', (sign, sign * total_price, sign, order_date, order_date, customer_id, customer_id, customer_id))
+
+    @profiled
+    @write_transaction
+    def rebuild_customer_summary(self):
+        c = self.conn.cursor()
+        c.execute('DELETE FROM customer_items')
+        c.execute('DELETE FROM customer_summary')
+        c.execute('''
+            INSERT INTO customer_summary (customer_id, visits, spend, last_visit)
+            SELECT c.id, COUNT(o.id), ROUND(COALESCE(SUM(o.total_price), 0), 2), MAX(o.order_date)
+            FROM customers c
+            LEFT JOIN orders o ON o.customer_id = c.id AND o.status != 'Cancelled'
+            GROUP BY c.id
+        ''')
+        c.execute('''
+            INSERT INTO customer_items (customer_id, menu_id, quantity)
+            SELECT o.customer_id, oi.menu_id, SUM(oi.quantity)
+            FROM orders o
+            JOIN customers c ON c.id = o.customer_id
+            JOIN order_items oi ON oi.order_id = o.id
+            WHERE o.status != 'Cancelled'
+            GROUP BY o.customer_id, oi.menu_id
+            HAVING SUM(oi.quantity) > 0
+        ''')
+        c.execute('''
+            UPDATE customer_summary SET favourite_menu_id = (
+                SELECT menu_id FROM customer_items i WHERE i.customer_id = customer_summary.customer_id
+                ORDER BY quantity DESC, menu_id LIMIT 1)
+        ''')
+        c.execute('SELECT COUNT(*) FROM customer_summary')
+        return c.fetchone()[0]
+
+    @profiled
+    def get_customer_summary(self, customer_id):
+        with self.reader() as c:
+            c.execute('''
+                SELECT s.visits, s.spend, s.last_visit, m.item_name
+                FROM customer_summary s
+                LEFT JOIN menu m ON m.id = s.favourite_menu_id
+                WHERE s.customer_id=?
+            ''', (customer_id,))
+            return c.fetchone()
+
+    @profiled
+    def get_customer_orders(self, customer_id):
+        with self.reader() as c:
+            c.execute('SELECT id, order_date, total_price, status FROM orders WHERE customer_id=?', (customer_id,))
+            return c.fetchall()
+
+    @profiled
+    @write_transaction
+    def update_order_status(self, order_id, status, changed_at=None):
+        c = self.conn.cursor()
+        c.execute('SELECT order_date, total_price, status FROM orders WHERE id=?', (order_id,))
+        row = c.fetchone()
+        if row is None or row[2] == status:
+            return
+        order_date, total_price, old_status = row
+        changed_at = changed_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if status == 'Cancelled' or old_status == 'Cancelled':
+            c.execute('SELECT menu_id, quantity FROM order_items WHERE order_id=?', (order_id,))
+            lines = c.fetchall()
+            if status == 'Cancelled':
+                self.release_stock(lines)
+            else:
+                self.take_stock(lines)
+        c.execute('UPDATE orders SET status=? WHERE id=?', (status, order_id))
+        c.execute('INSERT INTO order_events (order_id, from_status, status, event_time) VALUES (?, ?, ?, ?)',
+                  (order_id, old_status, status, changed_at))
+        if status == 'Cancelled' or old_status == 'Cancelled':
+            self.summarise_order(order_id, -1 if status == 'Cancelled' else 1)
+        self.after_commit(lambda: self.kpis.status_changed(order_date, total_price, old_status, status))
+
+    @profiled
+    def get_order_events(self, order_id):
+        with self.reader() as c:
+            c.execute('SELECT from_status, status, event_time FROM order_events WHERE order_id=? ORDER BY event_time, id',
+                      (order_id,))
+            return c.fetchall()
+
+    @profiled
+    def order_timings(self, start, end):
+        # One row per order created in [start, end): creation, first Processing and first Completed times.
+        with self.reader() as c:
+            c.execute('''
+                SELECT created.order_id, created.event_time,
+                       (SELECT MIN(e.event_time) FROM order_events e
+                        WHERE e.order_id = created.order_id AND e.status = 'Processing'),
+                       (SELECT MIN(e.event_time) FROM order_events e
+                        WHERE e.order_id = created.order_id AND e.status = 'Completed')
+                FROM order_events created
+                WHERE created.event_time >= ? AND created.event_time < ? AND created.from_status IS NULL
+            ''', (start, end))
+            return c.fetchall()
+
+    @profiled
+    def kitchen_metrics(self, start, end):
+        def minutes(later, earlier):
+            return (datetime.strptime(later, '%Y-%m-%d %H:%M:%S') -
+                    datetime.strptime(earlier, '%Y-%m-%d %H:%M:%S')).total_seconds() / 60
+
+        waits, preps, totals = [], [], []
+        for _, created, processing, completed in self.order_timings(start, end):
+            if processing:
+                waits.append(minutes(processing, created))
+            if processing and completed:
+                preps.append(minutes(completed, processing))
+            if completed:
+                totals.append(minutes(completed, created))
+
+        open_list = "('" + "', '".join(OPEN_STATUSES) + "')"
+        delta = (f"(CASE WHEN status IN {open_list} THEN 1 ELSE 0 END) - "
+                 f"(CASE WHEN from_status IN {open_list} THEN 1 ELSE 0 END)")
+        with self.reader() as c:
+            # Queue depth at `start` is the current open count minus every change since then.
+            c.execute(f"SELECT COUNT(*) FROM orders WHERE status IN {open_list}")
+            depth = c.fetchone()[0]
+            c.execute(f"SELECT COALESCE(SUM({delta}), 0) FROM order_events WHERE event_time >= ?", (start,))
+            depth -= c.fetchone()[0]
+            c.execute(f'''
+                SELECT substr(event_time, 1, 13), from_status IS NULL, {delta}
+                FROM order_events
+                WHERE event_time >= ? AND event_time < ?
+                ORDER BY event_time, id
+            ''', (start, end))
+            hours = {}
+            for hour, created, change in c:
+                bucket = hours.setdefault(hour, {'hour': hour + ':00', 'orders': 0, 'max_queue': depth, 'queue_at_end': depth})
+                bucket['orders'] += created
+                depth += change
+                bucket['max_queue'] = max(bucket['max_queue'], depth)
+                bucket['queue_at_end'] = depth
+
+        def describe(values):
+            values = sorted(values)
+            return {'count': len(values),
+                    'p50': round(percentile(values, 0.50), 1),
+                    'p90': round(percentile(values, 0.90), 1),
+                    'p95': round(percentile(values, 0.95), 1),
+                    'max': round(values[-1], 1) if values else 0.0}
+
+        return {'hours': list(hours.values()), 'wait': describe(waits), 'prep': describe(preps), 'total': describe(totals)}
+
+    @profiled
+    @write_transaction
+    def add_inventory_item(self, item_name, quantity):
+        c = self.conn.cursor()
+        c.execute('INSERT INTO inventory (item_name, quantity) VALUES (?, ?)', (item_name, quantity))
+        item_id = c.lastrowid
+        self.after_commit(lambda: self.kpis.stock_changed('inventory', item_id, quantity))
+
+    @profiled
+    def reconcile_kpis(self):
+        day = datetime.now().strftime('%Y-%m-%d')
+        threshold = self.kpis.low_stock_threshold
+        with self.reader() as c:
+            # Both counts are index range scans (idx_orders_date, idx_orders_status), never a scan of all orders.
+            c.execute('''
+                SELECT COUNT(*), COALESCE(SUM(total_price), 0),
+                       (SELECT COUNT(*) FROM orders WHERE status = 'Pending')
+                FROM orders
+                WHERE order_date >= ? AND order_date < date(?, '+1 day') AND status != 'Cancelled'
+            ''', (day, day))
+            orders, revenue, pending = c.fetchone()
+            c.execute('''
+                SELECT 'menu', id FROM menu WHERE quantity < ?
+                UNION ALL
+                SELECT 'inventory', id FROM inventory WHERE quantity < ?
+            ''', (threshold, threshold))
+            low_stock = c.fetchall()
+        self.kpis.seed(day, orders, revenue, pending, low_stock)
+
+    def kpi_snapshot(self):
+        if self.kpis.day != datetime.now().strftime('%Y-%m-%d'):
+            self.reconcile_kpis()
+        return self.kpis.snapshot()
+
+    @profiled
+    def scan_day(self, day):
+        # One streaming pass: orders come off idx_orders_date in (order_date, id) order with their lines next to them,
+        # and each row is folded into the totals as it arrives, so memory does not grow with the size of the day.
+        end = (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        statuses, items, open_orders = {}, {}, []
+        with self.reader() as c:
+            c.execute('SELECT id, item_name FROM menu')
+            names = dict(c)
+            c.execute('''
+                SELECT o.id, o.order_date, o.status, o.total_price, oi.menu_id, oi.quantity, oi.unit_price
+                FROM orders o
+                LEFT JOIN order_items oi ON oi.order_id = o.id
+                WHERE o.order_date >= ? AND o.order_date < ?
+                ORDER BY o.order_date, o.id
+            ''', (day, end))
+            last = None
+            for order_id, order_date, status, total_price, menu_id, quantity, unit_price in c:
+                if order_id != last:
+                    last = order_id
+                    bucket = statuses.setdefault(status, [0, 0.0])
+                    bucket[0] += 1
+                    bucket[1] += total_price
+                    if status in OPEN_STATUSES:
+                        open_orders.append((order_id, order_date, status, total_price))
+                if menu_id is not None:
+                    line = items.setdefault((status, menu_id), [0, 0.0])
+                    line[0] += quantity
+                    line[1] += quantity * (unit_price or 0.0)
+            c.execute('''
+                SELECT 'menu', id, item_name, quantity FROM menu
+                UNION ALL
+                SELECT 'inventory', id, item_name, quantity FROM inventory
+                ORDER BY 1, 2
+            ''')
+            stock = list(c)
+        return {
+            'day': day,
+            'closed_at': None,
+            'orders': sum(orders for orders, _ in statuses.values()),
+            'revenue': round(sum(revenue for status, (_, revenue) in statuses.items() if status != 'Cancelled'), 2),
+            'statuses': [(status, orders, round(revenue, 2)) for status, (orders, revenue) in sorted(statuses.items())],
+            'items': [(status, menu_id, names.get(menu_id, f"Deleted item #{menu_id}"), quantity, round(revenue, 2))
+                      for (status, menu_id), (quantity, revenue) in sorted(items.items())],
+            'stock': stock,
+            'open_orders': open_orders,
+        }
+
+    def close_day(self, day, force=False):
+        # The scan reads a snapshot without the write lock; only storing the results takes it.
+        if not force and self.is_day_closed(day):
+            return None
+        start = time.perf_counter()
+        report = self.scan_day(day)
+        report['seconds'] = round(time.perf_counter() - start, 3)
+        return report if self.record_day_close(report, force) else None
+
+    @profiled
+    @write_transaction
+    def record_day_close(self, report, force=False):
+        c = self.conn.cursor()
+        day = report['day']
+        c.execute('SELECT 1 FROM closed_days WHERE day=?', (day,))
+        if c.fetchone():
+            if not force:
+                return False
+            for table in ('closed_day_status', 'closed_day_items', 'closed_day_stock', 'closed_day_open_orders'):
+                c.execute(f'DELETE FROM {table} WHERE day=?', (day,))
+            c.execute('DELETE FROM closed_days WHERE day=?', (day,))
+        report['closed_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        c.execute('''
+            INSERT INTO closed_days (day, closed_at, closed_by, orders, revenue, open_orders, seconds)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (day, report['closed_at'], self.actor, report['orders'], report['revenue'], len(report['open_orders']),
+              report.get('seconds')))
+        c.executemany('INSERT INTO closed_day_status (day, status, orders, revenue) VALUES (?, ?, ?, ?)',
+                      [(day, *row) for row in report['statuses']])
+        c.executemany('INSERT INTO closed_day_items (day, status, menu_id, item_name, quantity, revenue) VALUES (?, ?, ?, ?, ?, ?)',
+                      [(day, *row) for row in report['items']])
+        c.executemany('INSERT INTO closed_day_stock (day, source, item_id, item_name, quantity) VALUES (?, ?, ?, ?, ?)',
+                      [(day, *row) for row in report['stock']])
+        c.executemany('INSERT INTO closed_day_open_orders (day, order_id, order_date, status, total_price) VALUES (?, ?, ?, ?, ?)',
+                      [(day, *row) for row in report['open_orders']])
+        return True
+
+    @profiled
+    def is_day_closed(self, day):
+        with self.reader() as c:
+            c.execute('SELECT 1 FROM closed_days WHERE day=?', (day,))
+            return c.fetchone() is not None
+
+    @profiled
+    def day_report(self, day):
+        # Closed days are answered from what close_day stored; only open days are scanned from the orders.
+        with self.reader() as c:
+            c.execute('SELECT closed_at, orders, revenue, seconds FROM closed_days WHERE day=?', (day,))
+            row = c.fetchone()
+            if row is not None:
+                closed_at, orders, revenue, seconds = row
+                report = {'day': day, 'closed_at': closed_at, 'orders': orders, 'revenue': revenue, 'seconds': seconds}
+                c.execute('SELECT status, orders, revenue FROM closed_day_status WHERE day=? ORDER BY status', (day,))
+                report['statuses'] = c.fetchall()
+                c.execute('''
+                    SELECT status, menu_id, item_name, quantity, revenue FROM closed_day_items
+                    WHERE day=? ORDER BY status, menu_id
+                ''', (day,))
+                report['items'] = c.fetchall()
+                c.execute('SELECT source, item_id, item_name, quantity FROM closed_day_stock WHERE day=? ORDER BY source, item_id', (day,))
+                report['stock'] = c.fetchall()
+                c.execute('''
+                    SELECT order_id, order_date, status, total_price FROM closed_day_open_orders
+                    WHERE day=? ORDER BY order_date, order_id
+                ''', (day,))
+                report['open_orders'] = c.fetchall()
+                return report
+        return self.scan_day(day)
+
+    @profiled
+    def list_closed_days(self, limit=PAGE_SIZE):
+        with self.reader() as c:
+            c.execute('SELECT day, closed_at, closed_by, orders, revenue, open_orders FROM closed_days ORDER BY day DESC LIMIT ?',
+                      (limit,))
+            return c.fetchall()
+
+    @profiled
+    def list_inventory(self):
+        with self.reader() as c:
+            c.execute('SELECT id, item_name, quantity FROM inventory')
+            return c.fetchall()
+
+    @profiled
+    @write_transaction
+    def update_inventory(self, item_id, quantity):
+        c = self.conn.cursor()
+        c.execute('UPDATE inventory SET quantity=? WHERE id=?', (quantity, item_id))
+        self.after_commit(lambda: self.kpis.stock_changed('inventory', item_id, quantity))
+
+    @profiled
+    @write_transaction
+    def add_staff(self, name, role, phone):
+        c = self.conn.cursor()
+        c.execute('INSERT INTO staff (name, role, phone) VALUES (?, ?, ?)', (name, role, phone))
+
+    @profiled
+    def list_staff(self):
+        with self.reader() as c:
+            c.execute('SELECT id, name, role, phone FROM staff')
+            return c.fetchall()
+
+    @profiled
+    @write_transaction
+    def update_staff(self, staff_id, name, role, phone):
+        c = self.conn.cursor()
+        c.execute('UPDATE staff SET name=?, role=?, phone=? WHERE id=?', (name, role, phone, staff_id))
+
+    @profiled
+    @write_transaction
+    def delete_staff(self, staff_id):
+        c = self.conn.cursor()
+        c.execute('DELETE FROM staff WHERE id=?', (staff_id,))
+
+    @profiled
+    @write_transaction
+    def integrity_step(self, batch_rows=INTEGRITY_BATCH_ROWS):
+        # One rowid range of one check per transaction, so scanning a large database never holds the lock for long.
+        c = self.conn.cursor()
+        c.execute('SELECT check_name, last_rowid, passes FROM integrity_checkpoints')
+        positions = {name: (last, passes) for name, last, passes in c.fetchall()}
+        passes_before = min(positions.get(name, (0, 0))[1] for name in INTEGRITY_CHECKS)
+        name = min(INTEGRITY_CHECKS, key=lambda check: positions.get(check, (0, 0))[1])
+        table, sql = INTEGRITY_CHECKS[name]
+        last, passes = positions.get(name, (0, 0))
+        c.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM {table}')
+        end = c.fetchone()[0]
+        high = last + batch_rows
+        done = high >= end
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        c.execute(sql, (last, high))
+        found = c.fetchall()
+        # Issues past the end of a finished pass belong to rows that have since been deleted.
+        c.execute('''
+            DELETE FROM integrity_issues
+            WHERE check_name=? AND row_id > ? AND row_id <= ? AND row_id NOT IN (SELECT value FROM json_each(?))
+        ''', (name, last, sys.maxsize if done else high, json.dumps([row_id for row_id, _ in found])))
+        c.executemany('''
+            INSERT INTO integrity_issues (check_name, row_id, detail, found_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(check_name, row_id) DO UPDATE SET detail=excluded.detail
+        ''', [(name, row_id, detail, now) for row_id, detail in found])
+        c.execute('''
+            INSERT INTO integrity_checkpoints (check_name, last_rowid, passes, updated_at, completed_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(check_name) DO UPDATE SET last_rowid=excluded.last_rowid, passes=excluded.passes,
+                updated_at=excluded.updated_at, completed_at=COALESCE(excluded.completed_at, completed_at)
+        ''', (name, 0 if done else high, passes + done, now, now if done else None))
+        positions[name] = (0, passes + done)
+        return {'check': name, 'from': last, 'to': min(high, end), 'end': end, 'found': len(found),
+                'pass_complete': min(positions.get(check, (0, 0))[1] for check in INTEGRITY_CHECKS) > passes_before}
+
+    def run_integrity_pass(self, batch_rows=INTEGRITY_BATCH_ROWS, max_steps=None):
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            steps += 1
+            if self.integrity_step(batch_rows)['pass_complete']:
+                return steps, True
+        return steps, False
+
+    @profiled
+    @write_transaction
+    def reset_integrity_scan(self):
+        c = self.conn.cursor()
+        c.execute('DELETE FROM integrity_checkpoints')
+        c.execute('DELETE FROM integrity_issues')
+
+    @profiled
+    def integrity_status(self):
+        with self.reader() as c:
+            c.execute('SELECT check_name, last_rowid, passes, completed_at FROM integrity_checkpoints')
+            positions = {name: rest for name, *rest in c.fetchall()}
+            c.execute('SELECT check_name, COUNT(*) FROM integrity_issues GROUP BY check_name')
+            counts = dict(c.fetchall())
+            status = []
+            for name, (table, _) in INTEGRITY_CHECKS.items():
+                c.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM {table}')
+                last, passes, completed_at = positions.get(name, (0, 0, None))
+                status.append((name, last, c.fetchone()[0], passes, completed_at, counts.get(name, 0)))
+            return status
+
+    @profiled
+    def list_integrity_issues(self, limit=None):
+        with self.reader() as c:
+            c.execute('SELECT check_name, row_id, detail, found_at FROM integrity_issues ORDER BY check_name, row_id LIMIT ?',
+                      (-1 if limit is None else limit,))
+            return c.fetchall()
+
+    def integrity_repair_plan(self):
+        return repair_plan_sql(self.list_integrity_issues(), self.path)
+
+    @profiled
+    @write_transaction
+    def apply_repair_plan(self, text):
+        # Runs as one journalled transaction with foreign keys enforced; any failing statement undoes the whole plan.
+        statements = split_sql_script(text)
+        c = self.conn.cursor()
+        changed = 0
+        for statement in statements:
+            if statement.split(None, 1)[0].upper() in ('BEGIN', 'COMMIT', 'END', 'ROLLBACK', 'SAVEPOINT', 'RELEASE'):
+                raise ValueError(f"repair plans may not control transactions: {statement[:60]!r}")
+            c.execute(statement)
+            changed += max(c.rowcount, 0)
+        return len(statements), changed
+
+    def __del__(self):
+        if self.journal is not None:
+            self.journal.close()
+        if self.readers is not None:
+            self.readers.close()
+        self.conn.close()
+
+class SiteRegistry:
+    # sites.json maps each canteen to its own database file; relative paths are relative to the registry file.
+    def __init__(self, path=SITES_PATH):
+        self.path = path
+        self.sites = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.sites = json.load(f).get('sites', {})
+
+    def db_path(self, site):
+        if site not in self.sites:
+            raise KeyError(f"unknown site {site!r}")
+        path = self.sites[site]['db']
+        if is_uri(path) or os.path.isabs(path):
+            return path
+        return os.path.join(os.path.dirname(os.path.abspath(self.path)), path)
+
+    def add(self, site, db_path):
+        self.sites[site] = {'db': db_path}
+        path = self.db_path(site)
+        if not is_uri(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Creating the shard here means the federated reader, which is read-only, always finds a current schema.
+        CanteenDB(path, read_pool_size=0).conn.close()
+        self.save()
+
+    def remove(self, site):
+        self.db_path(site)
+        del self.sites[site]
+        self.save()
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        write_atomic(self.path, json.dumps({'sites': self.sites}, indent=2, sort_keys=True).encode('utf-8'))
+
+    def open(self, site, **options):
+        # Writes always go to the one shard that owns the site, so each canteen only contends for its own lock.
+        return CanteenDB(self.db_path(site), **options)
+
+class FederatedReader:
+    def __init__(self, registry, workers=SITE_QUERY_WORKERS, busy_timeout_ms=SHARD_BUSY_TIMEOUT_MS):
+        self.registry = registry
+        self.busy_timeout_ms = busy_timeout_ms
+        self.pool = LazyThreadPool(workers, 'canteen-shard')
+
+    def read_shard(self, site, query, params):
+        path = self.registry.db_path(site)
+        if not is_uri(path) and not os.path.exists(path):
+            return None, 'missing'
+        try:
+            conn = sqlite3.connect(readonly_uri(path), uri=True, timeout=self.busy_timeout_ms / 1000,
+                                   check_same_thread=False)
+        except sqlite3.Error as e:
+            return None, str(e)
+        try:
+            c = conn.cursor()
+            c.execute('BEGIN')
+            c.execute(query, params)
+            return c.fetchall(), None
+        except sqlite3.Error as e:
+            return None, 'busy' if is_busy_error(e) else str(e)
+        finally:
+            conn.close()
+
+    def fan_out(self, query, params=()):
+        # Each shard is read on its own thread and connection; sqlite3 drops the GIL while a query runs, so the
+        # shards really are read in parallel. A missing, locked or broken shard is reported, never fatal.
+        futures = {site: self.pool.submit(self.read_shard, site, query, params) for site in sorted(self.registry.sites)}
+        results, unavailable = {}, {}
+        for site, future in futures.items():
+            rows, error = future.result()
+            if error is None:
+                results[site] = rows
+            else:
+                unavailable[site] = error
+        return results, unavailable
+
+    def sales(self, date_from, date_to):
+        results, unavailable = self.fan_out('''
+            SELECT COUNT(*), COALESCE(SUM(total_price), 0), COALESCE(SUM(status IN ('Pending', 'Processing')), 0)
+            FROM orders
+            WHERE order_date >= ? AND order_date < date(?, '+1 day') AND status != 'Cancelled'
+        ''', (date_from, date_to))
+        sites = [(site, orders, round(revenue, 2), open_orders) for site, [(orders, revenue, open_orders)] in results.items()]
+        total = (sum(row[1] for row in sites), round(sum(row[2] for row in sites), 2), sum(row[3] for row in sites))
+        return {'sites': sites, 'total': total, 'unavailable': unavailable}
+
+    def top_items(self, date_from, date_to, limit=20):
+        # Menu ids are local to each shard, so items are merged across sites by name.
+        results, unavailable = self.fan_out('''
+            SELECT COALESCE(m.item_name, 'Deleted item #' || oi.menu_id), SUM(oi.quantity),
+                   SUM(oi.quantity * oi.unit_price)
+            FROM orders o
+            JOIN order_items oi ON oi.order_id = o.id
+            LEFT JOIN menu m ON m.id = oi.menu_id
+            WHERE o.order_date >= ? AND o.order_date < date(?, '+1 day') AND o.status != 'Cancelled'
+            GROUP BY 1
+        ''', (date_from, date_to))
+        merged = {}
+        for rows in results.values():
+            for name, quantity, revenue in rows:
+                item = merged.setdefault(name, [0, 0.0])
+                item[0] += quantity
+                item[1] += revenue or 0.0
+        items = sorted(((name, quantity, round(revenue, 2)) for name, (quantity, revenue) in merged.items()),
+                       key=lambda item: (-item[2], item[0]))
+        return {'items': items[:limit], 'unavailable': unavailable}
+
+    def find_customers(self, name=None, phone=None, limit=PAGE_SIZE):
+        conditions, params = [], []
+        if name:
+            conditions.append("c.name LIKE ? ESCAPE '\\'")
+            params.append(like_prefix(name))
+        if phone:
+            conditions.append('c.phone >= ? AND c.phone < ?')
+            params.extend(prefix_range(phone))
+        where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+        results, unavailable = self.fan_out(f'''
+            SELECT c.id, c.name, c.phone, COALESCE(s.visits, 0), COALESCE(s.spend, 0), COALESCE(s.last_visit, '')
+            FROM customers c
+            LEFT JOIN customer_summary s ON s.customer_id = c.id
+            {where}
+            ORDER BY c.phone, c.id
+            LIMIT ?
+        ''', (*params, limit))
+        customers = sorted(((site, *row) for site, rows in results.items() for row in rows),
+                           key=lambda row: (row[3], row[0], row[1]))[:limit]
+        # The same person gives the same phone at every canteen, which is what ties their visits together.
+        combined = {}
+        for site, _, name, phone, visits, spend, last_visit in customers:
+            entry = combined.setdefault(phone, [name, set(), 0, 0.0, ''])
+            entry[1].add(site)
+            entry[2] += visits
+            entry[3] += spend
+            entry[4] = max(entry[4], last_visit)
+        combined = [(phone, name, len(sites), visits, round(spend, 2), last_visit)
+                    for phone, (name, sites, visits, spend, last_visit) in combined.items()]
+        return {'customers': customers, 'combined': combined, 'unavailable': unavailable}
+
+    def close(self):
+        self.pool.shutdown()
+
+class CanteenApp:
+    def __init__(self, root, db_path=DB_NAME, training=False, profiler=None, ui_profiler=None, backup_scheduler=None,
+                 db_options=None, sla_minutes=SLA_MINUTES, receipt_spool=None, photo_dir=PHOTO_DIR, site=None,
+                 site_reader=None):
+        self.ui_profiler = ui_profiler
+        if ui_profiler is not None:
+            profiler = profiler or QueryProfiler()
+            profiler.listeners.append(ui_profiler.db_call)
+        self.db_path = db_path
+        self.training = training
+        self.profiler = profiler
+        self.backup_scheduler = backup_scheduler
+        self.db_options = db_options or {}
+        self.sla_minutes = sla_minutes
+        self.receipt_spool = receipt_spool or ReceiptSpool()
+        self.photo_dir = photo_dir
+        self.site = site
+        self.site_reader = site_reader
+        self.thumbnails = ThumbnailCache(root, photo_dir)
+        self._db = None
+        self.root = root
+        title = "Canteen Management System" + (f" - {site}" if site else "")
+        self.root.title(title + " (Training)" if training else title)
+        self.root.geometry("800x600")
+        self.current_order_items = []
+        self.list_state = {}
+        self.login_bg_image_orig = None
+        self.main_bg_image_orig = None
+        self.bg_image = None
+        self.bg_size = None
+        self.resize_job = None
+        self.image_thread = None
+        self.painted = False
+        self.last_input = time.monotonic()
+        self.root.report_callback_exception = self.report_callback_exception
+        self.root.bind('<Configure>', self.resize_background)
+        for sequence in ('<Key>', '<Button>', '<Motion>'):
+            self.root.bind_all(sequence, self.note_input, add='+')
+        self.show_login()
+        # The login form paints first; the database and background image follow its first Expose. The timer covers
+        # a window that starts minimised and is never exposed.
+        self.root.bind('<Expose>', self.first_paint, add='+')
+        self.root.after(STARTUP_FALLBACK_MS, self.first_paint)
+        if ui_profiler is not None:
+            ui_profiler.start_heartbeat()
+
+    @property
+    def db(self):
+        if self._db is None:
+            self.open_database()
+        return self._db
+
+    def open_database(self):
+        if self.training:
+            self._db = CanteenDB.training_copy(self.db_path, profiler=self.profiler, **self.db_options)
+        else:
+            self._db = CanteenDB(self.db_path, profiler=self.profiler, **self.db_options)
+
+    def report_callback_exception(self, exc, value, tb):
+        # Every write already retried inside write_transaction. A DatabaseBusyError that reaches Tk means another till
+        # kept the lock, so the user is asked to try again instead of being shown a traceback.
+        if isinstance(value, DatabaseBusyError):
+            messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+            return
+        tk.Tk.report_callback_exception(self.root, exc, value, tb)
+
+    def first_paint(self, event=None):
+        if self.painted:
+            return
+        self.painted = True
+        # An Expose only queues the redraw; running the idle tasks puts the form on screen before any DB work starts.
+        self.root.update_idletasks()
+        self.root.after(0, self.finish_startup)
+
+    def finish_startup(self):
+        if self._db is None:
+            self.open_database()
+        self.load_background_images()
+        self.root.after(KPI_RECONCILE_SECONDS * 1000, self.reconcile_kpis)
+        if not self.training:
+            self.root.after(INTEGRITY_IDLE_MS, self.check_integrity_when_idle)
+
+    def reconcile_kpis(self):
+        # Picks up orders placed on other tills and corrects any drift in the live counters.
+        self.db.reconcile_kpis()
+        self.root.after(KPI_RECONCILE_SECONDS * 1000, self.reconcile_kpis)
+
+    def note_input(self, event=None):
+        self.last_input = time.monotonic()
+
+    def check_integrity_when_idle(self):
+        # One short batch at a time, and only while nobody is using the till; rests for a while after each full pass.
+        delay = INTEGRITY_IDLE_MS
+        if time.monotonic() - self.last_input >= INTEGRITY_IDLE_SECONDS:
+            try:
+                if self.db.integrity_step()['pass_complete']:
+                    delay = INTEGRITY_REST_MINUTES * 60 * 1000
+            except DatabaseBusyError:
+                pass
+        self.root.after(delay, self.check_integrity_when_idle)
+
+    def load_background_images(self):
+        self.image_thread = threading.Thread(target=self.decode_background_image, daemon=True)
+        self.image_thread.start()
+        self.root.after(50, self.apply_background_images)
+
+    def decode_background_image(self):
+        Image, _ = load_pil()
+        if Image is None or not os.path.exists(BG_IMAGE_PATH):
+            return
+        try:
+            image = Image.open(BG_IMAGE_PATH)
+            image.load()
+        except Exception as e:
+            print(f"Error loading images: {e}")
+            return
+        self.login_bg_image_orig = self.main_bg_image_orig = image
+
+    def apply_background_images(self):
+        if self.image_thread.is_alive():
+            self.root.after(50, self.apply_background_images)
+            return
+        if self.login_bg_image_orig is not None:
+            self.redraw_background()
+
+    def resize_background(self, event=None):
+        # <Configure> on the root fires for every child widget too; only window resizes matter.
+        if event is not None and event.widget is not self.root:
+            return
+        if self.resize_job is not None:
+            self.root.after_cancel(self.resize_job)
+        self.resize_job = self.root.after(RESIZE_DEBOUNCE_MS, self.redraw_background)
+
+    def redraw_background(self):
+        self.resize_job = None
+        if hasattr(self, 'current_canvas') and self.current_canvas.winfo_exists():
+            self.set_background(self.current_canvas, for_login=self.current_canvas.for_login)
+
+    @traced('image')
+    def set_background(self, canvas, for_login=True):
+        canvas.delete("all")
+        w = max(self.root.winfo_width(), 1)
+        h = max(self.root.winfo_height(), 1)
+        canvas.for_login = for_login
+        image_orig = self.login_bg_image_orig if for_login else self.main_bg_image_orig
+        if image_orig:
+            if self.bg_image is None or self.bg_size != (w, h):
+                Image, ImageTk = load_pil()
+                self.bg_image = ImageTk.PhotoImage(image_orig.resize((w, h), Image.Resampling.LANCZOS))
+                self.bg_size = (w, h)
+            canvas.create_image(0, 0, anchor='nw', image=self.bg_image)
+        else:
+            canvas.create_rectangle(0, 0, w, h, fill='#f0f0f0')
+
+    def clear_window(self):
+        for widget in self.root.winfo_children():
+            widget.destroy()
+
+    def build_item_grid(self, frame, items, on_select):
+        # Each tile is a few canvas items; only tiles in view hold a thumbnail, fetched through the LRU cache.
+        tile_w, tile_h = TILE_SIZE + 2 * TILE_PAD, TILE_SIZE + 3 * TILE_PAD + 30
+        rows = (len(items) + GRID_COLUMNS - 1) // GRID_COLUMNS
+        grid_frame = tk.Frame(frame, bg='white')
+        grid_frame.pack(fill='both', expand=True)
+        scrollbar = ttk.Scrollbar(grid_frame, orient='vertical')
+        scrollbar.pack(side='right', fill='y')
+        canvas = tk.Canvas(grid_frame, bg='white', highlightthickness=0, width=GRID_COLUMNS * tile_w, height=2 * tile_h,
+                           scrollregion=(0, 0, GRID_COLUMNS * tile_w, rows * tile_h), yscrollincrement=tile_h // 3)
+        canvas.pack(side='left', fill='both', expand=True)
+        state = {'job': None, 'press': None, 'selected': None}
+        shown = {}
+        outlines = []
+
+        for index, (item_id, name, price, qty, photo) in enumerate(items):
+            x, y = (index % GRID_COLUMNS) * tile_w, (index // GRID_COLUMNS) * tile_h
+            outlines.append(canvas.create_rectangle(x + 2, y + 2, x + tile_w - 2, y + tile_h - 2, width=2, outline='#cccccc',
+                                                    fill='#f5f5f5' if qty > 0 else '#e0e0e0'))
+            canvas.create_text(x + tile_w / 2, y + TILE_PAD + TILE_SIZE / 2, text=name[:1].upper(),
+                               font=('Arial', 28, 'bold'), fill='#bbbbbb')
+            canvas.create_text(x + tile_w / 2, y + 2 * TILE_PAD + TILE_SIZE + 14, justify='center', font=('Arial', 9),
+                               text=f"{name[:16]}\n{price:.2f}" + ("" if qty > 0 else " (sold out)"))
+
+        def place(index, photo):
+            if index not in shown or shown[index] is not None or not canvas.winfo_exists():
+                return
+            x, y = (index % GRID_COLUMNS) * tile_w, (index // GRID_COLUMNS) * tile_h
+            shown[index] = canvas.create_image(x + tile_w / 2, y + TILE_PAD + TILE_SIZE / 2, image=photo)
+
+        def show_visible():
+            state['job'] = None
+            if not canvas.winfo_exists():
+                return
+            first = max(0, int(canvas.canvasy(0) // tile_h)) * GRID_COLUMNS
+            last = min(len(items), (int(canvas.canvasy(canvas.winfo_height()) // tile_h) + 1) * GRID_COLUMNS)
+            visible = {index for index in range(first, last) if items[index][4]}
+            # Keep the cache comfortably larger than a screenful so tiles in view are never evicted.
+            self.thumbnails.capacity = max(self.thumbnails.capacity, 2 * (last - first))
+            for index in list(shown):
+                if index not in visible:
+                    if shown[index] is not None:
+                        canvas.delete(shown[index])
+                    del shown[index]
+            for index in sorted(visible - shown.keys()):
+                shown[index] = None
+                self.thumbnails.get(items[index][4], lambda photo, index=index: place(index, photo))
+
+        def schedule(*args):
+            if args:
+                scrollbar.set(*args)
+            if state['job'] is None:
+                state['job'] = canvas.after(THUMB_POLL_MS, show_visible)
+
+        def select(index):
+            if state['selected'] is not None:
+                canvas.itemconfig(outlines[state['selected']], outline='#cccccc')
+            state['selected'] = index
+            canvas.itemconfig(outlines[index], outline='#4a90e2')
+            on_select(items[index])
+
+        def press(event):
+            state['press'] = event.y
+            canvas.scan_mark(0, event.y)
+
+        def release(event):
+            # A tap selects; a drag only scrolls, as on a touch screen.
+            if state['press'] is None or abs(event.y - state['press']) > 10:
+                return
+            column, row = int(canvas.canvasx(event.x) // tile_w), int(canvas.canvasy(event.y) // tile_h)
+            index = row * GRID_COLUMNS + column
+            if column < GRID_COLUMNS and index < len(items):
+                select(index)
+
+        scrollbar.config(command=canvas.yview)
+        canvas.config(yscrollcommand=schedule)
+        canvas.bind('<ButtonPress-1>', press)
+        canvas.bind('<B1-Motion>', lambda event: canvas.scan_dragto(0, event.y, gain=1))
+        canvas.bind('<ButtonRelease-1>', release)
+        canvas.bind('<MouseWheel>', lambda event: canvas.yview_scroll(-1 if event.delta > 0 else 1, 'units'))
+        canvas.bind('<Button-4>', lambda event: canvas.yview_scroll(-1, 'units'))
+        canvas.bind('<Button-5>', lambda event: canvas.yview_scroll(1, 'units'))
+        canvas.bind('<Configure>', lambda event: schedule())
+        return canvas
+
+    def choose_photo(self, label, chosen):
+        path = filedialog.askopenfilename(title="Choose Photo",
+                                          filetypes=[("Images", "*.png *.jpg *.jpeg *.gif *.bmp *.webp"), ("All files", "*")])
+        if path:
+            chosen['path'] = path
+            label.config(text=os.path.basename(path))
+
+    def save_photo(self, chosen):
+        if not chosen.get('path'):
+            return None
+        try:
+            return store_photo(chosen['path'], self.photo_dir)
+        except Exception as e:
+            messagebox.showerror("Photo Error", f"Could not use photo: {e}")
+            return False
+
+    def build_search_tree(self, frame, screen, columns, sort_keys, fetch, filters, row_tags=None):
+        # Filtering, sorting and paging all happen in SQL; the tree only ever holds one page.
+        state = self.list_state.setdefault(screen, {'sort': sort_keys[0], 'descending': screen == 'orders',
+                                                    'offset': 0, 'filters': {}})
+        filter_frame = tk.Frame(frame, bg='white')
+        filter_frame.pack(pady=5)
+        variables = {}
+        for label, key, kind in filters:
+            tk.Label(filter_frame, text=f"{label}:", bg='white').pack(side='left')
+            var = tk.StringVar(value=state['filters'].get(key, ''))
+            if isinstance(kind, list):
+                widget = ttk.Combobox(filter_frame, textvariable=var, values=[''] + kind, state='readonly', width=11)
+            else:
+                widget = tk.Entry(filter_frame, textvariable=var, width=12)
+                widget.bind('<Return>', lambda event: search())
+            widget.pack(side='left', padx=(2, 8))
+            variables[key] = (var, kind)
+
+        tree_frame = tk.Frame(frame)
+        tree_frame.pack(fill='both', expand=True)
+        scrollbar = ttk.Scrollbar(tree_frame, orient='vertical')
+        scrollbar.pack(side='right', fill='y')
+        tree = ttk.Treeview(tree_frame, columns=columns, show='headings', yscrollcommand=scrollbar.set)
+        scrollbar.config(command=tree.yview)
+        tree.pack(fill='both', expand=True)
+
+        pager = tk.Frame(frame, bg='white')
+        pager.pack(pady=2)
+        prev_button = tk.Button(pager, text="< Prev", command=lambda: page(-1))
+        prev_button.pack(side='left', padx=5)
+        page_label = tk.Label(pager, bg='white', width=20)
+        page_label.pack(side='left')
+        next_button = tk.Button(pager, text="Next >", command=lambda: page(1))
+        next_button.pack(side='left', padx=5)
+
+        def reload():
+            rows = fetch(sort=state['sort'], descending=state['descending'], limit=PAGE_SIZE + 1,
+                         offset=state['offset'], **state['filters'])
+            tree.delete(*tree.get_children())
+            tags = row_tags(rows[:PAGE_SIZE]) if row_tags else {}
+            for row in rows[:PAGE_SIZE]:
+                tree.insert('', 'end', values=row, tags=tags.get(row[0], ()))
+            for col, key in zip(columns, sort_keys):
+                arrow = (' \u25bc' if state['descending'] else ' \u25b2') if key == state['sort'] else ''
+                tree.heading(col, text=col + arrow)
+            shown = min(len(rows), PAGE_SIZE)
+            page_label.config(text=f"Rows {state['offset'] + 1}-{state['offset'] + shown}" if shown else "No matching rows")
+            prev_button.config(state='normal' if state['offset'] else 'disabled')
+            next_button.config(state='normal' if len(rows) > PAGE_SIZE else 'disabled')
+
+        def search():
+            values = {}
+            for key, (var, kind) in variables.items():
+                value = var.get().strip()
+                if value and kind == 'date':
+                    try:
+                        datetime.strptime(value, '%Y-%m-%d')
+                    except ValueError:
+                        messagebox.showwarning("Input Error", "Dates must be in YYYY-MM-DD format")
+                        return
+                if value:
+                    values[key] = value
+            state['filters'] = values
+            state['offset'] = 0
+            reload()
+
+        def clear():
+            for var, _ in variables.values():
+                var.set('')
+            search()
+
+        def sort_by(key):
+            if state['sort'] == key:
+                state['descending'] = not state['descending']
+            else:
+                state['sort'] = key
+                state['descending'] = False
+            state['offset'] = 0
+            reload()
+
+        def page(step):
+            state['offset'] = max(0, state['offset'] + step * PAGE_SIZE)
+            reload()
+
+        for col, key in zip(columns, sort_keys):
+            tree.heading(col, text=col, command=lambda key=key: sort_by(key))
+            tree.column(col, width=150, anchor='center')
+        tk.Button(filter_frame, text="Search", command=search, bg='#4a90e2', fg='white').pack(side='left', padx=2)
+        tk.Button(filter_frame, text="Clear", command=clear).pack(side='left', padx=2)
+        reload()
+        return tree
+
+    @traced('screen')
+    def show_login(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=True)
+
+        frame = tk.Frame(canvas, bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Canteen Login", font=("Arial", 20, "bold")).pack(pady=20)
+        tk.Label(frame, text="Username:", bg='white').pack()
+        self.login_username = tk.Entry(frame, font=('Arial', 12))
+        self.login_username.pack(pady=5)
+        tk.Label(frame, text="Password:", bg='white').pack()
+        self.login_password = tk.Entry(frame, show='*', font=('Arial', 12))
+        self.login_password.pack(pady=5)
+        tk.Button(frame, text="Login", command=self.do_login, bg='#4CAF50', fg='white').pack(pady=10)
+        tk.Button(frame, text="Register", command=self.show_register, bg='#4a90e2', fg='white').pack()
+
+    def do_login(self):
+        username = self.login_username.get().strip()
+        password = self.login_password.get().strip()
+        if not username or not password:
+            messagebox.showwarning("Input Error", "Please enter both username and password")
+            return
+        user = self.db.validate_user(username, password)
+        if user:
+            self.user_id = user[0]
+            self.is_admin = user[1] == 1
+            self.db.actor = username
+            self.show_dashboard()
+        else:
+            messagebox.showerror("Login Failed", "Invalid username or password")
+
+    @traced('screen')
+    def show_register(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=True)
+
+        frame = tk.Frame(canvas, bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Register User", font=("Arial", 20, "bold")).pack(pady=20)
+        tk.Label(frame, text="Username:", bg='white').pack()
+        username_entry = tk.Entry(frame, font=('Arial', 12))
+        username_entry.pack(pady=5)
+        tk.Label(frame, text="Password:", bg='white').pack()
+        password_entry = tk.Entry(frame, show='*', font=('Arial', 12))
+        password_entry.pack(pady=5)
+        tk.Label(frame, text="Confirm Password:", bg='white').pack()
+        confirm_entry = tk.Entry(frame, show='*', font=('Arial', 12))
+        confirm_entry.pack(pady=5)
+
+        def register():
+            u = username_entry.get().strip()
+            p = password_entry.get().strip()
+            cp = confirm_entry.get().strip()
+            if not u or not p or not cp:
+                messagebox.showwarning("Input Error", "Please fill all fields")
+                return
+            if len(p) < 6:
+                messagebox.showwarning("Input Error", "Password must be at least 6 characters")
+                return
+            if p != cp:
+                messagebox.showerror("Input Error", "Passwords do not match")
+                return
+            try:
+                added = self.db.add_user(u, p)
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+                return
+            if added:
+                messagebox.showinfo("Success", "User registered successfully. Please login.")
+                self.show_login()
+            else:
+                messagebox.showerror("Error", "Username already exists")
+
+        tk.Button(frame, text="Register", command=register, bg='#4CAF50', fg='white').pack(pady=10)
+        tk.Button(frame, text="Back to Login", command=self.show_login, bg='#4a90e2', fg='white').pack()
+
+    @traced('screen')
+    def show_dashboard(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Canteen Dashboard", font=("Arial", 20, "bold")).pack(pady=20)
+        kpi_frame = tk.Frame(frame)
+        kpi_frame.pack(padx=10, pady=(0, 10))
+        kpi_labels = [("Today's Revenue", 'revenue'), ("Orders Today", 'orders'), ("Average Ticket", 'average_ticket'),
+                      ("Pending Orders", 'pending'), ("Low-Stock Items", 'low_stock')]
+        kpi_vars = {}
+        for column, (text, key) in enumerate(kpi_labels):
+            tk.Label(kpi_frame, text=text, font=('Arial', 9)).grid(row=0, column=column, padx=8)
+            kpi_vars[key] = tk.StringVar()
+            tk.Label(kpi_frame, textvariable=kpi_vars[key], font=('Arial', 14, 'bold')).grid(row=1, column=column, padx=8)
+
+        def refresh_kpis():
+            # Reads the in-memory counters only; the database is not queried here.
+            if not kpi_frame.winfo_exists():
+                return
+            kpis = self.db.kpi_snapshot()
+            for key, var in kpi_vars.items():
+                value = kpis[key]
+                var.set(f"{value:.2f}" if isinstance(value, float) else str(value))
+            self.root.after(KPI_REFRESH_MS, refresh_kpis)
+
+        refresh_kpis()
+        buttons = [
+            ("Manage Menu", self.manage_menu, self.is_admin),
+            ("Place Order", self.create_order, True),
+            ("View Orders", self.view_orders, True),
+            ("Manage Customers", self.manage_customers, True),
+            ("Manage Staff", self.manage_staff, self.is_admin),
+            ("Manage Inventory", self.manage_inventory, self.is_admin),
+            ("Pricing Rules", self.manage_pricing, self.is_admin),
+            ("Query Stats", self.show_query_stats, self.is_admin),
+            ("Data Integrity", self.show_integrity, self.is_admin),
+            ("Close Day", self.show_day_close, self.is_admin),
+            ("All Sites", self.show_sites, self.is_admin and self.site_reader is not None),
+            ("Reset Training Data", self.reset_training_data, self.training),
+            ("Backups", self.show_backups, self.is_admin and self.backup_scheduler is not None),
+            ("Logout", self.show_login, True)
+        ]
+        for text, cmd, show in buttons:
+            if show:
+                tk.Button(frame, text=text, font=('Arial', 12), width=20, command=cmd, bg='#4a90e2', fg='white').pack(pady=5)
+
+    def reset_training_data(self):
+        if messagebox.askyesno("Confirm", "Discard all changes made in this training session?"):
+            try:
+                self.db.reset()
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+                return
+            messagebox.showinfo("Success", "Training data reset")
+
+    @traced('screen')
+    def manage_menu(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Menu Management", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        columns = ('ID', 'Item Name', 'Price', 'Quantity')
+        self.menu_tree = self.build_search_tree(frame, 'menu', columns, ('id', 'name', 'price', 'quantity'),
+                                                self.db.search_menu, [("Name", 'name', 'text')])
+
+        button_frame = tk.Frame(frame, bg='white')
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Add Item", command=self.add_menu_item, bg='#4CAF50', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Update Item", command=self.update_menu_item, bg='#FFA500', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Delete Item", command=self.delete_menu_item, bg='#f44336', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Back", command=self.show_dashboard, bg='#4a90e2', fg='white').pack(side='left', padx=5)
+
+    @traced('screen')
+    def add_menu_item(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Add Menu Item", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        tk.Label(frame, text="Item Name:", bg='white').pack()
+        item_name = tk.Entry(frame, font=('Arial', 12))
+        item_name.pack(pady=5)
+        tk.Label(frame, text="Price:", bg='white').pack()
+        price = tk.Entry(frame, font=('Arial', 12))
+        price.pack(pady=5)
+        tk.Label(frame, text="Quantity:", bg='white').pack()
+        quantity = tk.Entry(frame, font=('Arial', 12))
+        quantity.pack(pady=5)
+        chosen = {}
+        photo_label = tk.Label(frame, text="No photo", bg='white')
+        tk.Button(frame, text="Choose Photo", command=lambda: self.choose_photo(photo_label, chosen)).pack()
+        photo_label.pack()
+
+        def save():
+            name = item_name.get().strip()
+            price_val = price.get().strip()
+            qty_val = quantity.get().strip()
+            if not name or not price_val or not qty_val:
+                messagebox.showwarning("Input Error", "Please fill all fields")
+                return
+            try:
+                price_num = float(price_val)
+                qty_num = int(qty_val)
+                if price_num <= 0 or qty_num < 0:
+                    messagebox.showwarning("Input Error", "Price must be positive, quantity cannot be negative")
+                    return
+                photo = self.save_photo(chosen)
+                if photo is False:
+                    return
+                self.db.add_menu_item(name, price_num, qty_num, photo)
+                messagebox.showinfo("Success", "Menu item added")
+                self.manage_menu()
+            except ValueError:
+                messagebox.showerror("Input Error", "Invalid price or quantity")
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+
+        tk.Button(frame, text="Save", command=save, bg='#4CAF50', fg='white').pack(pady=10)
+        tk.Button(frame, text="Back", command=self.manage_menu, bg='#4a90e2', fg='white').pack()
+
+    @traced('screen')
+    def update_menu_item(self):
+        selected = self.menu_tree.selection()
+        if not selected:
+            messagebox.showwarning("Selection Error", "Please select a menu item")
+            return
+        item_id, name, price, qty = self.menu_tree.item(selected[0])['values']
+
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Update Menu Item", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        tk.Label(frame, text="Item Name:", bg='white').pack()
+        item_name = tk.Entry(frame, font=('Arial', 12))
+        item_name.insert(0, name)
+        item_name.pack(pady=5)
+        tk.Label(frame, text="Price:", bg='white').pack()
+        price_entry = tk.Entry(frame, font=('Arial', 12))
+        price_entry.insert(0, price)
+        price_entry.pack(pady=5)
+        tk.Label(frame, text="Quantity:", bg='white').pack()
+        quantity = tk.Entry(frame, font=('Arial', 12))
+        quantity.insert(0, qty)
+        quantity.pack(pady=5)
+        chosen = {}
+        photo_label = tk.Label(frame, text="Keep current photo", bg='white')
+        tk.Button(frame, text="Choose Photo", command=lambda: self.choose_photo(photo_label, chosen)).pack()
+        photo_label.pack()
+
+        def save():
+            new_name = item_name.get().strip()
+            price_val = price_entry.get().strip()
+            qty_val = quantity.get().strip()
+            if not new_name or not price_val or not qty_val:
+                messagebox.showwarning("Input Error", "Please fill all fields")
+                return
+            try:
+                price_num = float(price_val)
+                qty_num = int(qty_val)
+                if price_num <= 0 or qty_num < 0:
+                    messagebox.showwarning("Input Error", "Price must be positive, quantity cannot be negative")
+                    return
+                photo = self.save_photo(chosen)
+                if photo is False:
+                    return
+                self.db.update_menu_item(item_id, new_name, price_num, qty_num)
+                if photo:
+                    self.db.set_menu_photo(item_id, photo)
+                messagebox.showinfo("Success", "Menu item updated")
+                self.manage_menu()
+            except ValueError:
+                messagebox.showerror("Input Error", "Invalid price or quantity")
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+
+        tk.Button(frame, text="Save", command=save, bg='#FFA500', fg='white').pack(pady=10)
+        tk.Button(frame, text="Back", command=self.manage_menu, bg='#4a90e2', fg='white').pack()
+
+    def delete_menu_item(self):
+        selected = self.menu_tree.selection()
+        if not selected:
+            messagebox.showwarning("Selection Error", "Please select a menu item")
+            return
+        item_id = self.menu_tree.item(selected[0])['values'][0]
+        if messagebox.askyesno("Confirm", "Delete this menu item?"):
+            try:
+                deleted = self.db.delete_menu_item(item_id)
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+                return
+            if deleted:
+                messagebox.showinfo("Success", "Menu item deleted")
+            else:
+                messagebox.showerror("Error", "Cannot delete a menu item that has been ordered or is used by a pricing rule; "
+                                              "set its quantity to 0 instead")
+            self.manage_menu()
+
+    @traced('screen')
+    def manage_customers(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Customer Management", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        columns = ('ID', 'Name', 'Phone', 'Visits', 'Spend', 'Last Visit', 'Favourite')
+        self.customer_tree = self.build_search_tree(frame, 'customers', columns,
+                                                    ('id', 'name', 'phone', 'visits', 'spend', 'last_visit', 'favourite'),
+                                                    self.db.search_customers,
+                                                    [("Name", 'name', 'text'), ("Phone", 'phone', 'text')])
+
+        button_frame = tk.Frame(frame, bg='white')
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Add Customer", command=self.add_customer, bg='#4CAF50', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Update Customer", command=self.update_customer, bg='#FFA500', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Delete Customer", command=self.delete_customer, bg='#f44336', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="View Orders", command=self.view_customer_orders, bg='#4a90e2', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Back", command=self.show_dashboard, bg='#4a90e2', fg='white').pack(side='left', padx=5)
+
+    @traced('screen')
+    def add_customer(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Add Customer", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        tk.Label(frame, text="Name:", bg='white').pack()
+        name = tk.Entry(frame, font=('Arial', 12))
+        name.pack(pady=5)
+        tk.Label(frame, text="Phone:", bg='white').pack()
+        phone = tk.Entry(frame, font=('Arial', 12))
+        phone.pack(pady=5)
+
+        def save():
+            name_val = name.get().strip()
+            phone_val = phone.get().strip()
+            if not name_val or not phone_val:
+                messagebox.showwarning("Input Error", "Please fill all fields")
+                return
+            if not phone_val.isdigit() or len(phone_val) < 10:
+                messagebox.showwarning("Input Error", "Phone must be a valid number (at least 10 digits)")
+                return
+            try:
+                self.db.add_customer(name_val, phone_val)
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+                return
+            messagebox.showinfo("Success", "Customer added")
+            self.manage_customers()
+
+        tk.Button(frame, text="Save", command=save, bg='#4CAF50', fg='white').pack(pady=10)
+        tk.Button(frame, text="Back", command=self.manage_customers, bg='#4a90e2', fg='white').pack()
+
+    @traced('screen')
+    def update_customer(self):
+        selected = self.customer_tree.selection()
+        if not selected:
+            messagebox.showwarning("Selection Error", "Please select a customer")
+            return
+        customer_id, name, phone = self.customer_tree.item(selected[0])['values'][:3]
+
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Update Customer", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        tk.Label(frame, text="Name:", bg='white').pack()
+        name_entry = tk.Entry(frame, font=('Arial', 12))
+        name_entry.insert(0, name)
+        name_entry.pack(pady=5)
+        tk.Label(frame, text="Phone:", bg='white').pack()
+        phone_entry = tk.Entry(frame, font=('Arial', 12))
+        phone_entry.insert(0, phone)
+        phone_entry.pack(pady=5)
+
+        def save():
+            name_val = name_entry.get().strip()
+            phone_val = phone_entry.get().strip()
+            if not name_val or not phone_val:
+                messagebox.showwarning("Input Error", "Please fill all fields")
+                return
+            if not phone_val.isdigit() or len(phone_val) < 10:
+                messagebox.showwarning("Input Error", "Phone must be a valid number (at least 10 digits)")
+                return
+            try:
+                self.db.update_customer(customer_id, name_val, phone_val)
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+                return
+            messagebox.showinfo("Success", "Customer updated")
+            self.manage_customers()
+
+        tk.Button(frame, text="Save", command=save, bg='#FFA500', fg='white').pack(pady=10)
+        tk.Button(frame, text="Back", command=self.manage_customers, bg='#4a90e2', fg='white').pack()
+
+    def delete_customer(self):
+        selected = self.customer_tree.selection()
+        if not selected:
+            messagebox.showwarning("Selection Error", "Please select a customer")
+            return
+        customer_id = self.customer_tree.item(selected[0])['values'][0]
+        if messagebox.askyesno("Confirm", "Delete this customer?"):
+            try:
+                deleted = self.db.delete_customer(customer_id)
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+                return
+            if deleted:
+                messagebox.showinfo("Success", "Customer deleted")
+            else:
+                messagebox.showerror("Error", "Cannot delete customer with existing orders")
+            self.manage_customers()
+
+    def view_customer_orders(self):
+        selected = self.customer_tree.selection()
+        if not selected:
+            messagebox.showwarning("Selection Error", "Please select a customer")
+            return
+        customer_id = self.customer_tree.item(selected[0])['values'][0]
+        self.show_customer_orders(customer_id)
+
+    @traced('screen')
+    def show_customer_orders(self, customer_id):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text=f"Customer Orders (ID: {customer_id})", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        summary = self.db.get_customer_summary(customer_id)
+        if summary is not None:
+            visits, spend, last_visit, favourite = summary
+            tk.Label(frame, text=f"Visits: {visits}   Spend: ${spend:.2f}   Last visit: {last_visit or '-'}   "
+                                 f"Favourite: {favourite or '-'}", bg='white').pack(pady=5)
+        columns = ('ID', 'Order Date', 'Total Price', 'Status')
+        tree_frame = tk.Frame(frame)
+        tree_frame.pack(fill='both', expand=True)
+        scrollbar = ttk.Scrollbar(tree_frame, orient='vertical')
+        scrollbar.pack(side='right', fill='y')
+        order_tree = ttk.Treeview(tree_frame, columns=columns, show='headings', yscrollcommand=scrollbar.set)
+        scrollbar.config(command=order_tree.yview)
+        for col in columns:
+            order_tree.heading(col, text=col)
+            order_tree.column(col, width=150, anchor='center')
+        order_tree.pack(fill='both', expand=True)
+
+        for order in self.db.get_customer_orders(customer_id):
+            order_tree.insert('', 'end', values=order)
+
+        def view_details():
+            selected = order_tree.selection()
+            if not selected:
+                messagebox.showwarning("Selection Error", "Please select an order")
+                return
+            order_id = order_tree.item(selected[0])['values'][0]
+            self.show_order_details(order_id)
+
+        tk.Button(frame, text="View Order Details", command=view_details, bg='#4CAF50', fg='white').pack(pady=5)
+        tk.Button(frame, text="Back", command=self.manage_customers, bg='#4a90e2', fg='white').pack(pady=5)
+
+    @traced('screen')
+    def manage_staff(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Staff Management", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        columns = ('ID', 'Name', 'Role', 'Phone')
+        self.staff_tree = self.build_search_tree(frame, 'staff', columns, ('id', 'name', 'role', 'phone'),
+                                                 self.db.search_staff, [("Name", 'name', 'text')])
+
+        button_frame = tk.Frame(frame, bg='white')
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Add Staff", command=self.add_staff, bg='#4CAF50', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Update Staff", command=self.update_staff, bg='#FFA500', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Delete Staff", command=self.delete_staff, bg='#f44336', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Back", command=self.show_dashboard, bg='#4a90e2', fg='white').pack(side='left', padx=5)
+
+    @traced('screen')
+    def add_staff(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Add Staff", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        tk.Label(frame, text="Name:", bg='white').pack()
+        name = tk.Entry(frame, font=('Arial', 12))
+        name.pack(pady=5)
+        tk.Label(frame, text="Role:", bg='white').pack()
+        role = tk.Entry(frame, font=('Arial', 12))
+        role.pack(pady=5)
+        tk.Label(frame, text="Phone:", bg='white').pack()
+        phone = tk.Entry(frame, font=('Arial', 12))
+        phone.pack(pady=5)
+
+        def save():
+            name_val = name.get().strip()
+            role_val = role.get().strip()
+            phone_val = phone.get().strip()
+            if not name_val or not role_val or not phone_val:
+                messagebox.showwarning("Input Error", "Please fill all fields")
+                return
+            if not phone_val.isdigit() or len(phone_val) < 10:
+                messagebox.showwarning("Input Error", "Phone must be a valid number (at least 10 digits)")
+                return
+            try:
+                self.db.add_staff(name_val, role_val, phone_val)
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+                return
+            messagebox.showinfo("Success", "Staff added")
+            self.manage_staff()
+
+        tk.Button(frame, text="Save", command=save, bg='#4CAF50', fg='white').pack(pady=10)
+        tk.Button(frame, text="Back", command=self.manage_staff, bg='#4a90e2', fg='white').pack()
+
+    @traced('screen')
+    def update_staff(self):
+        selected = self.staff_tree.selection()
+        if not selected:
+            messagebox.showwarning("Selection Error", "Please select a staff member")
+            return
+        staff_id, name, role, phone = self.staff_tree.item(selected[0])['values']
+
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Update Staff", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        tk.Label(frame, text="Name:", bg='white').pack()
+        name_entry = tk.Entry(frame, font=('Arial', 12))
+        name_entry.insert(0, name)
+        name_entry.pack(pady=5)
+        tk.Label(frame, text="Role:", bg='white').pack()
+        role_entry = tk.Entry(frame, font=('Arial', 12))
+        role_entry.insert(0, role)
+        role_entry.pack(pady=5)
+        tk.Label(frame, text="Phone:", bg='white').pack()
+        phone_entry = tk.Entry(frame, font=('Arial', 12))
+        phone_entry.insert(0, phone)
+        phone_entry.pack(pady=5)
+
+        def save():
+            name_val = name_entry.get().strip()
+            role_val = role_entry.get().strip()
+            phone_val = phone_entry.get().strip()
+            if not name_val or not role_val or not phone_val:
+                messagebox.showwarning("Input Error", "Please fill all fields")
+                return
+            if not phone_val.isdigit() or len(phone_val) < 10:
+                messagebox.showwarning("Input Error", "Phone must be a valid number (at least 10 digits)")
+                return
+            try:
+                self.db.update_staff(staff_id, name_val, role_val, phone_val)
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+                return
+            messagebox.showinfo("Success", "Staff updated")
+            self.manage_staff()
+
+        tk.Button(frame, text="Save", command=save, bg='#FFA500', fg='white').pack(pady=10)
+        tk.Button(frame, text="Back", command=self.manage_staff, bg='#4a90e2', fg='white').pack()
+
+    def delete_staff(self):
+        selected = self.staff_tree.selection()
+        if not selected:
+            messagebox.showwarning("Selection Error", "Please select a staff member")
+            return
+        staff_id = self.staff_tree.item(selected[0])['values'][0]
+        if messagebox.askyesno("Confirm", "Delete this staff member?"):
+            try:
+                self.db.delete_staff(staff_id)
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+                return
+            messagebox.showinfo("Success", "Staff member deleted")
+            self.manage_staff()
+
+    @traced('screen')
+    def create_order(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Place Order", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        tk.Label(frame, text="Customer Name:", bg='white').pack()
+        cust_name = tk.Entry(frame, font=('Arial', 12))
+        cust_name.pack(pady=5)
+        tk.Label(frame, text="Phone:", bg='white').pack()
+        cust_phone = tk.Entry(frame, font=('Arial', 12))
+        cust_phone.pack(pady=5)
+        menu_items = self.db.list_menu_tiles()
+        selected_item = {}
+        selected_label = tk.Label(frame, text="Tap a menu item", bg='white', font=('Arial', 12))
+        selected_label.pack()
+
+        def select_item(item):
+            selected_item['item'] = item
+            selected_label.config(text=f"{item[1]}  {item[2]:.2f}  ({item[3]} available)")
+
+        self.build_item_grid(frame, menu_items, select_item)
+        tk.Label(frame, text="Quantity:", bg='white').pack()
+        quantity = tk.Entry(frame, font=('Arial', 12))
+        quantity.insert(0, '1')
+        quantity.pack(pady=5)
+
+        order_frame = tk.Frame(frame, bg='white')
+        order_frame.pack(fill='both', expand=True)
+        columns = ('Item Name', 'Quantity', 'Price', 'Total')
+        self.order_tree = ttk.Treeview(order_frame, columns=columns, show='headings', height=5)
+        for col in columns:
+            self.order_tree.heading(col, text=col)
+            self.order_tree.column(col, width=150, anchor='center')
+        self.order_tree.pack(fill='both', expand=True)
+        for menu_id, item_name, qty, base_price in self.current_order_items:
+            price = self.db.pricing().unit_price(menu_id, base_price, datetime.now())
+            self.order_tree.insert('', 'end', values=(item_name, qty, price, round(qty * price, 2)))
+
+        def add_to_order():
+            try:
+                qty = int(quantity.get().strip())
+                if qty <= 0:
+                    messagebox.showwarning("Input Error", "Quantity must be positive")
+                    return
+                if 'item' not in selected_item:
+                    messagebox.showwarning("Input Error", "Please select a menu item")
+                    return
+                menu_item = selected_item['item']
+                menu_id = menu_item[0]
+                # Stock is only taken when the order is placed; this check is against the count shown on the tile.
+                in_cart = sum(line[2] for line in self.current_order_items if line[0] == menu_id)
+                if qty + in_cart > menu_item[3]:
+                    messagebox.showwarning("Input Error", f"Only {menu_item[3] - in_cart} available")
+                    return
+                price = self.db.pricing().unit_price(menu_id, menu_item[2], datetime.now())
+                self.current_order_items.append((menu_id, menu_item[1], qty, menu_item[2]))
+                self.order_tree.insert('', 'end', values=(menu_item[1], qty, price, round(qty * price, 2)))
+            except ValueError:
+                messagebox.showerror("Input Error", "Invalid quantity")
+
+        def remove_item():
+            selected = self.order_tree.selection()
+            if not selected:
+                messagebox.showwarning("Selection Error", "Please select an item in the order")
+                return
+            del self.current_order_items[self.order_tree.index(selected[0])]
+            self.order_tree.delete(selected[0])
+
+        def save_order():
+            if not self.current_order_items:
+                messagebox.showwarning("Input Error", "No items in order")
+                return
+            name = cust_name.get().strip()
+            phone = cust_phone.get().strip()
+            if not name or not phone:
+                messagebox.showwarning("Input Error", "Please enter customer details")
+                return
+            if not phone.isdigit() or len(phone) < 10:
+                messagebox.showwarning("Input Error", "Phone must be a valid number (at least 10 digits)")
+                return
+            try:
+                order_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                order_id = self.db.place_order(name, phone, self.current_order_items, order_date)
+                self.current_order_items = []
+                order = self.db.get_order(order_id)
+                self.receipt_spool.submit(order, self.db.get_order_items(order_id))
+                messagebox.showinfo("Success", f"Order placed. Total: {order[4]:.2f}\nReceipt sent to {self.receipt_spool.directory}")
+                self.show_dashboard()
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy",
+                                       "Another till is saving right now. The order has been kept; press Place Order again.")
+            except OutOfStockError as e:
+                messagebox.showwarning("Out of Stock", f"{e}. Adjust the order and press Place Order again.")
+            except Exception as e:
+                messagebox.showerror("Error", f"Error placing order: {str(e)}")
+
+        button_frame = tk.Frame(frame, bg='white')
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Add to Order", command=add_to_order, bg='#4CAF50', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Remove Item", command=remove_item, bg='#f44336', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Place Order", command=save_order, bg='#FFA500', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Back", command=self.show_dashboard, bg='#4a90e2', fg='white').pack(side='left', padx=5)
+
+    @traced('screen')
+    def view_orders(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="View Orders", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        columns = ('ID', 'Customer ID', 'Order Date', 'Total Price', 'Status')
+
+        def fetch_orders(sla=None, **filters):
+            return self.db.search_orders(sla_minutes=self.sla_minutes if sla else None, **filters)
+
+        def breach_tags(rows):
+            breaches = self.db.sla_breaches([row[0] for row in rows], self.sla_minutes)
+            return {order_id: ('sla_breach',) for order_id in breaches}
+
+        self.order_tree = self.build_search_tree(frame, 'orders', columns, ('id', 'customer', 'date', 'total', 'status'),
+                                                 fetch_orders,
+                                                 [("Status", 'status', ORDER_STATUSES), ("From", 'date_from', 'date'),
+                                                  ("To", 'date_to', 'date'), ("Phone", 'phone', 'text'),
+                                                  ("Customer", 'name', 'text'), ("SLA", 'sla', ['Breaching'])],
+                                                 row_tags=breach_tags)
+        self.order_tree.tag_configure('sla_breach', background='#f8d7da')
+        tk.Label(frame, text=f"Highlighted orders have been open, or took, longer than {self.sla_minutes:g} minutes",
+                 bg='white', fg='#a94442').pack()
+
+        status_frame = tk.Frame(frame, bg='white')
+        status_frame.pack(pady=5)
+        tk.Label(status_frame, text="Change Status:", bg='white').pack(side='left')
+        status_var = tk.StringVar()
+        status_dropdown = ttk.Combobox(status_frame, textvariable=status_var, 
+                                    values=ORDER_STATUSES, 
+                                    font=('Arial', 12), state='readonly')
+        status_dropdown.pack(side='left', padx=5)
+
+        def change_status():
+            selected = self.order_tree.selection()
+            if not selected:
+                messagebox.showwarning("Selection Error", "Please select an order")
+                return
+            order_id = self.order_tree.item(selected[0])['values'][0]
+            new_status = status_var.get()
+            if not new_status:
+                messagebox.showwarning("Input Error", "Please select a status")
+                return
+            try:
+                self.db.update_order_status(order_id, new_status)
+            except OutOfStockError as e:
+                messagebox.showwarning("Out of Stock", f"Cannot reopen this order: {e}")
+                return
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+                return
+            except sqlite3.IntegrityError as e:
+                messagebox.showerror("Error", f"Cannot change the status of order {order_id}: {e}")
+                return
+            messagebox.showinfo("Success", f"Order status updated to {new_status}")
+            self.view_orders()
+
+        def view_details():
+            selected = self.order_tree.selection()
+            if not selected:
+                messagebox.showwarning("Selection Error", "Please select an order")
+                return
+            order_id = self.order_tree.item(selected[0])['values'][0]
+            self.show_order_details(order_id)
+
+        def reprint_day():
+            selected = self.order_tree.selection()
+            day = self.order_tree.item(selected[0])['values'][2][:10] if selected else datetime.now().strftime('%Y-%m-%d')
+            start = datetime.strptime(day, '%Y-%m-%d')
+            receipts = self.db.get_receipts(day, (start + timedelta(days=1)).strftime('%Y-%m-%d'))
+            if not receipts:
+                messagebox.showinfo("Reprint", f"No orders on {day}")
+                return
+            self.receipt_spool.submit_batch(receipts)
+            messagebox.showinfo("Reprint", f"Reprinting {len(receipts)} receipts for {day} to {self.receipt_spool.directory}")
+
+        button_frame = tk.Frame(frame, bg='white')
+        button_frame.pack(pady=5)
+        tk.Button(button_frame, text="View Details", command=view_details, bg='#4CAF50', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Change Status", command=change_status, bg='#FFA500', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Reprint Day", command=reprint_day, bg='#FFA500', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Kitchen Metrics", command=self.show_kitchen_metrics, bg='#4a90e2', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Back", command=self.show_dashboard, bg='#4a90e2', fg='white').pack(side='left', padx=5)
+
+    @traced('screen')
+    def show_kitchen_metrics(self, day=None):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        day = day or datetime.now().strftime('%Y-%m-%d')
+        tk.Label(frame, text="Kitchen Metrics", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        day_frame = tk.Frame(frame, bg='white')
+        day_frame.pack(pady=5)
+        tk.Label(day_frame, text="Day (YYYY-MM-DD):", bg='white').pack(side='left')
+        day_entry = tk.Entry(day_frame, font=('Arial', 12), width=12)
+        day_entry.insert(0, day)
+        day_entry.pack(side='left', padx=5)
+
+        def show_day():
+            value = day_entry.get().strip()
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                messagebox.showwarning("Input Error", "Dates must be in YYYY-MM-DD format")
+                return
+            self.show_kitchen_metrics(value)
+
+        tk.Button(day_frame, text="Show", command=show_day, bg='#4a90e2', fg='white').pack(side='left')
+
+        end = (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        metrics = self.db.kitchen_metrics(day, end)
+        for label, key in (("Wait (Pending to Processing)", 'wait'), ("Prep (Processing to Completed)", 'prep'),
+                           ("Total (Pending to Completed)", 'total')):
+            stats = metrics[key]
+            tk.Label(frame, text=f"{label}: {stats['count']} orders, p50 {stats['p50']} min, p90 {stats['p90']} min, "
+                                 f"p95 {stats['p95']} min, max {stats['max']} min", bg='white').pack()
+
+        columns = ('Hour', 'Orders', 'Max Queue', 'Queue at End')
+        tree_frame = tk.Frame(frame)
+        tree_frame.pack(fill='both', expand=True, pady=5)
+        scrollbar = ttk.Scrollbar(tree_frame, orient='vertical')
+        scrollbar.pack(side='right', fill='y')
+        hour_tree = ttk.Treeview(tree_frame, columns=columns, show='headings', yscrollcommand=scrollbar.set)
+        scrollbar.config(command=hour_tree.yview)
+        for col in columns:
+            hour_tree.heading(col, text=col)
+            hour_tree.column(col, width=150, anchor='center')
+        hour_tree.pack(fill='both', expand=True)
+
+        busiest = max(metrics['hours'], key=lambda hour: hour['max_queue'], default=None)
+        hour_tree.tag_configure('busiest', background='#f8d7da')
+        for hour in metrics['hours']:
+            hour_tree.insert('', 'end', values=(hour['hour'], hour['orders'], hour['max_queue'], hour['queue_at_end']),
+                             tags=('busiest',) if hour is busiest else ())
+
+        tk.Button(frame, text="Back", command=self.view_orders, bg='#4a90e2', fg='white').pack(pady=5)
+
+    @traced('screen')
+    def show_order_details(self, order_id):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text=f"Order Details (ID: {order_id})", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        columns = ('ID', 'Item Name', 'Quantity', 'Price')
+        tree_frame = tk.Frame(frame)
+        tree_frame.pack(fill='both', expand=True)
+        scrollbar = ttk.Scrollbar(tree_frame, orient='vertical')
+        scrollbar.pack(side='right', fill='y')
+        order_items_tree = ttk.Treeview(tree_frame, columns=columns, show='headings', yscrollcommand=scrollbar.set)
+        scrollbar.config(command=order_items_tree.yview)
+        for col in columns:
+            order_items_tree.heading(col, text=col)
+            order_items_tree.column(col, width=150, anchor='center')
+        order_items_tree.pack(fill='both', expand=True)
+
+        items = self.db.get_order_items(order_id)
+        for item_id, item_name, quantity, unit_price in items:
+            order_items_tree.insert('', 'end', values=(item_id, item_name, quantity, 'n/a' if unit_price is None else unit_price))
+
+        def print_receipt():
+            self.receipt_spool.submit(self.db.get_order(order_id), items)
+            messagebox.showinfo("Success", f"Receipt sent to {self.receipt_spool.directory}")
+
+        button_frame = tk.Frame(frame, bg='white')
+        button_frame.pack(pady=5)
+        tk.Button(button_frame, text="Print Receipt", command=print_receipt, bg='#4CAF50', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Back", command=self.view_orders, bg='#4a90e2', fg='white').pack(side='left', padx=5)
+
+    @traced('screen')
+    def manage_inventory(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Inventory Management", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        columns = ('ID', 'Item Name', 'Quantity')
+        self.inventory_tree = self.build_search_tree(frame, 'inventory', columns, ('id', 'name', 'quantity'),
+                                                     self.db.search_inventory, [("Name", 'name', 'text')])
+
+        button_frame = tk.Frame(frame, bg='white')
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Add Item", command=self.add_inventory_item, bg='#4CAF50', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Update Item", command=self.update_inventory, bg='#FFA500', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Back", command=self.show_dashboard, bg='#4a90e2', fg='white').pack(side='left', padx=5)
+
+    @traced('screen')
+    def add_inventory_item(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Add Inventory Item", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        tk.Label(frame, text="Item Name:", bg='white').pack()
+        item_name = tk.Entry(frame, font=('Arial', 12))
+        item_name.pack(pady=5)
+        tk.Label(frame, text="Quantity:", bg='white').pack()
+        quantity = tk.Entry(frame, font=('Arial', 12))
+        quantity.pack(pady=5)
+
+        def save():
+            name = item_name.get().strip()
+            qty = quantity.get().strip()
+            if not name or not qty:
+                messagebox.showwarning("Input Error", "Please fill all fields")
+                return
+            try:
+                qty_num = int(qty)
+                if qty_num < 0:
+                    messagebox.showwarning("Input Error", "Quantity cannot be negative")
+                    return
+                self.db.add_inventory_item(name, qty_num)
+                messagebox.showinfo("Success", "Inventory item added")
+                self.manage_inventory()
+            except ValueError:
+                messagebox.showerror("Input Error", "Invalid quantity")
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+
+        tk.Button(frame, text="Save", command=save, bg='#4CAF50', fg='white').pack(pady=10)
+        tk.Button(frame, text="Back", command=self.manage_inventory, bg='#4a90e2', fg='white').pack()
+
+    @traced('screen')
+    def update_inventory(self):
+        selected = self.inventory_tree.selection()
+        if not selected:
+            messagebox.showwarning("Selection Error", "Please select an inventory item")
+            return
+        item_id, name, qty = self.inventory_tree.item(selected[0])['values']
+
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Update Inventory Item", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        tk.Label(frame, text="Item Name:", bg='white').pack()
+        item_name = tk.Entry(frame, font=('Arial', 12))
+        item_name.insert(0, name)
+        item_name.pack(pady=5)
+        tk.Label(frame, text="Quantity:", bg='white').pack()
+        quantity = tk.Entry(frame, font=('Arial', 12))
+        quantity.insert(0, qty)
+        quantity.pack(pady=5)
+
+        def save():
+            qty = quantity.get().strip()
+            if not qty:
+                messagebox.showwarning("Input Error", "Please enter quantity")
+                return
+            try:
+                qty_num = int(qty)
+                if qty_num < 0:
+                    messagebox.showwarning("Input Error", "Quantity cannot be negative")
+                    return
+                self.db.update_inventory(item_id, qty_num)
+                messagebox.showinfo("Success", "Inventory item updated")
+                self.manage_inventory()
+            except ValueError:
+                messagebox.showerror("Input Error", "Invalid quantity")
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+
+        tk.Button(frame, text="Save", command=save, bg='#FFA500', fg='white').pack(pady=10)
+        tk.Button(frame, text="Back", command=self.manage_inventory, bg='#4a90e2', fg='white').pack()
+
+    @traced('screen')
+    def show_query_stats(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Query Stats", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        locks = self.db.lock_stats
+        tk.Label(frame, text=f"Write transactions: {locks['transactions']}   Lock waits: {locks['lock_waits']} "
+                             f"({locks['wait_ms']:.0f} ms, max {locks['max_wait_ms']:.0f} ms)   "
+                             f"Retries: {locks['retries']}   Failed: {locks['failures']}", bg='white').pack()
+        if self.db.profiler is None:
+            tk.Label(frame, text="Start with --profile-queries to record per-method timings.", bg='white').pack(pady=5)
+            tk.Button(frame, text="Back", command=self.show_dashboard, bg='#4a90e2', fg='white').pack(pady=10)
+            return
+
+        summary = self.db.profiler.summary()
+        columns = ('Method', 'Calls', 'Total ms', 'p50 ms', 'p95 ms', 'p99 ms', 'Max ms')
+        method_tree = ttk.Treeview(frame, columns=columns, show='headings', height=8)
+        for col in columns:
+            method_tree.heading(col, text=col)
+            method_tree.column(col, width=150 if col == 'Method' else 80, anchor='center')
+        method_tree.pack(fill='both', expand=True)
+        methods = sorted(summary['methods'].items(), key=lambda kv: kv[1]['total_ms'], reverse=True)
+        for name, stats in methods:
+            method_tree.insert('', 'end', values=(name, stats['count'], stats['total_ms'], stats['p50_ms'],
+                                                  stats['p95_ms'], stats['p99_ms'], stats['max_ms']))
+
+        tk.Label(frame, text=f"Statements slower than {summary['slow_query_ms']} ms", font=("Arial", 12, "bold"), bg='white').pack(pady=5)
+        columns = ('Method', 'Count', 'Max ms', 'Full Scan', 'SQL')
+        slow_tree = ttk.Treeview(frame, columns=columns, show='headings', height=6)
+        for col in columns:
+            slow_tree.heading(col, text=col)
+            slow_tree.column(col, width=300 if col == 'SQL' else 90, anchor='center')
+        slow_tree.pack(fill='both', expand=True)
+        for entry in summary['slow_queries']:
+            slow_tree.insert('', 'end', values=(entry['method'], entry['count'], round(entry['max_ms'], 3),
+                                                'Yes' if entry['full_scan'] else 'No', entry['sql']))
+
+        def export():
+            path = self.db.profiler.dump(QUERY_STATS_PATH, {'locks': self.db.lock_stats})
+            messagebox.showinfo("Success", f"Query stats written to {path}")
+
+        button_frame = tk.Frame(frame, bg='white')
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Export JSON", command=export, bg='#4CAF50', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Refresh", command=self.show_query_stats, bg='#FFA500', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Back", command=self.show_dashboard, bg='#4a90e2', fg='white').pack(side='left', padx=5)
+
+    @traced('screen')
+    def show_sites(self, date_from=None, date_to=None, name='', phone=''):
+        date_from = date_from or datetime.now().strftime('%Y-%m-%d')
+        date_to = date_to or date_from
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="All Sites", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        filter_frame = tk.Frame(frame, bg='white')
+        filter_frame.pack(pady=5)
+        variables = {}
+        for label, key, value in (("From", 'date_from', date_from), ("To", 'date_to', date_to),
+                                  ("Customer name", 'name', name), ("Phone", 'phone', phone)):
+            tk.Label(filter_frame, text=f"{label}:", bg='white').pack(side='left')
+            variables[key] = tk.StringVar(value=value)
+            entry = tk.Entry(filter_frame, textvariable=variables[key], width=12)
+            entry.pack(side='left', padx=(2, 8))
+            entry.bind('<Return>', lambda event: search())
+
+        def search():
+            values = {key: var.get().strip() for key, var in variables.items()}
+            try:
+                for key in ('date_from', 'date_to'):
+                    datetime.strptime(values[key], '%Y-%m-%d')
+            except ValueError:
+                messagebox.showwarning("Input Error", "Dates must be in YYYY-MM-DD format")
+                return
+            self.show_sites(**values)
+
+        tk.Button(filter_frame, text="Search", command=search).pack(side='left')
+
+        sales = self.site_reader.sales(date_from, date_to)
+        columns = ('Site', 'Orders', 'Revenue', 'Open')
+        site_tree = ttk.Treeview(frame, columns=columns, show='headings', height=6)
+        for col in columns:
+            site_tree.heading(col, text=col)
+            site_tree.column(col, width=160 if col == 'Site' else 100, anchor='center')
+        site_tree.pack(fill='both', expand=True)
+        for site, orders, revenue, open_orders in sales['sites']:
+            site_tree.insert('', 'end', values=(site, orders, f"{revenue:.2f}", open_orders))
+        for site, error in sorted(sales['unavailable'].items()):
+            site_tree.insert('', 'end', values=(site, 'unavailable', error, ''))
+        orders, revenue, open_orders = sales['total']
+        site_tree.insert('', 'end', values=("All sites", orders, f"{revenue:.2f}", open_orders))
+
+        if name or phone:
+            tk.Label(frame, text="Customers", font=("Arial", 12, "bold"), bg='white').pack(pady=5)
+            columns = ('Site', 'ID', 'Name', 'Phone', 'Visits', 'Spend', 'Last Visit')
+            rows = self.site_reader.find_customers(name or None, phone or None)['customers']
+        else:
+            tk.Label(frame, text="Best sellers", font=("Arial", 12, "bold"), bg='white').pack(pady=5)
+            columns = ('Item', 'Quantity', 'Revenue')
+            rows = self.site_reader.top_items(date_from, date_to)['items']
+        detail_tree = ttk.Treeview(frame, columns=columns, show='headings', height=8)
+        for col in columns:
+            detail_tree.heading(col, text=col)
+            detail_tree.column(col, width=110, anchor='center')
+        detail_tree.pack(fill='both', expand=True)
+        for row in rows:
+            detail_tree.insert('', 'end', values=row)
+
+        tk.Button(frame, text="Back", command=self.show_dashboard, bg='#4a90e2', fg='white').pack(pady=10)
+
+    @traced('screen')
+    def show_day_close(self, day=None):
+        day = day or datetime.now().strftime('%Y-%m-%d')
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Close Day", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        date_frame = tk.Frame(frame, bg='white')
+        date_frame.pack(pady=5)
+        tk.Label(date_frame, text="Day:", bg='white').pack(side='left')
+        date_var = tk.StringVar(value=day)
+        date_entry = tk.Entry(date_frame, textvariable=date_var, width=12)
+        date_entry.pack(side='left', padx=5)
+
+        def chosen_day():
+            try:
+                return datetime.strptime(date_var.get().strip(), '%Y-%m-%d').strftime('%Y-%m-%d')
+            except ValueError:
+                messagebox.showwarning("Input Error", "Dates must be in YYYY-MM-DD format")
+
+        def load():
+            chosen = chosen_day()
+            if chosen:
+                self.show_day_close(chosen)
+
+        date_entry.bind('<Return>', lambda event: load())
+        tk.Button(date_frame, text="Show", command=load).pack(side='left')
+
+        report = self.db.day_report(day)
+        state = f"Closed {report['closed_at']}" if report['closed_at'] else "Not closed yet"
+        tk.Label(frame, text=f"{state}   Orders: {report['orders']}   Revenue: ${report['revenue']:.2f}   "
+                             f"Still open: {len(report['open_orders'])}", bg='white').pack(pady=5)
+
+        columns = ('Status', 'Item', 'Quantity', 'Revenue')
+        item_tree = ttk.Treeview(frame, columns=columns, show='headings', height=8)
+        for col in columns:
+            item_tree.heading(col, text=col)
+            item_tree.column(col, width=200 if col == 'Item' else 110, anchor='center')
+        item_tree.pack(fill='both', expand=True)
+        for status, orders, revenue in report['statuses']:
+            item_tree.insert('', 'end', values=(status, f"{orders} orders", '', f"{revenue:.2f}"))
+        for status, _, name, quantity, revenue in report['items']:
+            item_tree.insert('', 'end', values=(status, name, quantity, f"{revenue:.2f}"))
+
+        tk.Label(frame, text="Orders still open", font=("Arial", 12, "bold"), bg='white').pack(pady=5)
+        columns = ('ID', 'Order Date', 'Status', 'Total')
+        open_tree = ttk.Treeview(frame, columns=columns, show='headings', height=5)
+        for col in columns:
+            open_tree.heading(col, text=col)
+            open_tree.column(col, width=130, anchor='center')
+        open_tree.pack(fill='both', expand=True)
+        for row in report['open_orders'][:PAGE_SIZE]:
+            open_tree.insert('', 'end', values=row)
+
+        def close():
+            closing = chosen_day()
+            if not closing:
+                return
+            force = self.db.is_day_closed(closing)
+            question = f"{closing} is already closed. Close it again?" if force else f"Close {closing}?"
+            if not messagebox.askyesno("Confirm", question):
+                return
+            try:
+                self.db.close_day(closing, force)
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+                return
+            messagebox.showinfo("Success", f"{closing} closed")
+            self.show_day_close(closing)
+
+        button_frame = tk.Frame(frame, bg='white')
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Close Day", command=close, bg='#f44336', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Back", command=self.show_dashboard, bg='#4a90e2', fg='white').pack(side='left', padx=5)
+
+    @traced('screen')
+    def show_integrity(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Data Integrity", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        columns = ('Check', 'Scanned To', 'Last Row', 'Passes', 'Last Complete', 'Issues')
+        check_tree = ttk.Treeview(frame, columns=columns, show='headings', height=len(INTEGRITY_CHECKS))
+        for col in columns:
+            check_tree.heading(col, text=col)
+            check_tree.column(col, width=170 if col == 'Check' else 110 if col == 'Last Complete' else 80, anchor='center')
+        check_tree.pack(fill='both', expand=True)
+        for row in self.db.integrity_status():
+            check_tree.insert('', 'end', values=tuple('-' if value is None else value for value in row))
+
+        tk.Label(frame, text="Issues (nothing is changed until a repair plan is applied)", font=("Arial", 12, "bold"),
+                 bg='white').pack(pady=5)
+        columns = ('Check', 'Row', 'Detail', 'Found')
+        issue_tree = ttk.Treeview(frame, columns=columns, show='headings', height=8)
+        for col in columns:
+            issue_tree.heading(col, text=col)
+            issue_tree.column(col, width=300 if col == 'Detail' else 130, anchor='center')
+        issue_tree.pack(fill='both', expand=True)
+        for row in self.db.list_integrity_issues(PAGE_SIZE):
+            issue_tree.insert('', 'end', values=row)
+
+        def scan():
+            try:
+                self.db.run_integrity_pass(max_steps=INTEGRITY_SCAN_STEPS)
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+            self.show_integrity()
+
+        def export():
+            path = filedialog.asksaveasfilename(initialfile=INTEGRITY_PLAN_PATH, defaultextension='.sql',
+                                                filetypes=[("SQL script", "*.sql")])
+            if path:
+                write_atomic(path, self.db.integrity_repair_plan().encode('utf-8'))
+                messagebox.showinfo("Success", f"Repair plan written to {path}")
+
+        button_frame = tk.Frame(frame, bg='white')
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Scan Now", command=scan, bg='#FFA500', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Export Repair Plan", command=export, bg='#4CAF50', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Back", command=self.show_dashboard, bg='#4a90e2', fg='white').pack(side='left', padx=5)
+
+    @traced('screen')
+    def show_backups(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        scheduler = self.backup_scheduler
+        tk.Label(frame, text="Backups", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        tk.Label(frame, text=f"Every {scheduler.interval / 60:g} min to {scheduler.directory}, keeping {scheduler.keep}",
+                 bg='white').pack()
+        columns = ('Time', 'Size KB', 'Seconds', 'MB/s', 'Longest Step ms', 'Integrity')
+        tree_frame = tk.Frame(frame)
+        tree_frame.pack(fill='both', expand=True)
+        scrollbar = ttk.Scrollbar(tree_frame, orient='vertical')
+        scrollbar.pack(side='right', fill='y')
+        backup_tree = ttk.Treeview(tree_frame, columns=columns, show='headings', yscrollcommand=scrollbar.set)
+        scrollbar.config(command=backup_tree.yview)
+        for col in columns:
+            backup_tree.heading(col, text=col)
+            backup_tree.column(col, width=120, anchor='center')
+        backup_tree.pack(fill='both', expand=True)
+
+        for report in reversed(scheduler.reports):
+            if 'error' in report:
+                backup_tree.insert('', 'end', values=(report['time'], '', '', '', '', report['error']))
+            else:
+                backup_tree.insert('', 'end', values=(report['time'], round(report['bytes'] / 1024, 1), report['seconds'],
+                                                      report['mb_per_s'], report['longest_step_ms'], report['integrity']))
+
+        def backup_now():
+            scheduler.trigger()
+            messagebox.showinfo("Success", "Backup started; press Refresh to see the result")
+
+        button_frame = tk.Frame(frame, bg='white')
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Backup Now", command=backup_now, bg='#4CAF50', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Refresh", command=self.show_backups, bg='#FFA500', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Back", command=self.show_dashboard, bg='#4a90e2', fg='white').pack(side='left', padx=5)
+
+    @traced('screen')
+    def manage_pricing(self):
+        self.clear_window()
+        canvas = tk.Canvas(self.root)
+        canvas.pack(fill='both', expand=True)
+        self.current_canvas = canvas
+        self.set_background(canvas, for_login=False)
+
+        frame = tk.Frame(canvas, bg='white', bd=2, relief='raised')
+        frame.place(relx=0.5, rely=0.5, anchor='center')
+
+        tk.Label(frame, text="Pricing Rules", font=("Arial", 20, "bold"), bg='white').pack(pady=10)
+        tk.Label(frame, text="Days are 0=Mon ... 6=Sun. Price sets a fixed price, Discount takes a percentage off, "
+                             "Combo sells its items together for the value.", bg='white').pack()
+        columns = ('ID', 'Name', 'Kind', 'Applies To', 'Value', 'Days', 'From', 'To', 'Active')
+        rule_tree = ttk.Treeview(frame, columns=columns, show='headings', height=8)
+        for col in columns:
+            rule_tree.heading(col, text=col)
+            rule_tree.column(col, width=180 if col == 'Applies To' else 80, anchor='center')
+        rule_tree.pack(fill='both', expand=True)
+        for rule in self.db.list_price_rules():
+            rule_tree.insert('', 'end', values=rule)
+
+        menu_items = self.db.list_menu()
+        form = tk.Frame(frame, bg='white')
+        form.pack(pady=5)
+        fields = {}
+        for row, (label, default) in enumerate([("Name", ""), ("Value", ""), ("Days", "0123456"),
+                                                ("From (HH:MM)", "00:00"), ("To (HH:MM)", "24:00"),
+                                                ("Combo items (ID:qty, ...)", "")]):
+            tk.Label(form, text=label + ":", bg='white').grid(row=row, column=0, sticky='e')
+            entry = tk.Entry(form, font=('Arial', 12))
+            entry.insert(0, default)
+            entry.grid(row=row, column=1, pady=2)
+            fields[label] = entry
+        kind_var = tk.StringVar(value='discount')
+        tk.Label(form, text="Kind:", bg='white').grid(row=0, column=2, sticky='e')
+        ttk.Combobox(form, textvariable=kind_var, values=PRICE_RULE_KINDS, state='readonly').grid(row=0, column=3, padx=5)
+        item_var = tk.StringVar(value='All items')
+        tk.Label(form, text="Menu Item:", bg='white').grid(row=1, column=2, sticky='e')
+        ttk.Combobox(form, textvariable=item_var, state='readonly',
+                     values=['All items'] + [f"{item[1]} (ID: {item[0]})" for item in menu_items]).grid(row=1, column=3, padx=5)
+
+        def add_rule():
+            name = fields["Name"].get().strip()
+            if not name:
+                messagebox.showwarning("Input Error", "Please enter a name")
+                return
+            try:
+                value = float(fields["Value"].get().strip())
+                combo_items = []
+                for part in fields["Combo items (ID:qty, ...)"].get().split(','):
+                    if part.strip():
+                        item_id, qty = part.split(':')
+                        combo_items.append((int(item_id), int(qty)))
+            except ValueError:
+                messagebox.showerror("Input Error", "Value must be a number and combo items ID:qty pairs")
+                return
+            kind = kind_var.get()
+            menu_id = None if item_var.get() == 'All items' else int(item_var.get().split('(ID: ')[1].rstrip(')'))
+            if kind == 'combo' and not combo_items:
+                messagebox.showwarning("Input Error", "A combo needs at least one item")
+                return
+            if kind == 'discount' and not 0 < value <= 100:
+                messagebox.showwarning("Input Error", "Discount must be a percentage between 0 and 100")
+                return
+            days = fields["Days"].get().strip()
+            if not days or not set(days) <= set('0123456'):
+                messagebox.showwarning("Input Error", "Days must be digits 0-6")
+                return
+            try:
+                self.db.add_price_rule(name, kind, None if kind == 'combo' else menu_id, value, days,
+                                       fields["From (HH:MM)"].get().strip(), fields["To (HH:MM)"].get().strip(),
+                                       combo_items if kind == 'combo' else ())
+            except ValueError:
+                messagebox.showerror("Input Error", "Times must be in HH:MM format between 00:00 and 24:00")
+                return
+            except DatabaseBusyError:
+                messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+                return
+            messagebox.showinfo("Success", "Pricing rule added")
+            self.manage_pricing()
+
+        def selected_rule():
+            selected = rule_tree.selection()
+            if not selected:
+                messagebox.showwarning("Selection Error", "Please select a pricing rule")
+                return None
+            return rule_tree.item(selected[0])['values']
+
+        def toggle_rule():
+            rule = selected_rule()
+            if rule:
+                try:
+                    self.db.set_price_rule_active(rule[0], rule[8] != 'Yes')
+                except DatabaseBusyError:
+                    messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+                    return
+                self.manage_pricing()
+
+        def delete_rule():
+            rule = selected_rule()
+            if rule and messagebox.askyesno("Confirm", "Delete this pricing rule?"):
+                try:
+                    self.db.delete_price_rule(rule[0])
+                except DatabaseBusyError:
+                    messagebox.showwarning("Database Busy", BUSY_MESSAGE)
+                    return
+                self.manage_pricing()
+
+        button_frame = tk.Frame(frame, bg='white')
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Add Rule", command=add_rule, bg='#4CAF50', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Enable/Disable", command=toggle_rule, bg='#FFA500', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Delete", command=delete_rule, bg='#f44336', fg='white').pack(side='left', padx=5)
+        tk.Button(button_frame, text="Back", command=self.show_dashboard, bg='#4a90e2', fg='white').pack(side='left', padx=5)
+
+def bench_startup(runs=5):
+    import statistics
+    import subprocess
+    import tempfile
+
+    def report(label, samples):
+        ms = [sample * 1000 for sample in samples]
+        print(f"{label:<28} median {statistics.median(ms):9.2f} ms   min {min(ms):9.2f} ms   max {max(ms):9.2f} ms")
+
+    def timed(func):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    report("interpreter start", [timed(lambda: subprocess.run([sys.executable, '-c', 'pass'], check=True))
+                                 for _ in range(runs)])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A real launch of the entry script, which is compiled afresh every time like any __main__, up to the point
+        # where the login form has been painted.
+        entry = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'canteen_management_system.py')
+        command = [sys.executable, entry, '--db', os.path.join(tmp, 'launch.db'), '--no-journal', '--exit-after-paint']
+        launches = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = subprocess.run(command, capture_output=True, text=True)
+            if result.returncode:
+                error = (result.stderr.strip().splitlines() or ['no output'])[-1]
+                print(f"launch to first paint        skipped ({error})")
+                break
+            launches.append(time.perf_counter() - start)
+        else:
+            report("launch to first paint", launches)
+
+        fresh, current = [], []
+        for run in range(runs):
+            path = os.path.join(tmp, f'bench{run}.db')
+            fresh.append(timed(lambda: CanteenDB(path).conn.close()))
+            current.append(timed(lambda: CanteenDB(path).conn.close()))
+        report("open db (new schema)", fresh)
+        report("open db (schema current)", current)
+        report("open db (:memory:)", [timed(lambda: CanteenDB(':memory:').conn.close()) for _ in range(runs)])
+        report("training copy into RAM", [timed(lambda: CanteenDB.training_copy(path).conn.close()) for _ in range(runs)])
+
+        Image, _ = load_pil()
+        if Image is not None and os.path.exists(BG_IMAGE_PATH):
+            report("decode background image", [timed(lambda: Image.open(BG_IMAGE_PATH).load()) for _ in range(runs)])
+        else:
+            print("decode background image      skipped (Pillow or image not available)")
+
+        try:
+            built, ready = [], []
+            for run in range(runs):
+                start = time.perf_counter()
+                root = tk.Tk()
+                app = CanteenApp(root, db_path=os.path.join(tmp, f'app{run}.db'))
+                built.append(time.perf_counter() - start)
+                app.first_paint()
+                root.update()
+                ready.append(time.perf_counter() - start)
+                root.destroy()
+            report("login screen built", built)
+            report("painted + deferred startup", ready)
+        except tk.TclError as e:
+            print(f"login screen built           skipped ({e})")
+
+def bench_receipts(orders=2000, workers=RECEIPT_WORKERS, formats=RECEIPT_FORMATS):
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CanteenDB(os.path.join(tmp, 'bench.db'), read_pool_size=0)
+        for n in range(12):
+            db.add_menu_item(f"Item {n}", 2.5 + n, 10 ** 6)
+        menu_ids = [row[0] for row in db.list_menu()]
+        day = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+        for n in range(orders):
+            items = [(menu_ids[(n + k) % len(menu_ids)], '', 1 + k, 0.0) for k in range(1 + n % 4)]
+            db.place_order(f"Customer {n}", f"{n:010d}", items, (day + timedelta(seconds=n)).strftime('%Y-%m-%d %H:%M:%S'))
+        start = time.perf_counter()
+        receipts = db.get_receipts(day.strftime('%Y-%m-%d'), (day + timedelta(days=1)).strftime('%Y-%m-%d'))
+        fetched = time.perf_counter() - start
+        print(f"fetch {len(receipts)} orders           {fetched * 1000:9.2f} ms")
+        if 'png' in formats and load_pil()[0] is None:
+            print("PNG skipped: Pillow is not installed")
+
+        def run(label, spool):
+            start = time.perf_counter()
+            spool.render_batch(receipts)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<28} {elapsed * 1000:9.2f} ms   {len(receipts) / elapsed:9.0f} receipts/s")
+            spool.shutdown()
+
+        run("text only, 1 process", ReceiptSpool(os.path.join(tmp, 'txt'), ('txt',), workers=1))
+        run("all formats, 1 process", ReceiptSpool(os.path.join(tmp, 'one'), formats, workers=1))
+        run(f"all formats, {workers} processes", ReceiptSpool(os.path.join(tmp, 'pool'), formats, workers=workers))
+        db.conn.close()
+
+def print_day_report(report):
+    state = f"closed {report['closed_at']}" if report['closed_at'] else "open (live scan)"
+    print(f"Z report for {report['day']}: {state}")
+    print(f"{report['orders']} orders, revenue {report['revenue']:.2f}, {len(report['open_orders'])} still open")
+    for status, orders, revenue in report['statuses']:
+        print(f"  {status:<12} {orders:>8} orders {revenue:>12.2f}")
+    print("Items")
+    for status, menu_id, name, quantity, revenue in report['items']:
+        print(f"  {status:<12} {name:<28} {quantity:>8} {revenue:>12.2f}")
+    print("Closing stock")
+    for source, item_id, name, quantity in report['stock']:
+        print(f"  {source:<10} {name:<30} {quantity:>8}")
+    for order_id, order_date, status, total_price in report['open_orders']:
+        print(f"  open order {order_id} from {order_date} is still {status} ({total_price:.2f})")
+
+def bench_close_day(orders=100000):
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CanteenDB(os.path.join(tmp, 'bench.db'), read_pool_size=0)
+        for n in range(12):
+            db.add_menu_item(f"Item {n}", 2.5 + n, 10 ** 6)
+        menu = db.list_menu()
+        customer_id = db.add_customer("Bench Customer", "0000000000")
+        day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+        rng = random.Random(0)
+        start = time.perf_counter()
+        # Written straight into the tables: the benchmark is about closing a day, not about placing orders.
+        with db.conn:
+            for first in range(0, orders, 10000):
+                order_rows, line_rows = [], []
+                for n in range(first, min(first + 10000, orders)):
+                    lines = [(menu[(n + k) % len(menu)], 1 + rng.randrange(3)) for k in range(1 + n % 4)]
+                    status = rng.choices(ORDER_STATUSES, weights=(3, 2, 90, 5))[0]
+                    order_date = (day + timedelta(seconds=n * 86400 // orders)).strftime('%Y-%m-%d %H:%M:%S')
+                    order_rows.append((n + 1, customer_id, order_date, round(sum(item[2] * qty for item, qty in lines), 2), status))
+                    line_rows.extend((n + 1, item[0], qty, item[2]) for item, qty in lines)
+                db.conn.executemany('INSERT INTO orders (id, customer_id, order_date, total_price, status) VALUES (?, ?, ?, ?, ?)',
+                                    order_rows)
+                db.conn.executemany('INSERT INTO order_items (order_id, menu_id, quantity, unit_price) VALUES (?, ?, ?, ?)',
+                                    line_rows)
+        lines = db.conn.execute('SELECT COUNT(*) FROM order_items').fetchone()[0]
+        print(f"synthetic day: {orders} orders, {lines} lines ({time.perf_counter() - start:.1f} s to generate)")
+        name = day.strftime('%Y-%m-%d')
+
+        def timed(label, func):
+            start = time.perf_counter()
+            result = func()
+            print(f"{label:<32} {(time.perf_counter() - start) * 1000:9.2f} ms")
+            return result
+
+        timed("scan day (live report)", lambda: db.scan_day(name))
+        report = timed("close day (scan + store)", lambda: db.close_day(name))
+        closed = timed("report for the closed day", lambda: db.day_report(name))
+        print(f"revenue {report['revenue']:.2f}, {len(report['open_orders'])} open orders flagged, "
+              f"stored report matches scan: {closed['revenue'] == report['revenue'] and closed['items'] == report['items']}")
+        db.conn.close()
+
+def stress_worker(path, worker, seconds, rate, db_options, ready, results):
+    rng = random.Random(worker)
+    try:
+        db = CanteenDB(path, **db_options)
+        menu_ids = [row[0] for row in db.list_menu()]
+    except Exception as e:
+        # Still meet the others at the barrier so the run goes ahead and reports this worker as failed.
+        ready.wait()
+        results.put({'error': f"worker {worker} could not open the database: {e}"})
+        return
+    counts = {'place': 0, 'cancel': 0, 'modify': 0, 'out_of_stock': 0, 'busy': 0, 'errors': 0}
+    latencies = []
+    open_orders = []
+    ready.wait()
+    began = time.perf_counter()
+    next_at = began
+    while time.perf_counter() - began < seconds:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        next_at += 1 / rate
+        items = [(rng.choice(menu_ids), '', rng.randint(1, 3), 0.0) for _ in range(rng.randint(1, 4))]
+        roll = rng.random()
+        start = time.perf_counter()
+        try:
+            if roll < 0.15 and open_orders:
+                op = 'cancel'
+                db.update_order_status(open_orders.pop(rng.randrange(len(open_orders))), 'Cancelled')
+            elif roll < 0.3 and open_orders:
+                op = 'modify'
+                db.modify_order(rng.choice(open_orders), items)
+            else:
+                op = 'place'
+                open_orders.append(db.place_order(f"Stress Till {worker}", f"9{worker:09d}", items,
+                                                  datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+            counts[op] += 1
+        except OutOfStockError:
+            counts['out_of_stock'] += 1
+        except DatabaseBusyError:
+            counts['busy'] += 1
+        except Exception as e:
+            counts['errors'] += 1
+            print(f"worker {worker}: {e}")
+        latencies.append(time.perf_counter() - start)
+    results.put({'counts': counts, 'latencies': latencies, 'locks': db.lock_stats, 'seconds': time.perf_counter() - began})
+
+def check_invariants(path, initial_stock, first_order_id):
+    conn = sqlite3.connect(path)
+    try:
+        final_stock = dict(conn.execute('SELECT id, quantity FROM menu'))
+        sold = dict(conn.execute('''
+            SELECT oi.menu_id, SUM(oi.quantity)
+            FROM order_items oi JOIN orders o ON o.id = oi.order_id
+            WHERE o.id >= ? AND o.status != 'Cancelled'
+            GROUP BY oi.menu_id
+        ''', (first_order_id,)))
+        stock_drift = {menu_id: (initial_stock[menu_id] - final_stock.get(menu_id, 0), sold.get(menu_id, 0))
+                       for menu_id in initial_stock
+                       if initial_stock[menu_id] - final_stock.get(menu_id, 0) != sold.get(menu_id, 0)}
+        orphans = conn.execute('SELECT COUNT(*) FROM order_items WHERE order_id NOT IN (SELECT id FROM orders)').fetchone()[0]
+        mismatched = conn.execute('''
+            SELECT COUNT(*) FROM orders o
+            WHERE o.id >= ? AND ABS(o.total_price - (SELECT COALESCE(SUM(oi.quantity * oi.unit_price), 0)
+                                                      FROM order_items oi WHERE oi.order_id = o.id)) > 0.0051
+        ''', (first_order_id,)).fetchone()[0]
+        negative = conn.execute('SELECT COUNT(*) FROM menu WHERE quantity < 0').fetchone()[0]
+        summary_drift = conn.execute('''
+            SELECT COUNT(*) FROM customer_summary s
+            WHERE s.visits != (SELECT COUNT(*) FROM orders o WHERE o.customer_id = s.customer_id AND o.status != 'Cancelled')
+               OR ABS(s.spend - (SELECT COALESCE(SUM(o.total_price), 0) FROM orders o
+                                 WHERE o.customer_id = s.customer_id AND o.status != 'Cancelled')) > 0.0051
+        ''').fetchone()[0]
+    finally:
+        conn.close()
+    return {'stock sold equals line quantities': not stock_drift, 'every line has an order': not orphans,
+            'order totals equal line sums': not mismatched, 'no negative stock': not negative,
+            'customer summaries match orders': not summary_drift}, stock_drift
+
+def stress_test(source=DB_NAME, workers=4, seconds=10.0, rate=20.0, stock=500, in_place=False, db_options=None):
+    import multiprocessing
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        path = source
+        if not in_place:
+            path = os.path.join(tmp, 'stress.db')
+            CanteenDB(source, read_pool_size=0).snapshot(path).close()
+        # Opening with the workers' options switches the scratch copy to WAL before they race to do it.
+        db = CanteenDB(path, **(db_options or {}))
+        if not db.list_menu():
+            for n in range(8):
+                db.add_menu_item(f"Stress Item {n}", 2.0 + n, stock)
+        for item_id, name, price, _ in db.list_menu():
+            db.update_menu_item(item_id, name, price, stock)
+        initial_stock = dict(db.conn.execute('SELECT id, quantity FROM menu'))
+        first_order_id = db.conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM orders').fetchone()[0]
+        del db
+
+        context = multiprocessing.get_context('spawn')
+        ready = context.Barrier(workers + 1)
+        results = context.Queue()
+        processes = [context.Process(target=stress_worker, args=(path, n, seconds, rate, db_options or {}, ready, results))
+                     for n in range(workers)]
+        for process in processes:
+            process.start()
+        ready.wait()
+        reports = [results.get(timeout=seconds + 120) for _ in processes]
+        for process in processes:
+            process.join()
+        for report in reports:
+            if 'error' in report:
+                print(report['error'])
+        reports = [report for report in reports if 'error' not in report]
+        if not reports:
+            return False
+
+        counts = {key: sum(report['counts'][key] for report in reports) for key in reports[0]['counts']}
+        locks = {key: sum(report['locks'][key] for report in reports) for key in ('transactions', 'retries', 'failures')}
+        latencies = sorted(latency for report in reports for latency in report['latencies'])
+        elapsed = max(report['seconds'] for report in reports)
+        attempts = sum(counts.values())
+        done = counts['place'] + counts['cancel'] + counts['modify']
+        print(f"{workers} workers for {elapsed:.1f} s at {rate:g} ops/s each (target {workers * rate:g} ops/s)")
+        print(f"achieved         {done / elapsed:9.1f} ops/s   place {counts['place']}  cancel {counts['cancel']}  "
+              f"modify {counts['modify']}")
+        print(f"out of stock     {counts['out_of_stock']:9d}         errors {counts['errors']}")
+        print(f"lock retries     {locks['retries']:9d}   {locks['retries'] / max(1, locks['transactions']) * 100:6.2f}% of transactions")
+        print(f"busy failures    {counts['busy']:9d}   {counts['busy'] / max(1, attempts) * 100:6.2f}% of operations")
+        print("latency ms       " + "   ".join(f"p{int(q * 100)} {percentile(latencies, q) * 1000:.2f}" for q in (0.5, 0.95, 0.99))
+              + f"   max {latencies[-1] * 1000 if latencies else 0.0:.2f}")
+        invariants, stock_drift = check_invariants(path, initial_stock, first_order_id)
+        for name, ok in invariants.items():
+            print(f"{name:<36} {'ok' if ok else 'FAILED'}")
+        for menu_id, (taken, sold) in stock_drift.items():
+            print(f"  menu item {menu_id}: stock fell by {taken}, lines sold {sold}")
+        return all(invariants.values())
+
+def parse_journal_time(text):
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD [HH:MM[:SS]], got {text!r}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Canteen Management System")
+    parser.add_argument('--db', default=DB_NAME,
+                        help="database file, ':memory:' or a file: URI such as file::memory:?cache=shared")
+    parser.add_argument('--training', action='store_true',
+                        help="work on an in-memory copy of --db that can be reset from the dashboard")
+    parser.add_argument('--busy-timeout', type=int, default=BUSY_TIMEOUT_MS, metavar='MS',
+                        help="how long a write waits for another till's lock before retrying")
+    parser.add_argument('--write-retries', type=int, default=WRITE_RETRIES)
+    parser.add_argument('--read-pool', type=int, default=READ_POOL_SIZE, metavar='N',
+                        help="read-only connections for list and report screens (0 reads on the writer)")
+    parser.add_argument('--sla-minutes', type=float, default=SLA_MINUTES,
+                        help="highlight orders open, or completed, later than this")
+    parser.add_argument('--backup-dir', help="take online snapshots of --db into this directory while running")
+    parser.add_argument('--backup-interval', type=float, default=BACKUP_INTERVAL_MINUTES, metavar='MINUTES')
+    parser.add_argument('--backup-keep', type=int, default=BACKUP_KEEP, help="number of snapshots to keep")
+    parser.add_argument('--sites', default=SITES_PATH, metavar='PATH', help="registry of canteen sites and their databases")
+    parser.add_argument('--site', help="work on this site's database from --sites instead of --db")
+    parser.add_argument('--journal', metavar='PATH', help=f"audit journal of every change (default: --db + {JOURNAL_SUFFIX})")
+    parser.add_argument('--no-journal', action='store_true', help="do not record changes to the audit journal")
+    parser.add_argument('--photo-dir', default=PHOTO_DIR, help="menu photos and their thumbnail cache")
+    parser.add_argument('--receipt-dir', default=RECEIPT_DIR, help="spool directory receipts are written to")
+    parser.add_argument('--receipt-template', metavar='PATH',
+                        help="text receipt template using $title, $order_line, $items, $total_line, ... placeholders")
+    parser.add_argument('--profile-queries', metavar='PATH', nargs='?', const=QUERY_STATS_PATH,
+                        help="record per-method query statistics and write them to PATH on exit")
+    parser.add_argument('--slow-query-ms', type=float, default=SLOW_QUERY_MS,
+                        help="capture EXPLAIN QUERY PLAN for statements slower than this")
+    parser.add_argument('--profile-ui', metavar='PATH', nargs='?', const=UI_TRACE_PATH,
+                        help="write a Chrome trace of screen builds, DB calls and main-loop stalls to PATH on exit")
+    parser.add_argument('--stall-ms', type=float, default=STALL_MS,
+                        help="report main-loop stalls longer than this")
+    parser.add_argument('--exit-after-paint', action='store_true', help=argparse.SUPPRESS)
+    subparsers = parser.add_subparsers(dest='command')
+    bench = subparsers.add_parser('bench-startup', help="measure cold-start time of each startup phase")
+    bench.add_argument('--runs', type=int, default=5)
+    subparsers.add_parser('backup', help="take one online snapshot of --db into --backup-dir and exit")
+    receipts = subparsers.add_parser('receipts', help="write receipts for one order or a whole day to --receipt-dir")
+    receipt_target = receipts.add_mutually_exclusive_group(required=True)
+    receipt_target.add_argument('--order', type=int, metavar='ID')
+    receipt_target.add_argument('--date', metavar='YYYY-MM-DD')
+    receipts.add_argument('--formats', default=','.join(RECEIPT_FORMATS), help="comma separated: txt, pdf, png")
+    receipts.add_argument('--workers', type=int, default=RECEIPT_WORKERS)
+    stress = subparsers.add_parser('stress', help="place, cancel and modify orders from several processes and check invariants")
+    stress.add_argument('--workers', type=int, default=4)
+    stress.add_argument('--seconds', type=float, default=10.0)
+    stress.add_argument('--rate', type=float, default=20.0, help="operations per second per worker")
+    stress.add_argument('--stock', type=int, default=500, help="restock every menu item to this before starting")
+    stress.add_argument('--in-place', action='store_true', help="run against --db itself instead of a scratch copy")
+    replay = subparsers.add_parser('replay', help="rebuild a database from the journal, optionally as it was at a given time")
+    replay.add_argument('--output', required=True, help="new database file to write")
+    replay.add_argument('--until', type=parse_journal_time, metavar='TIME')
+    history = subparsers.add_parser('journal-history', help="list every recorded change to a table, or to one row of it")
+    history.add_argument('table')
+    history.add_argument('rowid', type=int, nargs='?')
+    history.add_argument('--since', type=parse_journal_time, metavar='TIME')
+    history.add_argument('--until', type=parse_journal_time, metavar='TIME')
+    close_day = subparsers.add_parser('close-day', help="close a day: Z report, closing stock and open orders in one pass")
+    close_day.add_argument('--date', metavar='YYYY-MM-DD', help="day to close (default: today)")
+    close_day.add_argument('--force', action='store_true', help="close the day again, replacing what was stored")
+    day_report = subparsers.add_parser('day-report', help="print the Z report of a day, from the close if it has one")
+    day_report.add_argument('--date', metavar='YYYY-MM-DD', help="default: today")
+    bench_close = subparsers.add_parser('bench-close-day', help="time closing a synthetic day")
+    bench_close.add_argument('--orders', type=int, default=100000)
+    sites = subparsers.add_parser('sites', help="list, add or remove canteen sites in --sites")
+    sites.add_argument('action', choices=['list', 'add', 'remove'])
+    sites.add_argument('name', nargs='?')
+    sites.add_argument('site_db', nargs='?', metavar='DB', help="database file of the site being added")
+    site_report = subparsers.add_parser('site-report', help="sales and best sellers across every site")
+    site_report.add_argument('--from', dest='date_from', metavar='YYYY-MM-DD', help="default: today")
+    site_report.add_argument('--to', dest='date_to', metavar='YYYY-MM-DD', help="default: --from")
+    find_customer = subparsers.add_parser('find-customer', help="look a customer up at every site")
+    find_customer.add_argument('--name')
+    find_customer.add_argument('--phone')
+    subparsers.add_parser('rebuild-summaries', help="recompute every customer's spend, visits, last visit and favourite item")
+    integrity = subparsers.add_parser('check-integrity', help="scan for orphaned rows and wrong order totals, and write a repair plan")
+    integrity.add_argument('--batch', type=int, default=INTEGRITY_BATCH_ROWS, help="rows per check per transaction")
+    integrity.add_argument('--steps', type=int, metavar='N', help="stop after N batches instead of one full pass")
+    integrity.add_argument('--restart', action='store_true', help="forget the saved position and findings first")
+    integrity.add_argument('--plan', metavar='PATH', nargs='?', const=INTEGRITY_PLAN_PATH,
+                           help="write the proposed repairs as a SQL script to review")
+    integrity.add_argument('--apply', metavar='PATH', help="apply a reviewed repair plan, then rescan")
+    bench_receipt = subparsers.add_parser('bench-receipts', help="measure receipt rendering throughput")
+    bench_receipt.add_argument('--orders', type=int, default=2000)
+    bench_receipt.add_argument('--workers', type=int, default=RECEIPT_WORKERS)
+    args = parser.parse_args()
+    registry = SiteRegistry(args.sites)
+    if args.site:
+        try:
+            args.db = registry.db_path(args.site)
+        except KeyError as e:
+            parser.error(str(e.args[0]))
+        # Snapshots are pruned by name, so each site keeps its own backup directory.
+        if args.backup_dir:
+            args.backup_dir = os.path.join(args.backup_dir, args.site)
+    journal = None if args.no_journal or is_memory_target(args.db) else args.journal or args.db + JOURNAL_SUFFIX
+
+    if args.command == 'sites':
+        if args.action == 'add':
+            if not args.name or not args.site_db:
+                parser.error("sites add needs a NAME and a DB")
+            registry.add(args.name, args.site_db)
+        elif args.action == 'remove':
+            if not args.name or args.name not in registry.sites:
+                parser.error(f"no site {args.name!r}")
+            registry.remove(args.name)
+        for name in sorted(registry.sites):
+            path = registry.db_path(name)
+            state = '' if is_uri(path) or os.path.exists(path) else '  (missing)'
+            print(f"{name:<20} {path}{state}")
+        return
+    if args.command in ('site-report', 'find-customer'):
+        if not registry.sites:
+            parser.error(f"no sites registered in {args.sites}")
+        reader = FederatedReader(registry)
+        start = time.perf_counter()
+        if args.command == 'site-report':
+            date_from = args.date_from or datetime.now().strftime('%Y-%m-%d')
+            date_to = args.date_to or date_from
+            sales = reader.sales(date_from, date_to)
+            items = reader.top_items(date_from, date_to)
+            print(f"Sales {date_from} to {date_to}, {len(registry.sites)} sites read in "
+                  f"{(time.perf_counter() - start) * 1000:.1f} ms")
+            for site, orders, revenue, open_orders in sales['sites']:
+                print(f"  {site:<20} {orders:>8} orders {revenue:>12.2f}   {open_orders} open")
+            orders, revenue, open_orders = sales['total']
+            print(f"  {'all sites':<20} {orders:>8} orders {revenue:>12.2f}   {open_orders} open")
+            print("Best sellers")
+            for name, quantity, item_revenue in items['items']:
+                print(f"  {name:<28} {quantity:>8} {item_revenue:>12.2f}")
+            unavailable = {**sales['unavailable'], **items['unavailable']}
+        else:
+            if not args.name and not args.phone:
+                parser.error("give --name and/or --phone")
+            found = reader.find_customers(args.name, args.phone)
+            for site, customer_id, name, phone, visits, spend, last_visit in found['customers']:
+                print(f"  {site:<16} {customer_id:>6} {name:<24} {phone:<14} {visits:>4} visits {spend:>10.2f}  {last_visit}")
+            for phone, name, site_count, visits, spend, last_visit in found['combined']:
+                if site_count > 1:
+                    print(f"  {phone:<14} {name:<24} {site_count} sites, {visits} visits, {spend:.2f} spent in total")
+            unavailable = found['unavailable']
+        for site, error in sorted(unavailable.items()):
+            print(f"  {site}: not included ({error})")
+        reader.close()
+        return
+    if args.command == 'replay':
+        if os.path.exists(args.output):
+            parser.error(f"{args.output} already exists")
+        if journal is None or not os.path.exists(journal):
+            parser.error("no journal to replay")
+        print(json.dumps(replay_journal(journal, args.output, args.until), indent=2))
+        return
+    if args.command == 'journal-history':
+        if journal is None or not os.path.exists(journal):
+            parser.error("no journal to read")
+        for stamp, op, actor, kind, rowid, data in journal_history(journal, args.table, args.rowid, args.since, args.until):
+            when = datetime.fromtimestamp(stamp).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+            change = {'i': 'insert', 'u': 'update', 'd': 'delete'}[kind]
+            print(f"{when}  {op:<22} {actor or '-':<12} {change:<6} {rowid:>8}  {json.dumps(data) if data else ''}")
+        return
+    if args.command == 'bench-startup':
+        bench_startup(args.runs)
+        return
+    if args.command == 'backup':
+        scheduler = BackupScheduler(args.db, args.backup_dir or BACKUP_DIR, keep=args.backup_keep)
+        print(json.dumps(scheduler.backup_once(), indent=2))
+        return
+    if args.command == 'stress':
+        db_options = {'busy_timeout_ms': args.busy_timeout, 'write_retries': args.write_retries,
+                      'read_pool_size': args.read_pool, 'journal': journal if args.in_place else None}
+        if not stress_test(args.db, args.workers, args.seconds, args.rate, args.stock, args.in_place, db_options):
+            sys.exit(1)
+        return
+    if args.command in ('close-day', 'day-report'):
+        day = args.date or datetime.now().strftime('%Y-%m-%d')
+        try:
+            datetime.strptime(day, '%Y-%m-%d')
+        except ValueError:
+            parser.error("dates must be in YYYY-MM-DD format")
+        db = CanteenDB(args.db, busy_timeout_ms=args.busy_timeout, write_retries=args.write_retries,
+                       read_pool_size=args.read_pool, journal=journal)
+        if args.command == 'close-day':
+            report = db.close_day(day, args.force)
+            if report is None:
+                parser.error(f"{day} is already closed; use --force to close it again")
+            print(f"closed {day} in {report['seconds']:.3f} s")
+        else:
+            report = db.day_report(day)
+        print_day_report(report)
+        return
+    if args.command == 'bench-close-day':
+        bench_close_day(args.orders)
+        return
+    if args.command == 'rebuild-summaries':
+        db = CanteenDB(args.db, read_pool_size=0, busy_timeout_ms=args.busy_timeout, write_retries=args.write_retries,
+                       journal=journal)
+        start = time.perf_counter()
+        customers = db.rebuild_customer_summary()
+        print(f"{customers} customer summaries rebuilt in {time.perf_counter() - start:.2f} s")
+        return
+    if args.command == 'check-integrity':
+        db = CanteenDB(args.db, read_pool_size=0, busy_timeout_ms=args.busy_timeout, write_retries=args.write_retries,
+                       journal=journal)
+        if args.restart:
+            db.reset_integrity_scan()
+        if args.apply:
+            with open(args.apply, encoding='utf-8') as f:
+                try:
+                    statements, changed = db.apply_repair_plan(f.read())
+                except (ValueError, sqlite3.Error) as e:
+                    parser.error(f"repair plan not applied: {e}")
+            print(f"applied {statements} statements, {changed} rows changed")
+            db.reset_integrity_scan()
+        steps, complete = db.run_integrity_pass(args.batch, args.steps)
+        print(f"{steps} batches{', pass complete' if complete else ''}")
+        for name, last, end, passes, completed_at, issues in db.integrity_status():
+            print(f"{name:<26} at {last:>10} of {end:<10} passes {passes:<4} last complete {completed_at or '-':<19} "
+                  f"issues {issues}")
+        if args.plan:
+            write_atomic(args.plan, db.integrity_repair_plan().encode('utf-8'))
+            print(f"repair plan written to {args.plan}")
+        if any(row[-1] for row in db.integrity_status()):
+            sys.exit(1)
+        return
+    if args.command == 'bench-receipts':
+        bench_receipts(args.orders, args.workers)
+        return
+    if args.command == 'receipts':
+        db = CanteenDB(args.db, read_pool_size=0)
+        spool = ReceiptSpool(args.receipt_dir, args.formats.split(','), args.workers, args.receipt_template)
+        if args.order is not None:
+            order = db.get_order(args.order)
+            if order is None:
+                parser.error(f"no order {args.order}")
+            paths = spool.render(order, db.get_order_items(args.order))
+        else:
+            start = datetime.strptime(args.date, '%Y-%m-%d')
+            paths = [path for batch in spool.render_batch(db.get_receipts(args.date, (start + timedelta(days=1)).strftime('%Y-%m-%d')))
+                     for path in batch]
+        spool.shutdown()
+        print(f"{len(paths)} files written to {args.receipt_dir}")
+        return
+
+    profiler = QueryProfiler(args.slow_query_ms) if args.profile_queries else None
+    root = tk.Tk()
+    ui_profiler = UIProfiler(root, stall_ms=args.stall_ms) if args.profile_ui else None
+    backup_scheduler = None
+    if args.backup_dir and not args.training:
+        backup_scheduler = BackupScheduler(args.db, args.backup_dir, args.backup_interval, args.backup_keep)
+        backup_scheduler.start()
+    db_options = {'busy_timeout_ms': args.busy_timeout, 'write_retries': args.write_retries,
+                  'read_pool_size': args.read_pool, 'journal': journal}
+    receipt_spool = ReceiptSpool(args.receipt_dir, template_path=args.receipt_template)
+    app = CanteenApp(root, db_path=args.db, training=args.training, profiler=profiler, ui_profiler=ui_profiler,
+                     backup_scheduler=backup_scheduler, db_options=db_options, sla_minutes=args.sla_minutes,
+                     receipt_spool=receipt_spool, photo_dir=args.photo_dir, site=args.site,
+                     site_reader=FederatedReader(registry) if registry.sites else None)
+    if args.exit_after_paint:
+        # Bound after the app's own handler, so the form has been drawn; quitting here skips the deferred startup.
+        root.bind('<Expose>', lambda event: root.quit(), add='+')
+        root.mainloop()
+        root.destroy()
+        return
+    root.mainloop()
+    receipt_spool.shutdown()
+    if app.site_reader is not None:
+        app.site_reader.close()
+    if app.db.journal is not None:
+        app.db.journal.close()
+    if backup_scheduler is not None:
+        backup_scheduler.stop()
+    if profiler is not None:
+        profiler.dump(args.profile_queries, {'locks': app.db.lock_stats})
+    if ui_profiler is not None:
+        ui_profiler.dump(args.profile_ui)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
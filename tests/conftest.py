@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import canteen_app  # noqa: E402
+
+ORDER_DATE = '2026-10-19 12:00:00'  # a Monday, so rule day '0'
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = canteen_app.CanteenDB(str(tmp_path / 'canteen.db'))
+    yield database
+    del database
+
+
+@pytest.fixture
+def menu(db):
+    return {name: db.add_menu_item(name, price, 100) for name, price in (('Tea', 10.0), ('Samosa', 15.0), ('Burger', 80.0))}
@@ -0,0 +1,86 @@
+import json
+import sqlite3
+
+from conftest import ORDER_DATE
+
+
+def place(db, menu, name='Asha', phone='01700000000'):
+    return db.place_order(name, phone, [(menu['Tea'], 'Tea', 2, 10.0), (menu['Samosa'], 'Samosa', 1, 15.0)],
+                          ORDER_DATE)
+
+
+def corrupt(db, *statements):
+    # Another connection, without foreign keys, stands in for a damaged file or an older version of the app.
+    conn = sqlite3.connect(db.path)
+    with conn:
+        for sql, params in statements:
+            conn.execute(sql, params)
+    conn.close()
+
+
+def issues(db):
+    db.run_integrity_pass()
+    return {(check, row_id): json.loads(detail) for check, row_id, detail, _ in db.list_integrity_issues()}
+
+
+def total(db, order_id):
+    return db.conn.execute('SELECT total_price FROM orders WHERE id = ?', (order_id,)).fetchone()[0]
+
+
+def test_clean_database_has_no_issues(db, menu):
+    place(db, menu)
+    assert issues(db) == {}
+
+
+def test_mismatched_total_is_repaired_from_recorded_prices(db, menu):
+    order_id = place(db, menu)
+    corrupt(db, ('UPDATE orders SET total_price = 999 WHERE id = ?', (order_id,)))
+    found = issues(db)
+    assert found == {('orders.total_price', order_id): {'total_price': 999.0, 'line_total': 35.0}}
+
+    db.apply_repair_plan(db.integrity_repair_plan())
+    assert total(db, order_id) == 35.0
+    spend = db.conn.execute('SELECT spend FROM customer_summary s JOIN orders o ON o.customer_id = s.customer_id '
+                            'WHERE o.id = ?', (order_id,)).fetchone()[0]
+    assert spend == 35.0
+    assert issues(db) == {}
+
+
+def test_order_with_unrecorded_price_is_reported_but_never_repaired(db, menu):
+    legacy = place(db, menu)
+    broken = place(db, menu, 'Ben', '01800000000')
+    # A legacy line has no recorded price, and its total does not match today's menu either.
+    corrupt(db, ('UPDATE order_items SET unit_price = NULL WHERE order_id = ? AND menu_id = ?', (legacy, menu['Tea'])),
+            ('UPDATE orders SET total_price = 240 WHERE id = ?', (legacy,)),
+            ('UPDATE orders SET total_price = 1 WHERE id = ?', (broken,)))
+    found = issues(db)
+    assert found[('orders.price_unknown', legacy)] == {'total_price': 240.0, 'unknown_lines': 1}
+    assert ('orders.total_price', legacy) not in found
+    assert ('orders.total_price', broken) in found
+
+    plan = db.integrity_repair_plan()
+    assert '(reported only; the recorded total is kept)' in plan
+    assert f'WHERE id = {legacy} AND' not in plan
+    db.apply_repair_plan(plan)
+    assert total(db, legacy) == 240.0
+    assert total(db, broken) == 35.0
+
+
+def test_stale_plan_does_not_overwrite_a_changed_order(db, menu):
+    order_id = place(db, menu)
+    corrupt(db, ('UPDATE orders SET total_price = 999 WHERE id = ?', (order_id,)))
+    issues(db)
+    plan = db.integrity_repair_plan()
+    corrupt(db, ('UPDATE orders SET total_price = 50 WHERE id = ?', (order_id,)))
+    db.apply_repair_plan(plan)
+    assert total(db, order_id) == 50.0
+
+
+def test_missing_menu_item_is_recreated_at_its_last_sold_price(db, menu):
+    order_id = place(db, menu)
+    corrupt(db, ('UPDATE order_items SET unit_price = 12.5 WHERE order_id = ? AND menu_id = ?', (order_id, menu['Tea'])),
+            ('DELETE FROM menu WHERE id = ?', (menu['Tea'],)))
+    assert ('order_items.menu_id', 1) in issues(db)
+    db.apply_repair_plan(db.integrity_repair_plan())
+    row = db.conn.execute('SELECT item_name, price, quantity FROM menu WHERE id = ?', (menu['Tea'],)).fetchone()
+    assert row == (f"Deleted item #{menu['Tea']}", 12.5, 0)
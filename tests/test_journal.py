@@ -0,0 +1,113 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import textwrap
+
+import canteen_app
+from canteen_app import CanteenDB, Journal, read_journal, replay_journal
+
+from conftest import ORDER_DATE
+
+
+def open_db(tmp_path):
+    return CanteenDB(str(tmp_path / 'canteen.db'), journal=str(tmp_path / 'canteen.db.journal'))
+
+
+def contents(path):
+    conn = sqlite3.connect(path)
+    tables = [name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE "
+                                               "'sqlite_%' AND name NOT LIKE 'integrity_%' AND name != 'journal_position'")]
+    rows = {table: conn.execute(f'SELECT rowid, * FROM "{table}" ORDER BY rowid').fetchall() for table in tables}
+    conn.close()
+    return rows
+
+
+def test_replay_rebuilds_the_live_database(tmp_path):
+    db = open_db(tmp_path)
+    tea = db.add_menu_item('Tea', 10.0, 50)
+    burger = db.add_menu_item('Burger', 80.0, 5)
+    order_id = db.place_order('Asha', '01700000000', [(tea, 'Tea', 2, 10.0), (burger, 'Burger', 1, 80.0)], ORDER_DATE)
+    db.modify_order(order_id, [(tea, 'Tea', 3, 10.0)])
+    db.update_order_status(order_id, 'Completed')
+    db.add_price_rule('Happy hour', 'discount', tea, 20.0)
+    customer = db.add_customer('Ben', '01800000000')
+    db.delete_customer(customer)
+    del db
+
+    report = replay_journal(str(tmp_path / 'canteen.db.journal'), str(tmp_path / 'replayed.db'))
+    assert report['records'] > 1
+    assert contents(str(tmp_path / 'replayed.db')) == contents(str(tmp_path / 'canteen.db'))
+
+
+def test_replay_stops_at_the_requested_time(tmp_path):
+    db = open_db(tmp_path)
+    db.add_menu_item('Tea', 10.0, 50)
+    cutoff = max(stamp for _, stamp, _ in read_journal(str(tmp_path / 'canteen.db.journal')))
+    db.add_menu_item('Coffee', 20.0, 50)
+    del db
+
+    replay_journal(str(tmp_path / 'canteen.db.journal'), str(tmp_path / 'replayed.db'), until=cutoff)
+    names = [row[2] for row in contents(str(tmp_path / 'replayed.db'))['menu']]
+    assert names == ['Tea']
+
+
+def test_record_of_a_crashed_transaction_is_cancelled(tmp_path):
+    open_db(tmp_path).add_menu_item('Tea', 10.0, 50)
+    # Dies after the record is synced but before COMMIT, the one window where the journal runs ahead of the database.
+    script = textwrap.dedent(f'''
+        import os, sys
+        sys.path.insert(0, {os.path.dirname(canteen_app.__file__)!r})
+        from canteen_app import CanteenDB
+        db = CanteenDB({str(tmp_path / 'canteen.db')!r}, journal={str(tmp_path / 'canteen.db.journal')!r})
+        sync = db.journal.sync
+        def crash():
+            sync()
+            os._exit(1)
+        db.journal.sync = crash
+        db.add_menu_item('Ghost', 1.0, 1)
+    ''')
+    assert subprocess.run([sys.executable, '-c', script]).returncode == 1
+
+    db = open_db(tmp_path)
+    assert db.journal.kinds_after(len(Journal.MAGIC))[-2:] == [Journal.TRANSACTION, Journal.ABORT]
+    db.add_menu_item('Coffee', 20.0, 50)
+    assert db.conn.execute('SELECT journal_end FROM journal_position').fetchone()[0] == db.journal.size()
+    del db
+
+    replay_journal(str(tmp_path / 'canteen.db.journal'), str(tmp_path / 'replayed.db'))
+    replayed = contents(str(tmp_path / 'replayed.db'))
+    assert [row[2] for row in replayed['menu']] == ['Tea', 'Coffee']
+    assert replayed == contents(str(tmp_path / 'canteen.db'))
+
+
+def test_torn_tail_is_truncated_on_open(tmp_path):
+    db = open_db(tmp_path)
+    db.add_menu_item('Tea', 10.0, 50)
+    size = db.journal.size()
+    del db
+    with open(tmp_path / 'canteen.db.journal', 'ab') as f:
+        f.write(Journal.HEADER.pack(100, 0, 0.0, Journal.TRANSACTION) + b'{"op":')
+
+    db = open_db(tmp_path)
+    assert db.journal.size() == size
+    db.add_menu_item('Coffee', 20.0, 50)
+    del db
+
+    replay_journal(str(tmp_path / 'canteen.db.journal'), str(tmp_path / 'replayed.db'))
+    assert contents(str(tmp_path / 'replayed.db')) == contents(str(tmp_path / 'canteen.db'))
+
+
+def test_rolled_back_transaction_leaves_no_record(tmp_path):
+    db = open_db(tmp_path)
+    tea = db.add_menu_item('Tea', 1.0, 1)
+    try:
+        db.place_order('Asha', '01700000000', [(tea, 'Tea', 5, 1.0)], ORDER_DATE)
+    except canteen_app.OutOfStockError:
+        pass
+    del db
+
+    replay_journal(str(tmp_path / 'canteen.db.journal'), str(tmp_path / 'replayed.db'))
+    replayed = contents(str(tmp_path / 'replayed.db'))
+    assert replayed['orders'] == []
+    assert replayed == contents(str(tmp_path / 'canteen.db'))
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from canteen_app import PricingEngine
+
+from conftest import ORDER_DATE
+
+MONDAY_NOON = datetime.strptime(ORDER_DATE, '%Y-%m-%d %H:%M:%S')
+
+
+def test_discount_applies_only_inside_its_window():
+    engine = PricingEngine([(1, 'discount', 7, 20.0, '0', '11:00', '14:00')], {})
+    assert engine.unit_price(7, 50.0, MONDAY_NOON) == 40.0
+    assert engine.unit_price(7, 50.0, MONDAY_NOON.replace(hour=15)) == 50.0
+    assert engine.unit_price(8, 50.0, MONDAY_NOON) == 50.0
+
+
+def test_fixed_price_and_global_discount_combine():
+    rules = [(1, 'price', 7, 30.0, '0123456', '00:00', '24:00'),
+             (2, 'discount', None, 10.0, '0123456', '00:00', '24:00')]
+    engine = PricingEngine(rules, {})
+    assert engine.unit_price(7, 50.0, MONDAY_NOON) == 27.0
+    assert engine.unit_price(8, 50.0, MONDAY_NOON) == 45.0
+
+
+def test_window_past_midnight_runs_into_next_day():
+    engine = PricingEngine([(1, 'discount', 7, 50.0, '6', '22:00', '02:00')], {})
+    sunday_night = datetime(2026, 10, 18, 23, 0)
+    monday_early = datetime(2026, 10, 19, 1, 0)
+    assert engine.unit_price(7, 10.0, sunday_night) == 5.0
+    assert engine.unit_price(7, 10.0, monday_early) == 5.0
+    assert engine.unit_price(7, 10.0, MONDAY_NOON) == 10.0
+
+
+def test_combo_saving_is_spread_over_its_lines():
+    engine = PricingEngine([(1, 'combo', None, 20.0, '0123456', '00:00', '24:00')], {1: {7: 1, 8: 1}})
+    units = engine.price_cart([(7, 1, 10.0), (8, 1, 15.0), (9, 2, 5.0)], MONDAY_NOON)
+    assert units == [8.0, 12.0, 5.0]
+    assert round(sum(units[:2]), 2) == 20.0
+
+
+def test_combo_is_skipped_when_it_would_cost_more():
+    engine = PricingEngine([(1, 'combo', None, 30.0, '0123456', '00:00', '24:00')], {1: {7: 1, 8: 1}})
+    assert engine.price_cart([(7, 1, 10.0), (8, 1, 15.0)], MONDAY_NOON) == [10.0, 15.0]
+
+
+def test_orders_record_the_price_charged_and_follow_rule_changes(db, menu):
+    first = db.place_order('Asha', '01700000000', [(menu['Tea'], 'Tea', 2, 10.0)], ORDER_DATE)
+    rule_id = db.add_price_rule('Tea hour', 'discount', menu['Tea'], 50.0)
+    second = db.place_order('Asha', '01700000000', [(menu['Tea'], 'Tea', 2, 10.0)], ORDER_DATE)
+    db.set_price_rule_active(rule_id, False)
+    third = db.place_order('Asha', '01700000000', [(menu['Tea'], 'Tea', 2, 10.0)], ORDER_DATE)
+
+    totals = dict(db.conn.execute('SELECT id, total_price FROM orders').fetchall())
+    assert [totals[first], totals[second], totals[third]] == [20.0, 10.0, 20.0]
+    unit = db.conn.execute('SELECT unit_price FROM order_items WHERE order_id = ?', (second,)).fetchone()[0]
+    assert unit == 5.0
+
+
+def test_client_prices_are_ignored(db, menu):
+    order_id = db.place_order('Ben', '01800000000', [(menu['Burger'], 'Burger', 1, 1.0)], ORDER_DATE)
+    assert db.conn.execute('SELECT total_price FROM orders WHERE id = ?', (order_id,)).fetchone()[0] == 80.0